@@ -0,0 +1,219 @@
+# admission.py
+import hashlib
+import os
+import threading
+from typing import Dict, Optional
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from json_response import FastJSONResponse
+from metrics import ADMISSION_REJECTED
+from shared_state import SharedState, get_shared_state
+from upload_stream import MAX_BODY_BYTES, MAX_UPLOAD_MB
+
+# Ayarlar (ortam değişkenleri ile değiştirilebilir)
+RATE_LIMIT_PER_MINUTE = float(os.getenv("RATE_LIMIT_PER_MINUTE", "120"))  # 0 = kapalı
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "30"))
+MAX_INFLIGHT_MB = int(os.getenv("MAX_INFLIGHT_MB", "1024"))  # Process başına aynı anda alınan gövde
+MAX_CONCURRENT_ANALYSES = int(os.getenv("MAX_CONCURRENT_ANALYSES", str(2 * (os.cpu_count() or 2))))
+OVERLOAD_RETRY_AFTER = int(os.getenv("OVERLOAD_RETRY_AFTER", "2"))
+TRUST_PROXY_HEADERS = os.getenv("TRUST_PROXY_HEADERS", "0") == "1"
+
+# Sınırlanmayan yollar (izleme ve dokümantasyon)
+EXEMPT_PATHS = ("/", "/health", "/metrics", "/docs", "/redoc", "/openapi.json")
+# Tam analiz çalıştıran yollar (eşzamanlı analiz limitine tabi)
+ANALYSIS_PATHS = ("/analyze-video", "/analyze-video/stream")
+# Gövdenin yalnızca başını okuyan yollar (yükleme boyutu sınırına tabi değil)
+HEAD_ONLY_PATHS = ("/quick-score/header",)
+
+
+class AdmissionController:
+    """
+    İstek kabul kontrolü
+
+    1. İstemci başına token bucket (API anahtarı, yoksa IP): aşılırsa 429
+    2. Content-Length yükleme sınırını aşıyorsa: 413
+    3. Process başına aynı anda alınan gövde byte'ı sınırı: aşılırsa 503
+    4. Process başına eşzamanlı tam analiz sınırı: aşılırsa 503
+
+    Content-Length'i olmayan (chunked) gövdeler için baştan byte ayrılmaz;
+    gövde okundukça ayrılır ve sınırlar aşılınca okuma 413/503 ile kesilir.
+
+    Diğerleri istek gövdesi okunmadan, anında reddeder (429/503 Retry-After ile); böylece
+    aşırı yükte kuyruk birikmez, gecikme sınırlı kalır. Rate limit sayaçları
+    paylaşılan durumda tutulur (tüm worker'lar ortak), byte ve analiz
+    sınırları process'in kendi belleğini korur.
+    """
+
+    def __init__(self, state: Optional[SharedState] = None,
+                 per_minute: float = RATE_LIMIT_PER_MINUTE, burst: float = RATE_LIMIT_BURST,
+                 max_inflight_bytes: int = MAX_INFLIGHT_MB * 1024 * 1024,
+                 max_analyses: int = MAX_CONCURRENT_ANALYSES):
+        self._state = state
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.max_inflight_bytes = max_inflight_bytes
+        self.max_analyses = max_analyses
+        self._lock = threading.Lock()
+        self.inflight_bytes = 0
+        self.active_analyses = 0
+        self.rejected = {"rate_limited": 0, "too_large": 0, "inflight_bytes": 0, "concurrency": 0}
+
+    @property
+    def state(self) -> SharedState:
+        if self._state is None:
+            self._state = get_shared_state()
+        return self._state
+
+    def check_rate(self, client_key: str) -> float:
+        """İstemcinin kovasından token al; 0 değilse beklenecek süre"""
+        if self.rate <= 0:
+            return 0.0
+        return self.state.take(f"ratelimit:{client_key}", self.rate, self.burst)
+
+    def acquire(self, body_bytes: int, analysis: bool) -> Optional[str]:
+        """Kaynak ayır; ayrılamazsa ret nedeni"""
+        with self._lock:
+            # Tek istek sınırdan büyükse ve başka yükleme yoksa yine kabul et (kilitlenmesin)
+            if self.inflight_bytes and self.inflight_bytes + body_bytes > self.max_inflight_bytes:
+                return "inflight_bytes"
+            if analysis and self.active_analyses >= self.max_analyses:
+                return "concurrency"
+            self.inflight_bytes += body_bytes
+            if analysis:
+                self.active_analyses += 1
+        return None
+
+    def charge(self, body_bytes: int) -> bool:
+        """Okunan chunked gövde parçası için byte ayır (acquire ile aynı kural)"""
+        with self._lock:
+            if self.inflight_bytes and self.inflight_bytes + body_bytes > self.max_inflight_bytes:
+                return False
+            self.inflight_bytes += body_bytes
+        return True
+
+    def release(self, body_bytes: int, analysis: bool):
+        with self._lock:
+            self.inflight_bytes -= body_bytes
+            if analysis:
+                self.active_analyses -= 1
+
+    def reject(self, reason: str):
+        with self._lock:
+            self.rejected[reason] += 1
+        ADMISSION_REJECTED.inc(reason=reason)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "rate_limit_per_minute": round(self.rate * 60, 2),
+                "rate_limit_burst": self.burst,
+                "inflight_mb": round(self.inflight_bytes / (1024 * 1024), 2),
+                "max_inflight_mb": round(self.max_inflight_bytes / (1024 * 1024), 2),
+                "active_analyses": self.active_analyses,
+                "max_concurrent_analyses": self.max_analyses,
+                "rejected": dict(self.rejected)
+            }
+
+
+def client_key(scope) -> str:
+    """API anahtarı (hash'lenmiş) veya istemci IP'si"""
+    headers = dict(scope.get("headers") or [])
+    api_key = headers.get(b"x-api-key")
+    if api_key:
+        return "key:" + hashlib.sha256(api_key).hexdigest()[:16]
+    if TRUST_PROXY_HEADERS and b"x-forwarded-for" in headers:
+        return "ip:" + headers[b"x-forwarded-for"].split(b",")[0].strip().decode("latin-1")
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown")
+
+
+def _body_size(scope) -> Optional[int]:
+    """Ayrılacak gövde byte'ı: Content-Length, bilinmiyorsa (chunked) None"""
+    if scope["method"] not in ("POST", "PUT", "PATCH"):
+        return 0
+    for name, value in scope.get("headers") or []:
+        if name == b"content-length":
+            return int(value) if value.isdigit() else None
+    return None
+
+
+def _metered_receive(receive, controller: AdmissionController, charged: list, limit: Optional[int]):
+    """
+    Chunked gövdeyi okundukça byte bütçesinden düş
+
+    charged[0] o ana kadar ayrılan byte'tır (middleware finally'de bırakır).
+    Sınır aşılırsa HTTPException fırlatılır; FastAPI bunu gövde ayrıştırılırken
+    yanıta çevirir.
+    """
+    async def metered():
+        message = await receive()
+        if message["type"] == "http.request":
+            size = len(message.get("body", b""))
+            if limit is not None and charged[0] + size > limit:
+                controller.reject("too_large")
+                raise HTTPException(status_code=413, detail=f"Dosya çok büyük. Maksimum boyut: {MAX_UPLOAD_MB} MB")
+            if size and not controller.charge(size):
+                controller.reject("inflight_bytes")
+                raise HTTPException(status_code=503, detail="Sunucu şu an yoğun, lütfen daha sonra tekrar deneyin",
+                                    headers={"Retry-After": str(OVERLOAD_RETRY_AFTER)})
+            charged[0] += size
+        return message
+
+    return metered
+
+
+class AdmissionMiddleware:
+    """AdmissionController'ı her HTTP isteğine uygulayan ASGI middleware"""
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        controller = self.controller
+        if controller.state.backend == "memory":
+            wait = controller.check_rate(client_key(scope))
+        else:
+            # SQLite/Redis çağrısı event loop'u bloklamasın
+            wait = await run_in_threadpool(controller.check_rate, client_key(scope))
+        if wait > 0:
+            controller.reject("rate_limited")
+            await _reject(scope, receive, send, 429, "İstek limiti aşıldı, lütfen daha sonra tekrar deneyin", wait)
+            return
+
+        body_bytes = _body_size(scope)
+        head_only = scope["path"] in HEAD_ONLY_PATHS
+        if body_bytes is not None and body_bytes > MAX_BODY_BYTES and not head_only:
+            # Content-Length sınırı aşıyor: gövde (multipart spool dahil) hiç okunmadan reddet
+            controller.reject("too_large")
+            await _reject(scope, receive, send, 413, f"Dosya çok büyük. Maksimum boyut: {MAX_UPLOAD_MB} MB")
+            return
+        analysis = scope["method"] == "POST" and scope["path"] in ANALYSIS_PATHS
+        charged = [0]
+        if body_bytes is None:
+            # Uzunluk bilinmiyor: baştan maksimum yükleme ayırmak yerine okundukça ayır
+            receive = _metered_receive(receive, controller, charged, None if head_only else MAX_BODY_BYTES)
+            body_bytes = 0
+        reason = controller.acquire(body_bytes, analysis)
+        if reason is not None:
+            controller.reject(reason)
+            await _reject(scope, receive, send, 503, "Sunucu şu an yoğun, lütfen daha sonra tekrar deneyin",
+                          OVERLOAD_RETRY_AFTER)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.release(body_bytes + charged[0], analysis)
+
+
+async def _reject(scope, receive, send, status_code: int, detail: str, retry_after: Optional[float] = None):
+    headers = {"Retry-After": str(max(1, int(retry_after + 0.999)))} if retry_after is not None else None
+    response = FastJSONResponse({"detail": detail}, status_code=status_code, headers=headers)
+    await response(scope, receive, send)
@@ -0,0 +1,75 @@
+# benchmarks/common.py
+import json
+import os
+import platform
+import resource
+import sys
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+# Repo kökünü import yoluna ekle (python benchmarks/xxx.py ile çalıştırma için)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Sıralı listeden yüzdelik (lineer interpolasyon)"""
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100.0
+    lower = int(k)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (k - lower)
+
+
+def peak_rss_mb() -> float:
+    """Process'in en yüksek bellek kullanımı (MB)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux KB, macOS byte döner
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / divisor, 2)
+
+
+def environment() -> Dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }
+
+
+def write_json(result: Dict, path: Optional[str]):
+    """Sonucu dosyaya (veya stdout'a) JSON olarak yaz"""
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+def compare_to_baseline(current: Dict[str, float], baseline_path: str, tolerance: float,
+                        higher_is_better=()) -> List[str]:
+    """
+    Baseline JSON ile karşılaştır, toleransı aşan gerilemeleri döndür
+
+    Varsayılan olarak metrikler süredir (düşük = iyi); higher_is_better içindekiler
+    (ör. throughput) ters yönde değerlendirilir.
+    """
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f).get("metrics", {})
+
+    regressions = []
+    for name, value in current.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if name in higher_is_better:
+            change = (base - value) / base
+        else:
+            change = (value - base) / base
+        if change > tolerance:
+            regressions.append(f"{name}: {base} -> {value} ({change:+.1%})")
+    return regressions
@@ -0,0 +1,127 @@
+# benchmarks/load_test.py
+"""
+Process içi ASGI yük testi (ağ yok, gerçek endpoint'ler)
+
+Kullanım:
+    python benchmarks/load_test.py --endpoint /quick-score --requests 500 \\
+        --concurrency 32 --size-kb 1024 [--unique] [--out load.json]
+        [--baseline load_baseline.json --tolerance 0.2]
+
+Sentetik video yüklemeleri üretir, uygulamayı httpx.ASGITransport ile doğrudan
+çağırır ve p50/p95/p99 gecikme, throughput ve peak RSS değerlerini JSON olarak
+raporlar. --unique ile her istek farklı içerik taşır (cache hit olmaz).
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from typing import Dict
+
+from common import compare_to_baseline, environment, peak_rss_mb, percentile, write_json
+
+import httpx
+
+UPLOAD_ENDPOINTS = ("/analyze-video", "/quick-score", "/test-upload", "/jobs")
+
+
+async def run(app, endpoint: str, total: int, concurrency: int, size_kb: int, unique: bool) -> Dict:
+    body = os.urandom(size_kb * 1024)
+    latencies = []
+    statuses: Dict[int, int] = {}
+    counter = iter(range(total))
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+
+            async def worker():
+                for i in counter:
+                    content = (i.to_bytes(8, "big") + body[8:]) if unique else body
+                    started = time.perf_counter()
+                    if endpoint in UPLOAD_ENDPOINTS:
+                        response = await client.post(
+                            endpoint, files={"file": (f"bench_{i}.mp4", content, "video/mp4")}
+                        )
+                    else:
+                        response = await client.get(endpoint)
+                    latencies.append(time.perf_counter() - started)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ms = lambda seconds: round(seconds * 1000, 3)
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "size_kb": size_kb,
+        "unique_payloads": unique,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "throughput_mb_s": round(total * size_kb / 1024 / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": ms(percentile(latencies, 50)),
+            "p95": ms(percentile(latencies, 95)),
+            "p99": ms(percentile(latencies, 99)),
+            "max": ms(latencies[-1]) if latencies else 0.0
+        },
+        "status_codes": {str(code): count for code, count in sorted(statuses.items())}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ViralCheck ASGI yük testi")
+    parser.add_argument("--endpoint", default="/quick-score")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--size-kb", type=int, default=256, help="Sentetik yükleme boyutu (KB)")
+    parser.add_argument("--unique", action="store_true", help="Her istekte farklı içerik gönder")
+    parser.add_argument("--workdir", help="uploads/ ve cache/ için çalışma klasörü (varsayılan: geçici)")
+    parser.add_argument("--out", help="JSON çıktı dosyası (varsayılan: stdout)")
+    parser.add_argument("--baseline", help="Karşılaştırılacak önceki JSON çıktısı")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="İzin verilen gerileme oranı")
+    args = parser.parse_args()
+
+    out = os.path.abspath(args.out) if args.out else None
+    baseline = os.path.abspath(args.baseline) if args.baseline else None
+
+    # Tüm istekler tek istemciden gelir; istemci başına rate limit ölçümü bozmasın
+    os.environ.setdefault("RATE_LIMIT_PER_MINUTE", "0")
+
+    # Uygulama uploads/ ve cache/ klasörlerini çalışma dizinine açar
+    os.chdir(args.workdir or tempfile.mkdtemp(prefix="viralcheck-bench-"))
+    from main import app
+
+    stats = asyncio.run(run(app, args.endpoint, args.requests, args.concurrency, args.size_kb, args.unique))
+    metrics = {
+        "p50_ms": stats["latency_ms"]["p50"],
+        "p95_ms": stats["latency_ms"]["p95"],
+        "p99_ms": stats["latency_ms"]["p99"],
+        "throughput_rps": stats["throughput_rps"]
+    }
+    result = {
+        "suite": "load",
+        "endpoint": args.endpoint,
+        "environment": environment(),
+        "stats": stats,
+        "metrics": metrics,
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+    regressions = []
+    if baseline:
+        regressions = compare_to_baseline(metrics, baseline, args.tolerance,
+                                          higher_is_better=("throughput_rps",))
+        result["regressions"] = regressions
+
+    write_json(result, out)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# benchmarks/micro.py
+"""
+Scorer, rapor üretici, yanıt serileştirme, trend/zamanlama ve duygu analizi için mikro benchmark'lar
+
+Kullanım:
+    python benchmarks/micro.py [--repeat 2000] [--out micro.json]
+                               [--baseline micro_baseline.json --tolerance 0.2]
+
+Her ölçüm için çağrı başına süre (µs) JSON olarak raporlanır. --baseline verilirse
+toleransı aşan gerilemelerde çıkış kodu 1 olur.
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict
+
+from common import compare_to_baseline, environment, peak_rss_mb, write_json
+
+import numpy as np
+from fastapi.responses import JSONResponse
+
+from emotion_analyzer import get_model
+from json_response import FastJSONResponse
+from report_generator import ReportGenerator
+from scorer_config import ScorerConfig
+from timing_engine import TimingEngine
+from trend_index import TrendIndex
+from viral_scorer import EMOTION_LABELS, ViralScorer
+
+SAMPLE_TEXT = "Video analysis for clip.mp4. Exciting content with surprise elements and joyful moments."
+
+
+def _bench(func: Callable[[], object], repeat: int, rounds: int = 5) -> Dict:
+    """Fonksiyonu rounds x repeat kez çalıştır, çağrı başına süreyi (µs) döndür"""
+    func()  # ısınma
+    per_call = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        per_call.append((time.perf_counter() - started) / repeat * 1e6)
+    return {
+        "median_us": round(statistics.median(per_call), 3),
+        "min_us": round(min(per_call), 3),
+        "max_us": round(max(per_call), 3),
+        "calls": repeat * rounds
+    }
+
+
+def _synthetic_trends(terms: int) -> TrendIndex:
+    """1-3 kelimelik rastgele terimlerden trend indeksi"""
+    rng = random.Random(1)
+    vocab = [f"tok{i}" for i in range(max(terms // 5, 10))]
+    index = TrendIndex(path="")
+    index.load({"term": " ".join(rng.choice(vocab) for _ in range(rng.randint(1, 3))), "weight": rng.random()}
+               for _ in range(terms))
+    return index
+
+
+def run(repeat: int, batch_size: int, trend_terms: int) -> Dict:
+    random.seed(0)
+    scorer = ViralScorer()
+    reporter = ReportGenerator()
+    model = get_model()
+
+    emotions = model.predict_vectors([SAMPLE_TEXT])[0]
+    legacy_emotions = [emotions.to_results()]
+    viral_data = scorer.calculate_score(emotions)
+    matrix = np.random.default_rng(0).random((batch_size, len(EMOTION_LABELS)))
+    texts = [f"{SAMPLE_TEXT} #{i}" for i in range(batch_size)]
+    batch_repeat = max(1, repeat // batch_size)
+    trends = _synthetic_trends(trend_terms)
+    trend_text = SAMPLE_TEXT + " " + " ".join(f"tok{i}" for i in range(0, 200, 10))
+    timing = TimingEngine(path="")
+    timing.reload()
+    posted_at = datetime(2025, 1, 7, 19, 30)
+    variants = ScorerConfig(path="")
+    variants.load([{"name": "control", "traffic": 0.9}, {"name": "candidate", "traffic": 0.1}])
+
+    results = {
+        "scorer.calculate_score": _bench(lambda: scorer.calculate_score(emotions), repeat),
+        # API biçimindeki (sözlük listesi) girdi: vektöre dönüşüm dahil
+        "scorer.calculate_score_results": _bench(lambda: scorer.calculate_score(legacy_emotions), repeat),
+        "scorer.calculate_scores_batch": _bench(lambda: scorer.calculate_scores_batch(matrix), batch_repeat),
+        "report.generate_report": _bench(lambda: reporter.generate_report(viral_data, "clip.mp4"), repeat),
+        # Rapor + yanıt gövdesi: stdlib json ve uygulamanın yanıt sınıfı (orjson) ile
+        "report.response_stdlib": _bench(
+            lambda: JSONResponse({"report": reporter.generate_report(viral_data, "clip.mp4")}).body, repeat),
+        "report.response_fast": _bench(
+            lambda: FastJSONResponse({"report": reporter.generate_report(viral_data, "clip.mp4")}).body, repeat),
+        "trend.score": _bench(lambda: trends.score(trend_text), repeat),
+        "timing.score": _bench(lambda: timing.score(posted_at, "Europe/Istanbul", "tiktok"), repeat),
+        "timing.best_windows": _bench(lambda: timing.best_windows(posted_at, "Europe/Istanbul", "tiktok"), repeat),
+        "scorer_config.pick": _bench(lambda: variants.pick("9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822c"), repeat),
+        "emotion.predict_single": _bench(lambda: model.predict_batch([SAMPLE_TEXT]), repeat),
+        "emotion.predict_batch": _bench(lambda: model.predict_batch(texts), batch_repeat),
+        "emotion.predict_vectors": _bench(lambda: model.predict_vectors(texts), batch_repeat),
+    }
+    # Batch ölçümlerini öğe başına da ver
+    for name in ("scorer.calculate_scores_batch", "emotion.predict_batch", "emotion.predict_vectors"):
+        results[name]["per_item_us"] = round(results[name]["median_us"] / batch_size, 3)
+        results[name]["batch_size"] = batch_size
+    results["trend.score"]["terms"] = trends.status()["terms"]
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ViralCheck mikro benchmark")
+    parser.add_argument("--repeat", type=int, default=2000, help="Tur başına çağrı sayısı")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Batch ölçümleri için öğe sayısı")
+    parser.add_argument("--trend-terms", type=int, default=100000, help="Trend indeksindeki terim sayısı")
+    parser.add_argument("--out", help="JSON çıktı dosyası (varsayılan: stdout)")
+    parser.add_argument("--baseline", help="Karşılaştırılacak önceki JSON çıktısı")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="İzin verilen gerileme oranı")
+    args = parser.parse_args()
+
+    benchmarks = run(args.repeat, args.batch_size, args.trend_terms)
+    metrics = {name: data["median_us"] for name, data in benchmarks.items()}
+    result = {
+        "suite": "micro",
+        "environment": environment(),
+        "benchmarks": benchmarks,
+        "metrics": metrics,
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+    regressions = []
+    if args.baseline:
+        regressions = compare_to_baseline(metrics, args.baseline, args.tolerance)
+        result["regressions"] = regressions
+
+    write_json(result, args.out)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# benchmarks/startup.py
+"""
+Açılış profili: import süresi dağılımı ve ilk başarılı isteğe kadar geçen süre
+
+Kullanım:
+    python benchmarks/startup.py [--runs 5] [--top 15] [--port 8765]
+                                 [--target-seconds 2.0] [--out startup.json]
+
+1. `python -X importtime -c "import main"` runs kez çalıştırılır; modül başına
+   kümülatif süreler (medyan) büyükten küçüğe raporlanır.
+2. uvicorn ayrı process'te başlatılır; process başlangıcından /health'in 200
+   dönmesine ve ilk başarılı skor isteğine (/quick-score/metadata) kadar
+   geçen süre ölçülür. Isınma durumu /health'ten alınır.
+
+--target-seconds verilirse ilk skor isteği bu süreyi aşınca çıkış kodu 1 olur.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List, Optional
+
+from common import ROOT, environment, write_json
+
+SAMPLE_METADATA = {"filename": "clip.mp4", "duration_seconds": 21.5, "width": 1080, "height": 1920,
+                   "video_codec": "h264", "audio_codec": "aac", "size_bytes": 8_000_000}
+
+
+def import_times(runs: int) -> Dict[str, float]:
+    """Modül başına kümülatif import süresi (ms, runs ölçümün medyanı)"""
+    samples: Dict[str, List[float]] = {}
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=ROOT,
+                              capture_output=True, text=True, check=True)
+        # Satır: "import time:  self [us] | cumulative | imported package"
+        for line in proc.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, name = line[len("import time:"):].split("|")
+            samples.setdefault(name.strip(), []).append(int(cumulative) / 1000)
+    return {name: round(statistics.median(values), 2) for name, values in samples.items()}
+
+
+def _request(url: str, body: Optional[Dict] = None):
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=5) as response:
+        return response.status, json.loads(response.read())
+
+
+def first_request(port: int, timeout: float) -> Dict:
+    """Sunucuyu başlat; /health ve ilk skor isteğinin process başlangıcına göre süresi (sn)"""
+    base = f"http://127.0.0.1:{port}"
+    env = {**os.environ, "RATE_LIMIT_PER_MINUTE": "0"}
+    workdir = tempfile.mkdtemp(prefix="viralcheck-startup-")  # uploads/ ve cache/ buraya açılır
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--app-dir", ROOT,
+                             "--port", str(port), "--log-level", "warning"],
+                            cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    result: Dict = {}
+    try:
+        while time.perf_counter() - started < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"Sunucu kapandı (çıkış kodu {proc.returncode})")
+            try:
+                if "health_s" not in result:
+                    status, _ = _request(f"{base}/health")
+                    if status == 200:
+                        result["health_s"] = round(time.perf_counter() - started, 3)
+                status, body = _request(f"{base}/quick-score/metadata", SAMPLE_METADATA)
+                if status == 200 and "viral_score" in body:
+                    result["first_score_s"] = round(time.perf_counter() - started, 3)
+                    break
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.01)
+        else:
+            raise RuntimeError(f"{timeout} sn içinde başarılı istek alınamadı")
+
+        # Arka plan ısınmasının bitmesini bekle (ölçüme dahil değil, rapor için)
+        while time.perf_counter() - started < timeout:
+            _, health = _request(f"{base}/health")
+            if health.get("warmup", {}).get("status") != "pending":
+                result["warmup"] = health["warmup"]
+                break
+            time.sleep(0.05)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ViralCheck açılış profili")
+    parser.add_argument("--runs", type=int, default=5, help="Import süresi ölçüm sayısı")
+    parser.add_argument("--top", type=int, default=15, help="Raporlanacak en yavaş modül sayısı")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=60.0, help="Sunucunun hazır olması için üst sınır (sn)")
+    parser.add_argument("--target-seconds", type=float, help="İlk skor isteği için hedef süre")
+    parser.add_argument("--out", help="JSON çıktı dosyası (varsayılan: stdout)")
+    args = parser.parse_args()
+
+    times = import_times(args.runs)
+    slowest = sorted(((name, ms) for name, ms in times.items() if name != "main"),
+                     key=lambda item: item[1], reverse=True)[:args.top]
+    result = {
+        "suite": "startup",
+        "environment": environment(),
+        "import_main_ms": times.get("main"),
+        "slowest_imports_ms": dict(slowest),
+        "first_request": first_request(args.port, args.timeout)
+    }
+
+    failed = (args.target_seconds is not None
+              and result["first_request"]["first_score_s"] > args.target_seconds)
+    if args.target_seconds is not None:
+        result["target_seconds"] = args.target_seconds
+        result["target_met"] = not failed
+
+    write_json(result, args.out)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
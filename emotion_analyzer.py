@@ -1,53 +1,260 @@
-# emotion_analyzer.py - LITE VERSION (No Heavy Model)
+# emotion_analyzer.py - Hafif CPU modeli (lexicon + lineer skor)
 
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-import random
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, Optional
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+
+from emotion_vector import EMOTION_LABELS, EmotionVector
+
+if TYPE_CHECKING:
+    import numpy as np  # Model kütüphaneleri ilk yüklemede import edilir (get_model)
+
+# Ayarlar (ortam değişkenleri ile değiştirilebilir)
+MODEL_PATH = os.getenv(
+    "EMOTION_MODEL_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "emotion_lexicon.json")
+)
+BATCH_WINDOW_MS = float(os.getenv("EMOTION_BATCH_WINDOW_MS", "3"))
+MAX_BATCH_SIZE = int(os.getenv("EMOTION_MAX_BATCH", "64"))
+INFERENCE_THREADS = int(os.getenv("EMOTION_THREADS", "2"))
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
 
 router = APIRouter()
 
 class EmotionRequest(BaseModel):
     text: str
 
+
+class EmotionModel:
+    """
+    Lexicon tabanlı lineer duygu sınıflandırıcı
+
+    Her kelimenin duygu ağırlıkları toplanır, etiket başına bias eklenir ve
+    sigmoid ile 0-1 arası bağımsız skorlar üretilir (çok etiketli). Türkçe
+    ekler için bilinmeyen kelimenin en uzun bilinen ön eki (kök) aranır.
+    """
+
+    def __init__(self, path: str = MODEL_PATH):
+        import numpy as np
+
+        with open(path, encoding="utf-8") as f:
+            spec = json.load(f)
+        self.name = spec["name"]
+        self.version = spec["version"]
+        self.labels = list(spec["labels"])
+        self.min_stem_length = spec.get("min_stem_length", 4)
+        self.neutral_damping = spec.get("neutral_damping", 0.0)
+        self._neutral = self.labels.index("neutral") if "neutral" in self.labels else None
+        # Etiketler standart sıradaysa vektörler paylaşılan tuple'ı kullanır
+        self._vector_labels = EMOTION_LABELS if tuple(self.labels) == EMOTION_LABELS else tuple(self.labels)
+
+        # Kelime -> satır indeksi, ağırlıklar V x L matrisinde
+        vocab = spec["weights"]
+        self._index = {word: i for i, word in enumerate(vocab)}
+        self._weights = np.zeros((len(vocab), len(self.labels)))
+        for word, i in self._index.items():
+            for label, weight in vocab[word].items():
+                self._weights[i, self.labels.index(label)] = weight
+        self._bias = np.array([spec["bias"].get(label, 0.0) for label in self.labels])
+        self._max_word_length = max((len(word) for word in vocab), default=0)
+
+    def _lookup(self, token: str) -> Optional[int]:
+        """Kelimeyi veya en uzun bilinen kökünü bul"""
+        index = self._index.get(token)
+        if index is not None:
+            return index
+        for end in range(min(len(token) - 1, self._max_word_length), self.min_stem_length - 1, -1):
+            index = self._index.get(token[:end])
+            if index is not None:
+                return index
+        return None
+
+    def _features(self, text: str) -> "np.ndarray":
+        """Metindeki bilinen kelimelerin ağırlık toplamı"""
+        import numpy as np
+
+        rows = [i for i in map(self._lookup, TOKEN_RE.findall(text.lower())) if i is not None]
+        if not rows:
+            return np.zeros(len(self.labels))
+        return self._weights[rows].sum(axis=0)
+
+    def predict_batch(self, texts: List[str]) -> List[List[Dict]]:
+        """Birden fazla metni tek seferde skorla (API biçimi: [{"label", "score"}, ...])"""
+        return [vector.to_results() for vector in self.predict_vectors(texts)]
+
+    def predict_vectors(self, texts: List[str]) -> List[EmotionVector]:
+        """Birden fazla metni tek seferde skorla (pipeline içi kompakt sonuç)"""
+        import numpy as np
+
+        features = np.stack([self._features(text) for text in texts])
+        logits = features + self._bias
+        if self._neutral is not None:
+            # Duygusal kelimeler arttıkça nötr skor düşer
+            evidence = np.delete(features, self._neutral, axis=1).clip(min=0).sum(axis=1)
+            logits[:, self._neutral] -= self.neutral_damping * evidence
+        probs = 1.0 / (1.0 + np.exp(-logits))
+        labels = self._vector_labels
+        return [EmotionVector(row, labels) for row in probs.tolist()]
+
+
+# --- Lazy yükleme ---
+
+_model: Optional[EmotionModel] = None
+_model_lock = threading.Lock()
+_model_state = {"state": "not_loaded", "load_seconds": None, "error": None}
+
+
+def get_model() -> EmotionModel:
+    """Modeli ilk kullanımda yükle"""
+    global _model
+    if _model is not None:
+        return _model
+    with _model_lock:
+        if _model is None:
+            _model_state["state"] = "loading"
+            started = time.perf_counter()
+            try:
+                _model = EmotionModel()
+            except Exception as e:
+                _model_state.update(state="error", error=str(e))
+                raise
+            _model_state.update(
+                state="loaded",
+                load_seconds=round(time.perf_counter() - started, 4),
+                error=None
+            )
+    return _model
+
+
+def model_status() -> Dict:
+    """/health için model durumu"""
+    status = dict(_model_state)
+    if _model is not None:
+        status.update(name=_model.name, version=_model.version)
+    status["batcher"] = _batcher.stats() if _batcher is not None else None
+    return status
+
+
+# --- Mikro-batch ---
+
+class MicroBatcher:
+    """
+    Eşzamanlı istekleri birkaç milisaniye içinde toplayıp tek model çağrısı yapar
+
+    Model çağrısı thread pool'da çalışır, event loop serbest kalır.
+    """
+
+    def __init__(self, window_ms: float = BATCH_WINDOW_MS, max_batch: int = MAX_BATCH_SIZE,
+                 threads: int = INFERENCE_THREADS):
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="emotion")
+        self.batches = 0
+        self.items = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop = None
+        self._task = None
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Yeni event loop (ör. test client) için kuyruğu yeniden kur
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run())
+
+    async def submit(self, text: str) -> EmotionVector:
+        self._ensure_started()
+        future = self._loop.create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            texts = [text for text, _ in batch]
+            try:
+                model = await loop.run_in_executor(self.executor, get_model)
+                results = await loop.run_in_executor(self.executor, model.predict_vectors, texts)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.items += len(batch)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self) -> Dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0
+        }
+
+
+_batcher: Optional[MicroBatcher] = None
+
+
+def get_batcher() -> MicroBatcher:
+    global _batcher
+    if _batcher is None:
+        _batcher = MicroBatcher()
+    return _batcher
+
+
 @router.post("/emotion-analyze")
 async def analyze_emotion(request: EmotionRequest):
-    """Basit duygu analizi (demo mode)"""
+    """Metin duygu analizi (lexicon modeli)"""
     try:
         text = request.text
-        
+
         if not text or len(text.strip()) < 3:
             raise HTTPException(status_code=400, detail="Metin çok kısa")
-        
-        # Demo duygular (gerçek model olmadan)
-        emotions = [
-            {"label": "joy", "score": random.uniform(0.3, 0.8)},
-            {"label": "surprise", "score": random.uniform(0.2, 0.6)},
-            {"label": "neutral", "score": random.uniform(0.1, 0.4)},
-            {"label": "sadness", "score": random.uniform(0.05, 0.2)},
-            {"label": "anger", "score": random.uniform(0.05, 0.2)},
-            {"label": "fear", "score": random.uniform(0.05, 0.2)},
-            {"label": "disgust", "score": random.uniform(0.05, 0.15)}
-        ]
-        
+
+        vector = await get_batcher().submit(text)
+        model = get_model()
+
+        # API sınırı: kompakt sonuç eski biçime çevrilir
+        emotions = vector.to_results()
         return {
             "success": True,
             "input": text,
             "emotions": emotions,
-            "dominant_emotion": max(emotions, key=lambda x: x['score']),
-            "note": "Demo mode - using simulated emotions"
+            "dominant_emotion": {"label": vector.labels[vector.dominant], "score": vector.scores[vector.dominant]},
+            "model": f"{model.name}@{model.version}"
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-def analyze_text_emotion(text: str):
-    """Internal kullanım için basit duygu analizi"""
-    emotions = [[
-        {"label": "joy", "score": random.uniform(0.4, 0.9)},
-        {"label": "surprise", "score": random.uniform(0.3, 0.7)},
-        {"label": "neutral", "score": random.uniform(0.1, 0.3)},
-        {"label": "sadness", "score": random.uniform(0.05, 0.2)},
-        {"label": "anger", "score": random.uniform(0.05, 0.2)},
-        {"label": "fear", "score": random.uniform(0.05, 0.2)},
-        {"label": "disgust", "score": random.uniform(0.05, 0.15)}
-    ]]
-    return emotions
+def analyze_text_emotion(text: str) -> EmotionVector:
+    """Internal kullanım için duygu analizi (senkron)"""
+    return get_model().predict_vectors([text])[0]
+
+async def analyze_text_emotion_async(text: str) -> EmotionVector:
+    """Internal kullanım için duygu analizi (mikro-batch, event loop'u bloklamaz)"""
+    return await get_batcher().submit(text)
@@ -0,0 +1,98 @@
+# emotion_vector.py
+"""
+Kompakt duygu sonucu
+
+Duygu skorları sabit etiket sırasıyla tek bir float dizisinde (array('d'))
+tutulur; etiket adları paylaşılan tuple'dan gelir. Skora göre sıralama
+oluşturulurken bir kez yapılır: baskın duygu ve ilk k duygu bu sıradan okunur,
+scorer yardımcıları yeniden sıralamaz. Bir sonuç 7 sözlük yerine iki nesnedir.
+
+API sınırındaki [{"label", "score"}, ...] biçimine to_results /
+from_results ile dönüştürülür.
+"""
+from array import array
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+# Modelin ve batch matrisinin sütun sırası
+EMOTION_LABELS = ("joy", "surprise", "neutral", "sadness", "anger", "fear", "disgust")
+
+_LABEL_INDEX = {label: i for i, label in enumerate(EMOTION_LABELS)}
+
+
+class EmotionVector:
+    """
+    Sabit sıralı duygu skorları ve skora göre sıra
+
+    order yalnızca sonuçta bulunan etiketlerin indekslerini içerir (eksik
+    etiket skor 0 olarak saklanır ama sıralamaya girmez); eşit skorlarda
+    girdi sırası korunur (sorted ile aynı, kararlı sıralama).
+    """
+
+    __slots__ = ("labels", "scores", "order")
+
+    def __init__(self, scores: Sequence[float], labels: Tuple[str, ...] = EMOTION_LABELS,
+                 present: Optional[Sequence[int]] = None):
+        self.labels = labels
+        self.scores = scores if isinstance(scores, array) else array("d", scores)
+        indices = range(len(self.scores)) if present is None else present
+        self.order: Tuple[int, ...] = tuple(sorted(indices, key=self.scores.__getitem__, reverse=True))
+
+    @classmethod
+    def from_results(cls, results: Iterable[Dict]) -> "EmotionVector":
+        """[{"label", "score"}, ...] listesinden (bilinmeyen etiket varsa girdinin etiketleriyle)"""
+        results = list(results)
+        if all(item["label"] in _LABEL_INDEX for item in results):
+            scores = array("d", [0.0]) * len(EMOTION_LABELS)
+            present = []
+            for item in results:
+                index = _LABEL_INDEX[item["label"]]
+                scores[index] = item["score"]
+                present.append(index)
+            return cls(scores, EMOTION_LABELS, present)
+        return cls([item["score"] for item in results], tuple(item["label"] for item in results))
+
+    @classmethod
+    def from_mapping(cls, mapping: Mapping[str, float]) -> "EmotionVector":
+        """{etiket: skor} sözlüğünden"""
+        return cls.from_results({"label": label, "score": score} for label, score in mapping.items())
+
+    @classmethod
+    def coerce(cls, emotions) -> Optional["EmotionVector"]:
+        """
+        Scorer girdisini vektöre çevir (boşsa None)
+
+        EmotionVector olduğu gibi döner; eski [[{"label", "score"}, ...]]
+        biçiminde ilk duygu seti kullanılır.
+        """
+        if isinstance(emotions, cls):
+            return emotions if emotions.order else None
+        if not emotions or not emotions[0]:
+            return None
+        first = emotions[0]
+        return first if isinstance(first, cls) else cls.from_results(first)
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def __getitem__(self, label: str) -> float:
+        return self.scores[self.labels.index(label)]
+
+    @property
+    def dominant(self) -> Optional[int]:
+        """En yüksek skorlu etiketin indeksi (max ile aynı: eşitlikte ilk gelen)"""
+        return self.order[0] if self.order else None
+
+    def top(self, k: int) -> Tuple[int, ...]:
+        """En yüksek skorlu k etiketin indeksleri"""
+        return self.order[:k]
+
+    def to_results(self) -> List[Dict]:
+        """API biçimi: [{"label", "score"}, ...] (etiket sırasıyla)"""
+        scores, labels = self.scores, self.labels
+        return [{"label": labels[i], "score": scores[i]} for i in sorted(self.order)]
+
+    def to_dict(self) -> Dict[str, float]:
+        return {self.labels[i]: self.scores[i] for i in sorted(self.order)}
+
+    def __repr__(self) -> str:
+        return f"EmotionVector({self.to_dict()!r})"
@@ -0,0 +1,299 @@
+# job_queue.py
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from structured_log import get_logger, log_event
+
+logger = get_logger("viralcheck.jobs")
+
+# Ayarlar (ortam değişkenleri ile değiştirilebilir)
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", "cache/jobs.sqlite3")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))  # Worker'ı çökerten iş sonsuza dek denenmesin
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))  # Biten işlerin saklanma süresi
+JOB_PRUNE_INTERVAL = 3600.0  # sn
+
+FINAL_STATUSES = ("done", "failed")
+
+# handler(payload, progress) -> sonuç; progress(stage, yüzde) ilerlemeyi kaydeder
+ProgressCallback = Callable[[str, int], None]
+JobHandler = Callable[[Dict, ProgressCallback], Awaitable[Dict]]
+
+
+class JobQueue:
+    """
+    SQLite tabanlı kalıcı iş kuyruğu
+
+    İşler diske yazılır, restart sonrası yarım kalanlar tekrar kuyruğa alınır.
+    Sınırlı sayıda async worker kuyruktan iş çeker ve handler'ı çalıştırır.
+    İş sahiplenme SQLite transaction'ı ile yapıldığı için aynı veritabanını
+    kullanan birden fazla process güvenle çalışabilir.
+
+    Senkron metotlar veritabanını doğrudan kullanır; worker'lar ve async
+    metotlar aynı çağrıları tek thread'lik bir executor'da çalıştırır (kilitli
+    veritabanı event loop'u durdurmaz, ilerleme yazımları sırasını korur).
+    Lease dolduğunda JOB_MAX_ATTEMPTS denemeye ulaşmış iş tekrar kuyruğa
+    alınmaz, 'failed' olur; biten işler JOB_RETENTION_SECONDS sonra silinir.
+    """
+
+    def __init__(self, handler: JobHandler, db_path: str = JOB_DB_PATH, workers: int = JOB_WORKERS):
+        self.handler = handler
+        self.db_path = db_path
+        self.workers = workers
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks = []
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="jobs-db")
+        self._pruned_at = 0.0
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """Process başına bağlantı (preload ile fork edilen worker'lar kendi bağlantısını açar)"""
+        if self._pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, status TEXT NOT NULL, stage TEXT, progress INTEGER NOT NULL DEFAULT 0, "
+                "payload TEXT NOT NULL, result TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, "
+                "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at)")
+            self._connection, self._pid = conn, os.getpid()
+        return self._connection
+
+    def _db(self, func, *args, **kwargs) -> "asyncio.Future":
+        """Veritabanı çağrısını event loop dışında, gönderilme sırasıyla çalıştır"""
+        return asyncio.get_running_loop().run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    # --- Kuyruk yönetimi ---
+
+    async def start(self):
+        """Yarım kalan işleri kuyruğa geri al ve worker'ları başlat"""
+        await self._db(self.requeue_stale)
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def stop(self):
+        """Worker'ları durdur (yarım kalan işler lease dolunca tekrar kuyruğa alınır)"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def requeue_stale(self) -> int:
+        """
+        Lease süresi içinde güncellenmemiş 'running' işleri tekrar 'queued' yap
+
+        Deneme hakkı biten işler (ör. her seferinde worker'ı çökertenler) 'failed' olur.
+        """
+        now = time.time()
+        cutoff = now - JOB_LEASE_SECONDS
+        with self._lock:
+            exhausted = self._conn.execute(
+                "UPDATE jobs SET status = 'failed', stage = 'failed', error = ?, updated_at = ? "
+                "WHERE status = 'running' AND updated_at <= ? AND attempts >= ?",
+                (f"İş {JOB_MAX_ATTEMPTS} denemede tamamlanamadı", now, cutoff, JOB_MAX_ATTEMPTS)
+            ).rowcount
+            requeued = self._conn.execute(
+                "UPDATE jobs SET status = 'queued', stage = 'requeued' "
+                "WHERE status = 'running' AND updated_at <= ?",
+                (cutoff,)
+            ).rowcount
+        if exhausted:
+            log_event(logger, "jobs_attempts_exhausted", logging.WARNING, count=exhausted,
+                      max_attempts=JOB_MAX_ATTEMPTS)
+        if requeued:
+            log_event(logger, "jobs_requeued", logging.WARNING, count=requeued)
+        return requeued
+
+    def prune(self, retention: float = JOB_RETENTION_SECONDS) -> int:
+        """Saklama süresi dolmuş bitmiş işleri sil"""
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?",
+                (time.time() - retention,)
+            )
+        return cur.rowcount
+
+    def _maintain(self):
+        """Boşta iken: bayat işleri kuyruğa al, saatte bir eski işleri sil"""
+        self.requeue_stale()
+        if time.time() - self._pruned_at >= JOB_PRUNE_INTERVAL:
+            self._pruned_at = time.time()
+            self.prune()
+
+    def submit(self, payload: Dict) -> str:
+        """Yeni iş ekle, iş ID'sini döndür"""
+        job_id = self._insert(payload)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    async def submit_async(self, payload: Dict) -> str:
+        """submit (veritabanı yazımı event loop dışında)"""
+        job_id = await self._db(self._insert, payload)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    def _insert(self, payload: Dict) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, stage, payload, created_at, updated_at) "
+                "VALUES (?, 'queued', 'queued', ?, ?, ?)",
+                (job_id, json.dumps(payload), now, now)
+            )
+        return job_id
+
+    def submit_completed(self, payload: Dict, result: Dict) -> str:
+        """Sonucu zaten bilinen iş (ör. cache hit) için tamamlanmış kayıt oluştur"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, stage, progress, payload, result, created_at, updated_at) "
+                "VALUES (?, 'done', 'done', 100, ?, ?, ?, ?)",
+                (job_id, json.dumps(payload), json.dumps(result, ensure_ascii=False), now, now)
+            )
+        return job_id
+
+    async def submit_completed_async(self, payload: Dict, result: Dict) -> str:
+        return await self._db(self.submit_completed, payload, result)
+
+    async def get_async(self, job_id: str) -> Optional[Dict]:
+        return await self._db(self.get, job_id)
+
+    async def stats_async(self) -> Dict:
+        return await self._db(self.stats)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """İş durumunu getir"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            "job_id": row["id"],
+            "status": row["status"],
+            "stage": row["stage"],
+            "progress": row["progress"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"]
+        }
+
+    def stats(self) -> Dict:
+        """Duruma göre iş sayıları"""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {status: count for status, count in rows}
+        return {"workers": self.workers, **counts}
+
+    async def events(self, job_id: str, interval: float = 0.25) -> AsyncIterator[Dict]:
+        """İş her değiştiğinde güncel durumu üret (iş bitince durur)"""
+        last = None
+        while True:
+            job = await self.get_async(job_id)
+            if job is None:
+                return
+            state = (job["status"], job["stage"], job["progress"])
+            if state != last:
+                last = state
+                yield job
+            if job["status"] in FINAL_STATUSES:
+                return
+            await asyncio.sleep(interval)
+
+    # --- Worker ---
+
+    def _claim(self) -> Optional[sqlite3.Row]:
+        """Kuyruktaki en eski işi atomik olarak sahiplen"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, payload, attempts FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'running', stage = 'started', "
+                        "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                        (time.time(), row["id"])
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is not None:
+            log_event(logger, "job_claimed", job_id=row["id"], attempt=row["attempts"] + 1)
+        return row
+
+    def _update(self, job_id: str, **fields):
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    async def _worker(self, index: int):
+        while True:
+            row = await self._db(self._claim)
+            if row is None:
+                # Yeni iş gelene kadar (veya diğer process'ler için belirli aralıklarla) bekle
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    await self._db(self._maintain)
+                continue
+
+            job_id = row["id"]
+
+            def progress(stage: str, percent: int, job_id=job_id):
+                # Beklenmez: yazımlar executor'da sırayla yapılır
+                self._db(self._update, job_id, stage=stage, progress=percent)
+
+            heartbeat = asyncio.create_task(self._heartbeat(job_id))
+            try:
+                result = await self.handler(json.loads(row["payload"]), progress)
+                await self._db(
+                    self._update, job_id, status="done", stage="done", progress=100,
+                    result=json.dumps(result, ensure_ascii=False)
+                )
+                log_event(logger, "job_completed", job_id=job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception("job_failed", extra={"fields": {"job_id": job_id}})
+                await self._db(self._update, job_id, status="failed", stage="failed", error=str(e))
+            finally:
+                heartbeat.cancel()
+
+    async def _heartbeat(self, job_id: str):
+        """İş sürdükçe lease'i yenile (process ölürse iş başka worker'a geçer)"""
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+            await self._db(self._touch, job_id)
+
+    def _touch(self, job_id: str):
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET updated_at = ? WHERE id = ?", (time.time(), job_id))
@@ -0,0 +1,37 @@
+# json_response.py
+"""
+Hızlı JSON yanıt sınıfı
+
+orjson kuruluysa yanıt gövdesi orjson ile üretilir (stdlib json'dan birkaç kat
+hızlı, doğrudan bytes döner); kurulu değilse Starlette'in JSONResponse'u
+kullanılır. Çıktı her iki durumda da UTF-8'dir, Türkçe karakterler ve emojiler
+kaçışsız yazılır.
+"""
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson opsiyonel
+    orjson = None
+
+# NumPy değerleri ve str olmayan sözlük anahtarları da serileştirilsin
+_ORJSON_OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+
+class FastJSONResponse(JSONResponse):
+    """Uygulamanın varsayılan yanıt sınıfı"""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=_ORJSON_OPTIONS)
+
+
+def dumps(content: Any) -> str:
+    """FastJSONResponse ile aynı kodlayıcıyla metne çevir (SSE mesajları için)"""
+    if orjson is None:
+        return json.dumps(content, ensure_ascii=False)
+    return orjson.dumps(content, option=_ORJSON_OPTIONS).decode("utf-8")
@@ -1,23 +1,86 @@
 # main.py
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from typing import Optional
-import shutil
+from fastapi.responses import StreamingResponse, Response
+from starlette.concurrency import run_in_threadpool
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from pydantic import BaseModel, Field
+from contextlib import aclosing, asynccontextmanager
+from datetime import datetime
+import hashlib
+import json
+import logging
+import random
+import asyncio
 import os
-from pathlib import Path
+import sys
+import time
 
-from emotion_analyzer import router as emotion_router, analyze_text_emotion
-from viral_scorer import ViralScorer
+# .env modüller ayarlarını okumadan önce yüklenir (dosya yoksa python-dotenv hiç import edilmez)
+_ENV_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env")
+if os.path.exists(_ENV_FILE):
+    from dotenv import load_dotenv
+    load_dotenv(_ENV_FILE)
+
+from emotion_analyzer import (router as emotion_router, analyze_text_emotion_async,
+                              get_model, model_status)
+from viral_scorer import ViralScorer, EMOTION_LABELS, seeded_rng
 from report_generator import ReportGenerator
-from wiro_client import analyze_video
+from upload_stream import hash_upload, read_upload_head, MAX_UPLOAD_MB, CHUNK_SIZE
+from storage_manager import StorageManager
+from video_probe import probe_header, HEADER_PROBE_BYTES
+from video_features import VideoFeatureExtractor
+from trend_index import get_trend_index
+from scorer_config import get_scorer_config
+from timing_engine import get_timing_engine, resolve_timezone, MAX_WINDOWS as MAX_POSTING_WINDOWS
+from result_cache import create_cache, make_cache_key
+from wiro_cache import get_wiro_cache
+from shared_state import get_shared_state
+from job_queue import JobQueue
+import metrics
+from metrics import MetricsMiddleware, stage_timer, ANALYSES_IN_FLIGHT, VIRAL_SCORE
+from structured_log import get_logger, log_event
+from admission import AdmissionController, AdmissionMiddleware
+from json_response import FastJSONResponse, dumps as json_dumps
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Uygulama açılış/kapanış işlemleri"""
+    await storage.start()
+    await trend_index.start()
+    await scorer_config.start()
+    await job_queue.start()
+    warmup = asyncio.create_task(_warm_up()) if STARTUP_WARMUP else None
+    yield
+    if warmup is not None and not warmup.done():
+        warmup.cancel()
+        await asyncio.gather(warmup, return_exceptions=True)
+    await job_queue.stop()
+    await scorer_config.stop()
+    await trend_index.stop()
+    await storage.stop()
+    video_feature_extractor.shutdown()
+    # Wiro bağlantı havuzunu kapat (istemci hiç yüklenmediyse yapılacak bir şey yok)
+    if "wiro_client" in sys.modules:
+        await sys.modules["wiro_client"].close_async_client()
 
 app = FastAPI(
     title="ViralCheck AI - Video Viral Potansiyel Analizi",
     version="1.0.0",
-    description="Videolarınızın viral olma potansiyelini AI ile analiz edin"
+    description="Videolarınızın viral olma potansiyelini AI ile analiz edin",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan
 )
 
+logger = get_logger("viralcheck.api")
+
+# Kabul kontrolü: rate limit, eşzamanlı byte ve analiz sınırı (gövde okunmadan reddeder)
+admission = AdmissionController()
+app.add_middleware(AdmissionMiddleware, controller=admission)
+
+# İstek metrikleri
+app.add_middleware(MetricsMiddleware)
+
 # CORS ayarları
 app.add_middleware(
     CORSMiddleware,
@@ -27,13 +90,360 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Upload klasörünü oluştur
-UPLOAD_DIR = Path("uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
-
 # Servisler
-viral_scorer = ViralScorer()
-report_generator = ReportGenerator()
+storage = StorageManager()
+trend_index = get_trend_index()
+timing_engine = get_timing_engine()
+scorer_config = get_scorer_config()
+viral_scorer = ViralScorer(trends=trend_index, timing=timing_engine, config=scorer_config)
+report_generator = ReportGenerator(timing=timing_engine)
+result_cache = create_cache()
+video_feature_extractor = VideoFeatureExtractor()
+
+
+ALLOWED_EXTENSIONS = ['.mp4', '.mov', '.avi', '.mkv', '.webm']
+MAX_BATCH_ITEMS = int(os.getenv("MAX_BATCH_ITEMS", "10000"))
+
+# Deterministik mod: random kaynakları içerik hash'inden seed'lenir, zaman sabitlenir
+DETERMINISTIC_SCORING = os.getenv("DETERMINISTIC_SCORING", "0") == "1"
+SCORING_FIXED_TIME = os.getenv("SCORING_FIXED_TIME")  # ör. 2025-01-07T19:00:00
+
+# Açılışta ağır alt sistemleri (duygu modeli, Wiro istemcisi, video havuzu) arka planda yükle
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "1") == "1"
+_IMPORTED_AT = time.time()
+warmup_state: Dict = {"status": "disabled" if not STARTUP_WARMUP else "pending"}
+
+
+def _wiro():
+    """Wiro istemci modülü (ilk kullanımda yüklenir: requests/httpx açılışı yavaşlatmasın)"""
+    import wiro_client
+    return wiro_client
+
+
+async def _warm_up():
+    """
+    Lazy alt sistemleri istek beklemeden yükle
+
+    Sunucu bu sırada istek kabul eder; ısınma bitmeden gelen istek ilgili
+    alt sistemi kendisi yükler (aynı kilitli yükleyici, iki kez yüklenmez).
+    """
+    started = time.perf_counter()
+    stages = {}
+    try:
+        for name, load in (("emotion_model", get_model),
+                           ("wiro_client", _wiro if os.getenv("WIRO_API_KEY") else None),
+                           ("video_features", video_feature_extractor.warm_up)):
+            if load is None:
+                continue
+            stage_started = time.perf_counter()
+            await run_in_threadpool(load)
+            stages[name] = round(time.perf_counter() - stage_started, 3)
+        warmup_state.update(status="ready")
+    except Exception as e:
+        warmup_state.update(status="failed", error=repr(e))
+        log_event(logger, "warmup_failed", logging.WARNING, error=repr(e))
+    warmup_state.update(seconds=round(time.perf_counter() - started, 3), stages=stages,
+                        ready_after_import=round(time.time() - _IMPORTED_AT, 3))
+    log_event(logger, "warmup_completed", **warmup_state)
+
+
+class BatchScoreRequest(BaseModel):
+    """Toplu skor isteği: duygu sözlükleri veya sabit sıralı matris"""
+    items: Optional[List[Dict[str, float]]] = Field(
+        None, max_length=MAX_BATCH_ITEMS,
+        description="Her öğe için {duygu: skor} (eksik duygular 0 kabul edilir)"
+    )
+    matrix: Optional[List[List[float]]] = Field(
+        None, max_length=MAX_BATCH_ITEMS,
+        description=f"N x 7 skor matrisi, sütun sırası: {', '.join(EMOTION_LABELS)}"
+    )
+    seed: Optional[int] = Field(None, description="Tekrarlanabilir sonuç için random seed")
+    timezone: Optional[str] = Field(None, description="Kullanıcının saat dilimi (ör. Europe/Istanbul)")
+    platform: Optional[str] = Field(None, description="Paylaşım platformu (ör. tiktok, instagram)")
+
+
+def _cache_key(content_hash: str, namespace: str, weights: Optional[Dict[str, float]] = None) -> str:
+    """Scorer ağırlıkları (varsayılan: kontrol varyantı), versiyonu ve trend snapshot'ıyla cache anahtarı"""
+    return make_cache_key(content_hash, namespace, weights or viral_scorer.weights, ViralScorer.VERSION,
+                          trend_index.version)
+
+
+class VideoMetadata(BaseModel):
+    """Dosyasız hızlı skor için video metadata'sı"""
+    filename: Optional[str] = None
+    container: Optional[str] = None
+    duration_seconds: Optional[float] = Field(None, ge=0)
+    width: Optional[int] = Field(None, ge=0)
+    height: Optional[int] = Field(None, ge=0)
+    video_codec: Optional[str] = None
+    audio_codec: Optional[str] = None
+    bitrate_kbps: Optional[int] = Field(None, ge=0)
+    size_bytes: Optional[int] = Field(None, ge=0)
+
+
+def _scoring_context(content_hash: str) -> Dict:
+    """
+    Deterministik modda scorer/rapor için rng ve zaman
+
+    Aynı içerik aynı rng'yi alır; zaman SCORING_FIXED_TIME ile sabitlenir ya da
+    saat başına yuvarlanır (zamanlama skoru yalnızca saat ve güne bakar).
+    Böylece aynı girdi birebir aynı raporu üretir.
+    """
+    if not DETERMINISTIC_SCORING:
+        return {}
+    return {"rng": seeded_rng(content_hash), "now": _scoring_now()}
+
+
+def _scoring_now() -> datetime:
+    """Skorlamada kullanılan zaman (deterministik modda sabit ya da saat başı)"""
+    if not DETERMINISTIC_SCORING:
+        return datetime.now()
+    if SCORING_FIXED_TIME:
+        return datetime.fromisoformat(SCORING_FIXED_TIME)
+    return datetime.now().replace(minute=0, second=0, microsecond=0)
+
+
+def _timing_params(timezone: Optional[str], platform: Optional[str]) -> Dict:
+    """Zamanlama skoru ve paylaşım önerisi için saat dilimi/platform (verilenler)"""
+    params = {}
+    if timezone:
+        try:
+            resolve_timezone(timezone)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        params["timezone"] = timezone
+    if platform:
+        params["platform"] = platform.strip().lower()
+    return params
+
+
+def _validate_video_file(file: UploadFile):
+    """Dosya adı ve uzantı kontrolü"""
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="Dosya adı boş")
+    
+    file_ext = os.path.splitext(file.filename)[1].lower()
+    if file_ext not in ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Desteklenmeyen format. İzin verilenler: {', '.join(ALLOWED_EXTENSIONS)}"
+        )
+
+
+def _read_header(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read(HEADER_PROBE_BYTES)
+
+
+async def _local_video_analysis(path: str) -> Optional[Dict]:
+    """Kaydedilen videodan container metadata'sı + kare/ses özellikleri"""
+    metadata = probe_header(await run_in_threadpool(_read_header, path), os.path.getsize(path))
+    with stage_timer("video_features"):
+        features = await video_feature_extractor.extract(path)
+    return {**metadata, **(features or {})}
+
+
+def _quick_result(filename: str, viral_score: int) -> Dict:
+    """Hızlı skor yanıtı"""
+    return {
+        "success": True,
+        "filename": filename,
+        "viral_score": viral_score,
+        "rating": "Yüksek" if viral_score >= 70 else "Orta" if viral_score >= 40 else "Düşük",
+        "emoji": "🔥" if viral_score >= 70 else "👍" if viral_score >= 40 else "⚠️"
+    }
+
+
+async def _score_metadata(filename: str, metadata: Dict, timing: Dict) -> Dict:
+    """Container metadata'sından hızlı skor (dosya içeriği okunmaz)"""
+    with stage_timer("emotion_analysis"):
+        emotions = await analyze_text_emotion_async(f"Quick analysis for {filename}")
+    seed = hashlib.sha256(json.dumps({"filename": filename, **metadata}, sort_keys=True).encode()).hexdigest()
+    variant = scorer_config.pick(_analysis_key(seed, None, timing))
+    viral_data = viral_scorer.calculate_score(emotions, metadata, **_scoring_context(seed), **timing,
+                                              weights=variant.weights)
+    VIRAL_SCORE.observe(viral_data["viral_score"], variant=variant.name)
+    return {**_quick_result(filename, viral_data["viral_score"]), "metadata": metadata}
+
+
+def _analysis_key(content_hash: str, caption: Optional[str], timing: Optional[Dict] = None) -> str:
+    """Sonucu belirleyen girdilerin anahtarı: içerik hash'i (+ açıklama metni, saat dilimi, platform)"""
+    key = content_hash
+    if caption:
+        key = hashlib.sha256(f"{key}\0{caption}".encode()).hexdigest()
+    if timing:
+        key = hashlib.sha256(f"{key}\0{timing.get('timezone', '')}\0{timing.get('platform', '')}".encode()).hexdigest()
+    return key
+
+
+def _trend_text(caption: Optional[str], wiro_result: Optional[Dict] = None) -> Optional[str]:
+    """Trend eşleşmesi için metin: açıklama + Wiro video açıklaması (yoksa None)"""
+    parts = [caption, _wiro().result_text(wiro_result) if wiro_result else None]
+    text = "\n".join(part for part in parts if part)
+    return text or None
+
+
+async def run_analysis_job(payload: Dict, progress) -> Dict:
+    """Arka plan işi: (Wiro) → duygu analizi → viral skor → rapor"""
+    filename = payload["filename"]
+    file_path = payload.get("file_path")
+    video_analysis = None
+    release_lease = True
+    
+    ANALYSES_IN_FLIGHT.inc(pipeline="job")
+    try:
+        # Yüklenen dosyadan yerel video özellikleri
+        if file_path and os.path.exists(file_path):
+            progress("video_features", 5)
+            video_analysis = await _local_video_analysis(file_path)
+        
+        # Video URL verildiyse Wiro'dan video açıklaması al
+        wiro = _wiro() if payload.get("video_url") else None
+        if wiro is not None and wiro.API_KEY and wiro.API_SECRET:
+            progress("wiro_analysis", 10)
+            with stage_timer("wiro_call"):
+                # Aynı URL: cache'ten ya da devam eden ortak çağrıdan (tekrar ücretli çağrı yok)
+                wiro_result = await get_wiro_cache().analyze_video(payload["video_url"])
+            if "error" in wiro_result:
+                log_event(logger, "wiro_failed", logging.WARNING, filename=filename, error=wiro_result["error"])
+            else:
+                video_analysis = {**(video_analysis or {}), "wiro": wiro_result}
+        
+        progress("emotion_analysis", 30)
+        demo_text = f"Video analysis for {filename}. Exciting content with surprise elements and joyful moments."
+        with stage_timer("emotion_analysis"):
+            emotions = await analyze_text_emotion_async(demo_text)
+        if not emotions:
+            raise RuntimeError("Duygu analizi başarısız")
+        
+        progress("scoring", 60)
+        timing = payload.get("timing") or {}
+        analysis_key = _analysis_key(payload["sha256"], payload.get("caption"), timing)
+        variant = scorer_config.pick(analysis_key)
+        context = _scoring_context(analysis_key)
+        text = _trend_text(payload.get("caption"), (video_analysis or {}).get("wiro"))
+        with stage_timer("scoring"):
+            viral_data = await run_in_threadpool(viral_scorer.calculate_score, emotions, video_analysis,
+                                                 text=text, **context, **timing, weights=variant.weights)
+        VIRAL_SCORE.observe(viral_data["viral_score"], variant=variant.name)
+        
+        progress("report", 85)
+        with stage_timer("report_generation"):
+            report = report_generator.generate_report(viral_data, filename, now=context.get("now"), **timing,
+                                                      variant=variant.name)
+    except asyncio.CancelledError:
+        # Kapanışta iptal: iş yeniden kuyruğa alınır, lease yeni denemenin dosyası için kalır
+        # (deneme hakkı biterse reaper lease'i TTL dolunca temizler)
+        release_lease = False
+        raise
+    finally:
+        ANALYSES_IN_FLIGHT.dec(pipeline="job")
+        if file_path and release_lease:
+            storage.release(file_path)
+    
+    # Wiro sonucu içermeyen raporlar /analyze-video ile aynı cache'i paylaşır
+    if not payload.get("video_url"):
+        await _cache_call(result_cache.set, _cache_key(analysis_key, "report", variant.weights), report)
+    
+    log_event(logger, "job_completed", filename=filename, viral_score=viral_data["viral_score"])
+    return report
+
+
+job_queue = JobQueue(run_analysis_job)
+
+
+async def _cache_call(method, *args):
+    """Bellek dışı cache backend'leri (SQLite/Redis) event loop'u bloklamasın"""
+    if result_cache.backend in ("memory", "off"):
+        return method(*args)
+    return await run_in_threadpool(method, *args)
+
+
+async def _cached_report(analysis_key: str, filename: str) -> Optional[Dict]:
+    """Aynı girdiler için cache'teki rapor (dosya adı bu yüklemeninkiyle)"""
+    cached = await _cache_call(result_cache.get,
+                               _cache_key(analysis_key, "report", scorer_config.pick(analysis_key).weights))
+    if cached is None:
+        return None
+    log_event(logger, "cache_hit", filename=filename, sha256=analysis_key[:12])
+    return {**cached, "video_info": {**cached["video_info"], "filename": filename}}
+
+
+async def _store_video(file: UploadFile):
+    """Dosyayı parça parça depoya al (aynı içerik tekrar yazılmaz)"""
+    with stage_timer("upload_write"):
+        stored = await storage.store(file)
+    log_event(logger, "video_saved", filename=file.filename, size=stored.size,
+              sha256=stored.sha256[:12], deduplicated=stored.deduplicated)
+    return stored
+
+
+async def _analysis_stages(filename: str, stored, analysis_key: str, caption: Optional[str] = None,
+                           timing: Optional[Dict] = None) -> AsyncIterator[Tuple[str, Dict]]:
+    """
+    Depoya alınmış video için analiz aşamaları: (olay, veri)
+    
+    Her aşamanın sonucu hazır olur olmaz üretilir. /analyze-video yalnızca
+    son rapora bakar, /analyze-video/stream her aşamayı SSE olarak gönderir.
+    Rapor cache'e yazıldıktan sonra en son üretilir.
+    """
+    timing = timing or {}
+    ANALYSES_IN_FLIGHT.inc(pipeline="analyze_video")
+    try:
+        # Yerel video özellikleri (process havuzunda, event loop bloklanmaz)
+        video_analysis = await _local_video_analysis(str(stored.path))
+        yield "video_features", video_analysis
+        
+        # Şimdilik video içeriği yerine dosya adı ve uzantısı üzerinden analiz
+        # Gerçek video analizi için Wiro AI kullanılacak (ileride)
+        
+        # Basit bir metin oluştur (demo için)
+        demo_text = f"Video analysis for {filename}. Exciting content with surprise elements and joyful moments."
+        
+        # Duygu analizi yap
+        with stage_timer("emotion_analysis"):
+            emotions = await analyze_text_emotion_async(demo_text)
+        
+        if not emotions:
+            raise HTTPException(status_code=500, detail="Duygu analizi başarısız")
+        yield "emotions", {"emotions": emotions.to_results()}
+        
+        # Viral skor hesapla (ağırlıklar analiz anahtarına düşen varyanttan)
+        variant = scorer_config.pick(analysis_key)
+        context = _scoring_context(analysis_key)
+        text = _trend_text(caption)
+        with stage_timer("scoring"):
+            sub_scores = dict(viral_scorer.iter_sub_scores(emotions, video_analysis, text=text, **context, **timing))
+            viral_data = viral_scorer.combine(sub_scores, emotions, variant.weights, context.get("now"), **timing)
+        VIRAL_SCORE.observe(viral_data["viral_score"], variant=variant.name)
+        if text:
+            now = context.get("now")
+            yield "trends", {"matches": viral_scorer.trends.matches(text, now.timestamp() if now else None)}
+        for name, value in viral_data["breakdown"].items():
+            yield "score", {"name": name, "score": value}
+        yield "viral_score", {
+            "viral_score": viral_data["viral_score"],
+            "scorer_variant": variant.name,
+            "dominant_emotions": viral_data["dominant_emotions"]
+        }
+        yield "recommendations", {"recommendations": viral_data["recommendations"]}
+        
+        # Rapor oluştur
+        with stage_timer("report_generation"):
+            report = report_generator.generate_report(viral_data, filename, now=context.get("now"), **timing,
+                                                      variant=variant.name)
+    finally:
+        ANALYSES_IN_FLIGHT.dec(pipeline="analyze_video")
+    
+    log_event(logger, "analysis_completed", filename=filename, viral_score=viral_data["viral_score"],
+              variant=variant.name)
+    await _cache_call(result_cache.set, _cache_key(analysis_key, "report", variant.weights), report)
+    yield "report", report
+
+
+def _sse(event: str, data: Dict) -> str:
+    """Server-Sent Events formatında mesaj"""
+    return f"event: {event}\ndata: {json_dumps(data)}\n\n"
 
 @app.get("/")
 async def root():
@@ -44,24 +454,51 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "video_analysis": "/analyze-video",
+            "video_analysis_stream": "/analyze-video/stream",
             "quick_score": "/quick-score",
+            "quick_score_header": "/quick-score/header",
+            "quick_score_metadata": "/quick-score/metadata",
+            "posting_time": "/posting-time",
             "emotion_analysis": "/emotion-analyze",
             "health": "/health",
-            "test_upload": "/test-upload"
+            "test_upload": "/test-upload",
+            "jobs": "/jobs",
+            "batch_score": "/batch-score",
+            "metrics": "/metrics"
         }
     }
 
+def _backend_stats() -> Dict:
+    """Depo ve cache sayaçları (SQLite/Redis/disk okuyabilir; thread havuzunda çağrılır)"""
+    return {
+        "storage": storage.stats(),
+        "result_cache": result_cache.stats(),
+        "wiro_cache": get_wiro_cache().stats(),
+        "shared_state": get_shared_state().stats()
+    }
+
 @app.get("/health")
 async def health_check():
     """Sağlık kontrolü"""
+    backends = await run_in_threadpool(_backend_stats)
     return {
         "status": "healthy",
         "models": {
-            "emotion_analyzer": "loaded",
-            "viral_scorer": "active"
+            "emotion_analyzer": model_status(),
+            "viral_scorer": "active",
+            "video_features": video_feature_extractor.status(),
+            "trend_index": trend_index.status(),
+            "timing_engine": timing_engine.status(),
+            "scorer_config": scorer_config.status()
         },
-        "upload_dir": str(UPLOAD_DIR),
-        "upload_dir_exists": UPLOAD_DIR.exists()
+        "warmup": warmup_state,
+        "upload_dir": str(storage.root),
+        "upload_dir_exists": storage.root.exists(),
+        "max_upload_mb": MAX_UPLOAD_MB,
+        **backends,
+        "admission": admission.stats(),
+        "jobs": await job_queue.stats_async(),
+        "worker_pid": os.getpid()
     }
 
 @app.post("/analyze-video", 
@@ -69,7 +506,10 @@ async def health_check():
     description="Video yükleyip detaylı viral potansiyel analizi alın"
 )
 async def analyze_video_endpoint(
-    file: UploadFile = File(..., description="Video dosyası (mp4, mov, avi, mkv, webm)")
+    file: UploadFile = File(..., description="Video dosyası (mp4, mov, avi, mkv, webm)"),
+    caption: Optional[str] = Form(None, description="Video açıklaması / transkript (trend eşleşmesi için)"),
+    timezone: Optional[str] = Form(None, description="Kullanıcının saat dilimi (ör. Europe/Istanbul)"),
+    platform: Optional[str] = Form(None, description="Paylaşım platformu (ör. tiktok, instagram)")
 ):
     """
     Video yükle ve viral potansiyel analizi yap
@@ -80,74 +520,120 @@ async def analyze_video_endpoint(
         - Detaylı öneriler
         - En iyi paylaşım zamanı
     """
+    stored = None
     try:
         # Dosya kontrolü
-        if not file.filename:
-            raise HTTPException(status_code=400, detail="Dosya adı boş")
-        
-        # Dosya uzantısı kontrolü
-        allowed_extensions = ['.mp4', '.mov', '.avi', '.mkv', '.webm']
-        file_ext = os.path.splitext(file.filename)[1].lower()
-        
-        if file_ext not in allowed_extensions:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Desteklenmeyen format. İzin verilenler: {', '.join(allowed_extensions)}"
-            )
-        
-        # Dosyayı kaydet
-        file_path = UPLOAD_DIR / file.filename
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        print(f"✅ Video kaydedildi: {file.filename}")
-        
-        # Şimdilik video içeriği yerine dosya adı ve uzantısı üzerinden analiz
-        # Gerçek video analizi için Wiro AI kullanılacak (ileride)
-        
-        # Basit bir metin oluştur (demo için)
-        demo_text = f"Video analysis for {file.filename}. Exciting content with surprise elements and joyful moments."
+        _validate_video_file(file)
+        timing = _timing_params(timezone, platform)
         
-        # Duygu analizi yap
-        print("🔄 Duygu analizi yapılıyor...")
-        emotions = analyze_text_emotion(demo_text)
-        
-        if not emotions:
-            raise HTTPException(status_code=500, detail="Duygu analizi başarısız")
-        
-        # Viral skor hesapla
-        print("🔄 Viral skor hesaplanıyor...")
-        viral_data = viral_scorer.calculate_score(emotions)
+        # Aynı içerik daha önce analiz edildiyse dosyayı kaydetmeden cache'ten dön
+        with stage_timer("upload_hash"):
+            content_hash = await hash_upload(file)
+        analysis_key = _analysis_key(content_hash, caption, timing)
+        cached = await _cached_report(analysis_key, file.filename)
+        if cached is not None:
+            return FastJSONResponse(content={
+                "success": True,
+                "message": "Video başarıyla analiz edildi",
+                "cached": True,
+                "report": cached
+            })
         
-        # Rapor oluştur
-        print("🔄 Rapor oluşturuluyor...")
-        report = report_generator.generate_report(viral_data, file.filename)
+        stored = await _store_video(file)
         
-        print(f"✅ Analiz tamamlandı! Skor: {viral_data['viral_score']}/100")
+        report = None
+        async with aclosing(_analysis_stages(file.filename, stored, analysis_key, caption, timing)) as stages:
+            async for event, data in stages:
+                if event == "report":
+                    report = data
         
-        return JSONResponse(content={
+        return FastJSONResponse(content={
             "success": True,
             "message": "Video başarıyla analiz edildi",
+            "cached": False,
             "report": report
         })
         
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Hata: {str(e)}")
+        logger.exception("analysis_failed", extra={"fields": {"filename": file.filename}})
         raise HTTPException(status_code=500, detail=f"Analiz hatası: {str(e)}")
     finally:
-        # Dosyayı temizle (disk alanı için - opsiyonel)
-        # if file_path.exists():
-        #     file_path.unlink()
-        pass
+        # Lease'i bırak; obje dedup için depoda kalır, reaper TTL dolunca siler
+        if stored is not None:
+            storage.release(stored.path)
+
+@app.post("/analyze-video/stream",
+    summary="Akış Halinde Video Analizi (SSE)",
+    description="Her analiz aşamasının sonucu hazır olur olmaz Server-Sent Events olarak gönderilir"
+)
+async def analyze_video_stream(
+    request: Request,
+    file: UploadFile = File(..., description="Video dosyası (mp4, mov, avi, mkv, webm)"),
+    caption: Optional[str] = Form(None, description="Video açıklaması / transkript (trend eşleşmesi için)"),
+    timezone: Optional[str] = Form(None, description="Kullanıcının saat dilimi (ör. Europe/Istanbul)"),
+    platform: Optional[str] = Form(None, description="Paylaşım platformu (ör. tiktok, instagram)")
+):
+    """
+    Video yükle, analiz sonuçlarını aşama aşama al
+    
+    Olaylar: accepted → video_features → emotions → (trends) → score (alt skor başına) →
+    viral_score → recommendations → report → done. Hata olursa error olayı
+    gönderilir. İstemci bağlantıyı kapatırsa analiz yarıda bırakılır.
+    """
+    _validate_video_file(file)
+    timing = _timing_params(timezone, platform)
+    
+    with stage_timer("upload_hash"):
+        content_hash = await hash_upload(file)
+    analysis_key = _analysis_key(content_hash, caption, timing)
+    cached = await _cached_report(analysis_key, file.filename)
+    
+    # Form dosyası yanıt akışı başlamadan kapatılır; depoya şimdi alınmalı
+    stored = None if cached is not None else await _store_video(file)
+    filename = file.filename
+    
+    async def stream():
+        try:
+            yield _sse("accepted", {
+                "filename": filename,
+                "sha256": content_hash,
+                "size_bytes": stored.size if stored else None,
+                "cached": cached is not None
+            })
+            if cached is not None:
+                yield _sse("report", cached)
+                yield _sse("done", {"cached": True})
+                return
+            
+            async with aclosing(_analysis_stages(filename, stored, analysis_key, caption, timing)) as stages:
+                async for event, data in stages:
+                    if await request.is_disconnected():
+                        log_event(logger, "analysis_cancelled", filename=filename, stage=event)
+                        return
+                    yield _sse(event, data)
+            yield _sse("done", {"cached": False})
+        except HTTPException as e:
+            yield _sse("error", {"status_code": e.status_code, "detail": e.detail})
+        except Exception as e:
+            logger.exception("analysis_failed", extra={"fields": {"filename": filename}})
+            yield _sse("error", {"status_code": 500, "detail": f"Analiz hatası: {str(e)}"})
+        finally:
+            if stored is not None:
+                storage.release(stored.path)
+    
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 @app.post("/quick-score",
     summary="Hızlı Viral Skor",
     description="Sadece viral potansiyel skorunu öğrenin"
 )
 async def quick_score(
-    file: UploadFile = File(..., description="Video dosyası")
+    file: UploadFile = File(..., description="Video dosyası"),
+    timezone: Optional[str] = Form(None, description="Kullanıcının saat dilimi (ör. Europe/Istanbul)"),
+    platform: Optional[str] = Form(None, description="Paylaşım platformu (ör. tiktok, instagram)")
 ):
     """
     Hızlı skor - sadece viral potansiyel skoru döndür
@@ -155,26 +641,80 @@ async def quick_score(
     try:
         if not file.filename:
             raise HTTPException(status_code=400, detail="Dosya adı boş")
+        timing = _timing_params(timezone, platform)
+        
+        with stage_timer("upload_hash"):
+            content_hash = await hash_upload(file)
+        analysis_key = _analysis_key(content_hash, None, timing)
+        variant = scorer_config.pick(analysis_key)
+        cache_key = _cache_key(analysis_key, "quick", variant.weights)
+        cached = await _cache_call(result_cache.get, cache_key)
+        if cached is not None:
+            return {**cached, "filename": file.filename, "cached": True}
         
         demo_text = f"Quick analysis for {file.filename}"
-        emotions = analyze_text_emotion(demo_text)
+        with stage_timer("emotion_analysis"):
+            emotions = await analyze_text_emotion_async(demo_text)
         
         if not emotions:
             raise HTTPException(status_code=500, detail="Analiz başarısız")
         
-        viral_data = viral_scorer.calculate_score(emotions)
+        with stage_timer("scoring"):
+            viral_data = viral_scorer.calculate_score(emotions, **_scoring_context(content_hash), **timing,
+                                                      weights=variant.weights)
+        VIRAL_SCORE.observe(viral_data["viral_score"], variant=variant.name)
         
-        return {
-            "success": True,
-            "filename": file.filename,
-            "viral_score": viral_data['viral_score'],
-            "rating": "Yüksek" if viral_data['viral_score'] >= 70 else "Orta" if viral_data['viral_score'] >= 40 else "Düşük",
-            "emoji": "🔥" if viral_data['viral_score'] >= 70 else "👍" if viral_data['viral_score'] >= 40 else "⚠️"
-        }
+        result = _quick_result(file.filename, viral_data['viral_score'])
+        await _cache_call(result_cache.set, cache_key, result)
+        
+        return {**result, "cached": False}
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/quick-score/header",
+    summary="Başlıktan Hızlı Skor",
+    description="Yalnızca video başlığını (ilk KB'lar) okuyup container metadata'sından skor üretir",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"multipart/form-data": {"schema": {
+                "type": "object",
+                "required": ["file"],
+                "properties": {"file": {"type": "string", "format": "binary"}}
+            }}}
+        }
+    }
+)
+async def quick_score_header(request: Request, timezone: Optional[str] = None, platform: Optional[str] = None):
+    """
+    Başlıktan hızlı skor - süre, çözünürlük, codec ve bitrate başlıktan okunur,
+    gövdenin geri kalanı okunmaz (gecikme dosya boyutundan bağımsız)
+    """
+    head = await read_upload_head(request, HEADER_PROBE_BYTES)
+    if not head.filename:
+        raise HTTPException(status_code=400, detail="Dosya adı boş")
+    
+    metadata = probe_header(head.data, head.approx_size)
+    return await _score_metadata(head.filename, metadata, _timing_params(timezone, platform))
+
+@app.post("/quick-score/metadata",
+    summary="Metadata ile Hızlı Skor",
+    description="Dosya yüklemeden, video metadata'sı (JSON) ile skor alın"
+)
+async def quick_score_metadata(metadata: VideoMetadata, timezone: Optional[str] = None,
+                               platform: Optional[str] = None):
+    """
+    Metadata ile hızlı skor - dosya gerekmez
+    """
+    meta = metadata.model_dump(exclude_none=True)
+    filename = meta.pop("filename", None) or "video"
+    if not meta.get("bitrate_kbps") and meta.get("size_bytes") and meta.get("duration_seconds"):
+        meta["bitrate_kbps"] = int(meta["size_bytes"] * 8 / meta["duration_seconds"] / 1000)
+    return await _score_metadata(filename, meta, _timing_params(timezone, platform))
+
 @app.post("/test-upload",
     summary="Dosya Yükleme Testi",
     description="Basit dosya yükleme testi - sadece dosya bilgilerini döndürür"
@@ -186,17 +726,142 @@ async def test_upload(
     Basit dosya yükleme testi
     """
     try:
-        contents = await file.read()
+        # Dosyanın tamamını belleğe almadan parça parça say
+        size = 0
+        while chunk := await file.read(CHUNK_SIZE):
+            size += len(chunk)
         return {
             "success": True,
             "filename": file.filename,
             "content_type": file.content_type,
-            "size_bytes": len(contents),
-            "size_mb": round(len(contents) / (1024 * 1024), 2)
+            "size_bytes": size,
+            "size_mb": round(size / (1024 * 1024), 2)
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/jobs",
+    status_code=202,
+    summary="Arka Plan Video Analizi",
+    description="Video yükleyin, analiz arka planda yapılır; iş ID'si hemen döner"
+)
+async def create_job(
+    file: UploadFile = File(..., description="Video dosyası (mp4, mov, avi, mkv, webm)"),
+    video_url: Optional[str] = Form(None, description="Wiro analizi için video URL'si (opsiyonel)"),
+    caption: Optional[str] = Form(None, description="Video açıklaması / transkript (trend eşleşmesi için)"),
+    timezone: Optional[str] = Form(None, description="Kullanıcının saat dilimi (ör. Europe/Istanbul)"),
+    platform: Optional[str] = Form(None, description="Paylaşım platformu (ör. tiktok, instagram)")
+):
+    """
+    Analiz işini kuyruğa ekle
+    
+    Durum: GET /jobs/{job_id}, canlı ilerleme: GET /jobs/{job_id}/events
+    """
+    _validate_video_file(file)
+    timing = _timing_params(timezone, platform)
+    
+    with stage_timer("upload_hash"):
+        content_hash = await hash_upload(file)
+    payload = {"filename": file.filename, "sha256": content_hash, "video_url": video_url, "caption": caption,
+               "timing": timing}
+    
+    cached = None
+    if not video_url:
+        cached = await _cached_report(_analysis_key(content_hash, caption, timing), file.filename)
+    if cached is not None:
+        job_id = await job_queue.submit_completed_async(payload, cached)
+    else:
+        # Lease iş bitince run_analysis_job içinde bırakılır
+        with stage_timer("upload_write"):
+            stored = await storage.store(file)
+        payload["file_path"] = str(stored.path)
+        job_id = await job_queue.submit_async(payload)
+    
+    return {
+        "success": True,
+        "job_id": job_id,
+        "status_url": f"/jobs/{job_id}",
+        "events_url": f"/jobs/{job_id}/events"
+    }
+
+@app.get("/jobs/{job_id}", summary="İş Durumu")
+async def get_job(job_id: str):
+    """İş durumu, ilerleme ve (bittiyse) rapor"""
+    job = await job_queue.get_async(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="İş bulunamadı")
+    return job
+
+@app.get("/jobs/{job_id}/events", summary="İş İlerleme Akışı (SSE)")
+async def job_events(job_id: str):
+    """İş ilerlemesini Server-Sent Events olarak yayınla"""
+    if await job_queue.get_async(job_id) is None:
+        raise HTTPException(status_code=404, detail="İş bulunamadı")
+    
+    async def stream():
+        async for job in job_queue.events(job_id):
+            yield _sse(job["status"], job)
+    
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+@app.post("/batch-score",
+    summary="Toplu Viral Skor",
+    description="Binlerce videonun duygu skorlarından tek istekte viral skor hesaplayın"
+)
+async def batch_score(request: BatchScoreRequest):
+    """
+    Toplu skor - her öğe için viral skor, alt skorlar ve baskın 3 duygu
+    """
+    if request.matrix is not None:
+        matrix = request.matrix
+        if any(len(row) != len(EMOTION_LABELS) for row in matrix):
+            raise HTTPException(status_code=400, detail=f"Her satır {len(EMOTION_LABELS)} skor içermeli")
+    elif request.items is not None:
+        matrix = [[item.get(label, 0.0) for label in EMOTION_LABELS] for item in request.items]
+    else:
+        raise HTTPException(status_code=400, detail="'items' veya 'matrix' gerekli")
+    timing = _timing_params(request.timezone, request.platform)
+    
+    if request.seed is not None:
+        context = {"rng": random.Random(request.seed)}
+    else:
+        context = _scoring_context(hashlib.sha256(json.dumps(matrix).encode()).hexdigest())
+    try:
+        results = await run_in_threadpool(viral_scorer.calculate_scores_batch, matrix, **context, **timing)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "success": True,
+        "count": len(results),
+        "labels": list(EMOTION_LABELS),
+        "results": results
+    }
+
+@app.get("/posting-time",
+    summary="En İyi Paylaşım Zamanı",
+    description="Kullanıcının saat dilimi ve platformuna göre önümüzdeki en iyi paylaşım pencereleri"
+)
+async def posting_time(timezone: Optional[str] = None, platform: Optional[str] = None,
+                       limit: int = Query(3, ge=1, le=MAX_POSTING_WINDOWS)):
+    """
+    Paylaşım önerisi - zamanlama skoru (şu an) ve skora göre sıralı sonraki pencereler
+    """
+    timing = _timing_params(timezone, platform)
+    now = _scoring_now()
+    return {
+        "success": True,
+        "timing_score": round(timing_engine.score(now, **timing), 3),
+        "best_posting_time": timing_engine.posting_time(now, limit=limit, **timing),
+        "next_windows": timing_engine.best_windows(now, limit=limit, **timing)
+    }
+
+@app.get("/metrics", summary="Prometheus Metrikleri", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus text formatında metrikler"""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 # Duygu analiz rotasını ekle
 app.include_router(emotion_router, tags=["Emotion Analysis"])
 
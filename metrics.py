@@ -0,0 +1,220 @@
+# metrics.py
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+# Varsayılan histogram sınırları (saniye)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_labels(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Etiketli metrik temel sınıfı (Prometheus text formatı)"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple, object] = {}
+        REGISTRY.append(self)
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(labels[name] for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key: Tuple, value) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [bucket sayaçları..., +Inf], toplam
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _render_sample(self, key: Tuple, value) -> List[str]:
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+REGISTRY: List[_Metric] = []
+
+
+def render() -> str:
+    """Tüm metrikleri Prometheus text formatında döndür"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# --- Uygulama metrikleri ---
+
+STAGE_SECONDS = Histogram(
+    "viralcheck_stage_duration_seconds",
+    "Analiz aşaması süresi (upload_hash, upload_write, video_features, emotion_analysis, scoring, report_generation, wiro_call)",
+    ["stage"]
+)
+REQUESTS_TOTAL = Counter(
+    "viralcheck_requests_total", "Endpoint ve durum koduna göre istek sayısı",
+    ["endpoint", "method", "status"]
+)
+REQUEST_SECONDS = Histogram(
+    "viralcheck_request_duration_seconds", "Endpoint başına istek süresi", ["endpoint"]
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "viralcheck_requests_in_flight", "Şu an işlenen HTTP istek sayısı"
+)
+ANALYSES_IN_FLIGHT = Gauge(
+    "viralcheck_analyses_in_flight", "Şu an çalışan analiz sayısı", ["pipeline"]
+)
+UPLOAD_BYTES = Counter(
+    "viralcheck_upload_bytes_total", "Endpoint başına alınan istek gövdesi (byte)", ["endpoint"]
+)
+VIRAL_SCORE = Histogram(
+    "viralcheck_viral_score", "Scorer varyantına göre üretilen viral skorlar (A/B karşılaştırması)",
+    ["variant"], buckets=(10, 20, 30, 40, 50, 60, 70, 80, 90, 100)
+)
+WIRO_CACHE = Counter(
+    "viralcheck_wiro_cache_total",
+    "Wiro video analizi istekleri (hit, negative_hit, coalesced, miss)", ["result"]
+)
+ADMISSION_REJECTED = Counter(
+    "viralcheck_admission_rejected_total", "Kabul kontrolünce reddedilen istekler (rate_limited, too_large, inflight_bytes, concurrency)",
+    ["reason"]
+)
+
+
+def stage_timer(stage: str):
+    """Bir analiz aşamasının süresini ölç: `with stage_timer("scoring"): ...`"""
+    return STAGE_SECONDS.time(stage=stage)
+
+
+class MetricsMiddleware:
+    """
+    İstek sayısı, süre, eşzamanlı istek ve yükleme byte'larını ölçen ASGI middleware
+
+    Endpoint etiketi route şablonudur (/jobs/{job_id}), ham path değil; böylece
+    etiket sayısı sınırlı kalır.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+        received = {"bytes": 0}
+
+        async def receive_wrapper():
+            message = await receive()
+            if message["type"] == "http.request":
+                received["bytes"] += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            endpoint = getattr(route, "path", "unmatched")
+            REQUESTS_TOTAL.inc(endpoint=endpoint, method=scope["method"], status=str(status["code"]))
+            REQUEST_SECONDS.observe(elapsed, endpoint=endpoint)
+            if received["bytes"]:
+                UPLOAD_BYTES.inc(received["bytes"], endpoint=endpoint)
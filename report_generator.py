@@ -1,89 +1,108 @@
 # report_generator.py
-from typing import Dict
+from typing import Callable, Dict, Optional
 from datetime import datetime
 
+from timing_engine import TimingEngine, get_timing_engine
+
+ANALYSIS_VERSION = "1.0"
+
+# (alt sınır, değerlendirme, emoji, özet girişi) - yukarıdan aşağı ilk eşleşen kullanılır
+RATING_TABLE = (
+    (80, "Mükemmel - Yüksek Viral Potansiyel", "🔥", "Videonuz {score}/100 puan ile yüksek viral potansiyele sahip! "),
+    (60, "İyi - Orta-Yüksek Viral Potansiyel", "👍", "Videonuz {score}/100 puan ile iyi bir performans gösteriyor. "),
+    (40, "Orta - Orta Viral Potansiyel", "😐", "Videonuz {score}/100 puan aldı. İyileştirme ile viral olabilir. "),
+    (0, "Düşük - İyileştirme Gerekli", "⚠️", "Videonuz {score}/100 puan aldı. Önemli değişiklikler öneriyoruz. "),
+)
+
+
+def _build_row(score: int):
+    """Skorun değerlendirme satırı, özet girişi skorla doldurulmuş olarak"""
+    row = next((row for row in RATING_TABLE if score >= row[0]), RATING_TABLE[-1])
+    return row[0], row[1], row[2], row[3].format(score=score)
+
+
+# 0-100 arası her skor için satırlar bir kez hazırlanır
+_SCORE_ROWS = tuple(_build_row(score) for score in range(101))
+
+
+def _rating_row(score: int):
+    return _SCORE_ROWS[score] if 0 <= score <= 100 else _build_row(score)
+
+
 class ReportGenerator:
     """Güzel formatlanmış raporlar üretir"""
-    
-    def generate_report(self, viral_data: Dict, video_filename: str) -> Dict:
+
+    def __init__(self, clock: Callable[[], datetime] = None, timing: Optional[TimingEngine] = None):
+        # Zaman kaynağı (test ve deterministik mod için değiştirilebilir)
+        self.clock = clock or datetime.now
+        # Paylaşım zamanı önerisi (tablo yoksa eski sabit öneri)
+        self.timing = timing or get_timing_engine()
+
+    def generate_report(self, viral_data: Dict, video_filename: str, now: Optional[datetime] = None,
+                        timezone: Optional[str] = None, platform: Optional[str] = None,
+                        variant: Optional[str] = None) -> Dict:
         """
         Kullanıcı dostu rapor oluştur
-        
+
         Args:
             viral_data: Viral skor verileri
             video_filename: Video dosya adı
-        
+            now: Rapor zamanı (varsayılan: self.clock())
+            timezone: Kullanıcının saat dilimi (ör. Europe/Istanbul)
+            platform: Paylaşım platformu (ör. tiktok)
+            variant: Skoru hesaplayan scorer varyantı (A/B karşılaştırması için)
+
         Returns:
             Formatlanmış rapor
         """
-        
+
         score = viral_data['viral_score']
-        
+        row = _rating_row(score)
+        now = now or self.clock()
+
+        video_info = {
+            "filename": video_filename,
+            "analyzed_at": now.isoformat(),
+            "analysis_version": ANALYSIS_VERSION
+        }
+        if variant is not None:
+            video_info["scorer_variant"] = variant
+
         report = {
-            "video_info": {
-                "filename": video_filename,
-                "analyzed_at": datetime.now().isoformat(),
-                "analysis_version": "1.0"
-            },
+            "video_info": video_info,
             "viral_score": {
                 "overall": score,
-                "rating": self._get_rating(score),
-                "emoji": self._get_score_emoji(score)
+                "rating": row[1],
+                "emoji": row[2]
             },
             "score_breakdown": viral_data['breakdown'],
             "dominant_emotions": viral_data['dominant_emotions'],
             "recommendations": viral_data['recommendations'],
-            "best_posting_time": self._get_best_posting_time(),
-            "summary": self._generate_summary(score, viral_data)
+            "best_posting_time": self._get_best_posting_time(now, timezone, platform),
+            "summary": self._generate_summary(score, viral_data, row)
         }
-        
+
         return report
-    
+
     def _get_rating(self, score: int) -> str:
         """Skoru kelime olarak değerlendir"""
-        if score >= 80:
-            return "Mükemmel - Yüksek Viral Potansiyel"
-        elif score >= 60:
-            return "İyi - Orta-Yüksek Viral Potansiyel"
-        elif score >= 40:
-            return "Orta - Orta Viral Potansiyel"
-        else:
-            return "Düşük - İyileştirme Gerekli"
-    
+        return _rating_row(score)[1]
+
     def _get_score_emoji(self, score: int) -> str:
         """Skora göre emoji"""
-        if score >= 80:
-            return "🔥"
-        elif score >= 60:
-            return "👍"
-        elif score >= 40:
-            return "😐"
-        else:
-            return "⚠️"
-    
-    def _get_best_posting_time(self) -> Dict:
-        """En iyi paylaşım zamanı önerisi"""
-        return {
-            "today": "18:00 - 21:00",
-            "tomorrow": "10:00 - 12:00",
-            "best_days": ["Salı", "Çarşamba", "Perşembe"],
-            "avoid": "Pazar gece"
-        }
-    
-    def _generate_summary(self, score: int, viral_data: Dict) -> str:
+        return _rating_row(score)[2]
+
+    def _get_best_posting_time(self, now: Optional[datetime] = None, timezone: Optional[str] = None,
+                               platform: Optional[str] = None) -> Dict:
+        """En iyi paylaşım zamanı önerisi (saat dilimi/platform yoksa timing_engine.DEFAULT_POSTING_TIME)"""
+        return self.timing.posting_time(now or self.clock(), timezone, platform)
+
+    def _generate_summary(self, score: int, viral_data: Dict, row=None) -> str:
         """Özet metin oluştur"""
         dominant = viral_data['dominant_emotions'][0] if viral_data['dominant_emotions'] else None
-        
-        if score >= 80:
-            summary = f"Videonuz {score}/100 puan ile yüksek viral potansiyele sahip! "
-        elif score >= 60:
-            summary = f"Videonuz {score}/100 puan ile iyi bir performans gösteriyor. "
-        elif score >= 40:
-            summary = f"Videonuz {score}/100 puan aldı. İyileştirme ile viral olabilir. "
-        else:
-            summary = f"Videonuz {score}/100 puan aldı. Önemli değişiklikler öneriyoruz. "
-        
+        summary = (row or _rating_row(score))[3]
+
         if dominant:
             summary += f"En baskın duygu: {dominant['emotion']} ({dominant['score']}%). "
-        
-        return summary
\ No newline at end of file
+
+        return summary
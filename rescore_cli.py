@@ -0,0 +1,339 @@
+# rescore_cli.py
+"""
+Geçmiş kayıtları HTTP olmadan toplu yeniden skorlama (JSONL / Parquet)
+
+Kullanım:
+    python rescore_cli.py history.jsonl --out rescored.jsonl [--workers N] [--chunk-size 500]
+                          [--weights weights.json | --variant NAME] [--now 2025-01-07T19:00:00] [--resume]
+                          [--trends trend_snapshot.json]
+
+Girdi satırı (hepsi opsiyonel):
+
+    {"id": "abc", "filename": "clip.mp4", "text": "duygu analizi metni",
+     "caption": "açıklama #trend", "video_analysis": {...},
+     "timezone": "Europe/Istanbul", "platform": "tiktok", "analyzed_at": "2025-01-07T19:00:00"}
+
+Çıktı satırı: {"id", "viral_score", "report"} ya da {"id", "line", "error"}.
+
+Girdi akış halinde okunur ve parçalar (chunk) process havuzuna dağıtılır;
+aynı anda en fazla workers x 2 parça bellekte tutulur. Satırlar worker'larda
+parse edilip serileştirilir, ana process yalnızca okur ve yazar. Sonuçlar
+girdi sırasıyla eklenir; her parçadan sonra checkpoint dosyasına okunan ve
+yazılan konum kaydedilir. --resume ile çıktı son checkpoint'e kesilip
+kalınan yerden devam edilir. Skorlar kayıt anahtarından seed'lenir ve zaman
+çalışma boyunca sabittir: yarıda kesilip devam eden çalışma kesintisiz
+çalışmayla aynı çıktıyı üretir.
+
+Trend skoru API ile aynı snapshot'tan hesaplanır (varsayılan:
+TREND_SNAPSHOT_PATH); snapshot versiyonu checkpoint'e yazılır ve değişmişse
+--resume reddedilir.
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow opsiyonel (yalnızca Parquet girdisi için)
+    pq = None
+
+from emotion_analyzer import get_model
+from json_response import dumps as json_dumps
+from report_generator import ReportGenerator
+from scorer_config import get_scorer_config
+from trend_index import TREND_SNAPSHOT_PATH, TrendIndex
+from viral_scorer import ViralScorer, seeded_rng
+
+DEFAULT_CHUNK_SIZE = 500
+PROGRESS_INTERVAL = 5.0  # sn
+
+
+def default_workers() -> int:
+    """Bu process'e ayrılmış çekirdek sayısı"""
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:  # macOS / Windows
+        return os.cpu_count() or 1
+
+
+# --- Worker tarafı ---
+
+_worker: Dict = {}
+
+
+def _load_trends(path: str) -> TrendIndex:
+    trends = TrendIndex(path)
+    trends.reload_if_changed()
+    return trends
+
+
+def _init_worker(weights: Dict[str, float], variant: Optional[str], now: str, trends_path: str,
+                 trend_version: Optional[str]):
+    """Her worker scorer, trend indeksi, rapor üretici ve modeli bir kez kurar"""
+    trends = _load_trends(trends_path)
+    if trends.version != trend_version:
+        # Çalışma sırasında snapshot değişti: parçalar farklı trend verisiyle skorlanmasın
+        raise RuntimeError(f"Trend snapshot değişti: {trend_version} -> {trends.version}")
+    _worker.update(scorer=ViralScorer(trends=trends), reporter=ReportGenerator(), model=get_model(),
+                   weights=weights, variant=variant, now=datetime.fromisoformat(now))
+
+
+def _record_key(record: Dict) -> str:
+    """Kaydın seed anahtarı: id, yoksa kaydın kendisi"""
+    if record.get("id") is not None:
+        return str(record["id"])
+    return hashlib.sha256(json.dumps(record, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _parse_record(item) -> Tuple[Optional[Dict], Optional[str]]:
+    """Girdi satırı: (kayıt, None) ya da (kayıt veya None, hata mesajı)"""
+    try:
+        record = json.loads(item) if isinstance(item, (bytes, str)) else item
+    except ValueError:
+        return None, "Geçersiz kayıt: JSON nesnesi değil"
+    if not isinstance(record, dict):
+        return None, "Geçersiz kayıt: JSON nesnesi değil"
+    for field in ("text", "caption", "filename"):
+        if record.get(field) is not None and not isinstance(record[field], str):
+            return record, f"Geçersiz kayıt: '{field}' metin olmalı"
+    return record, None
+
+
+def _emotion_text(record: Dict) -> str:
+    return record.get("text") or (f"Video analysis for {record.get('filename') or 'video'}. "
+                                  "Exciting content with surprise elements and joyful moments.")
+
+
+def _predict(model, texts: List[str]) -> List:
+    """Parça için tek predict_vectors çağrısı; başarısız olursa kayıt kayıt (hatalı kayıt yerine hata)"""
+    if not texts:
+        return []
+    try:
+        return model.predict_vectors(texts)
+    except Exception:
+        predictions = []
+        for text in texts:
+            try:
+                predictions.append(model.predict_vectors([text])[0])
+            except Exception as e:
+                predictions.append(e)
+        return predictions
+
+
+def rescore_chunk(items: List, first_line: int) -> Tuple[str, int]:
+    """
+    Bir parçayı skorla: (JSONL çıktı metni, hata sayısı)
+
+    Duygu analizi parça için tek predict_vectors çağrısıyla yapılır
+    (analyze_text_emotion ile aynı model ve sonuç). Hatalı kayıtlar çalışmayı
+    durdurmaz; çıktıya {"id", "line", "error"} satırı olarak yazılır.
+    """
+    scorer, reporter, model = _worker["scorer"], _worker["reporter"], _worker["model"]
+    parsed = [_parse_record(item) for item in items]
+    predictions = iter(_predict(model, [_emotion_text(record) for record, error in parsed if error is None]))
+
+    results, errors = [], 0
+    for offset, (record, error) in enumerate(parsed):
+        emotions = next(predictions) if error is None else None
+        if isinstance(emotions, Exception):
+            error = f"Duygu analizi başarısız: {emotions!r}"
+        if error is not None:
+            failed = {"line": first_line + offset, "error": error}
+            results.append(json_dumps(failed if record is None else {"id": record.get("id"), **failed}))
+            errors += 1
+            continue
+        try:
+            now = datetime.fromisoformat(record["analyzed_at"]) if record.get("analyzed_at") else _worker["now"]
+            timing = {key: record[key] for key in ("timezone", "platform") if record.get(key)}
+            viral_data = scorer.calculate_score(emotions, record.get("video_analysis"),
+                                                rng=seeded_rng(_record_key(record)), now=now,
+                                                text=record.get("caption"), **timing, weights=_worker["weights"])
+            report = reporter.generate_report(viral_data, record.get("filename") or "video", now=now, **timing,
+                                              variant=_worker["variant"])
+            results.append(json_dumps({"id": record.get("id"), "viral_score": viral_data["viral_score"],
+                                       "report": report}))
+        except Exception as e:
+            results.append(json_dumps({"id": record.get("id"), "line": first_line + offset, "error": repr(e)}))
+            errors += 1
+    return "".join(line + "\n" for line in results), errors
+
+
+# --- Girdi ---
+
+def _read_jsonl(path: str, start_offset: int, chunk_size: int) -> Iterator[Tuple[List[bytes], int]]:
+    """(satırlar, parça sonundaki byte konumu); boş satırlar atlanır"""
+    with open(path, "rb") as f:
+        f.seek(start_offset)
+        offset = start_offset
+        chunk = []
+        for line in f:
+            offset += len(line)
+            if line.strip():
+                chunk.append(line)
+            if len(chunk) >= chunk_size:
+                yield chunk, offset
+                chunk = []
+        if chunk:
+            yield chunk, offset
+
+
+def _read_parquet(path: str, skip_rows: int, chunk_size: int) -> Iterator[Tuple[List[Dict], int]]:
+    """(kayıtlar, parça sonundaki satır konumu)"""
+    if pq is None:
+        raise SystemExit("Parquet girdisi için 'pyarrow' paketi gerekli")
+    position = 0
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+        rows = batch.to_pylist()
+        position += len(rows)
+        if position <= skip_rows:
+            continue
+        yield rows[max(0, len(rows) - (position - skip_rows)):], position
+
+
+def _input_total(path: str, parquet: bool) -> int:
+    """İlerleme yüzdesi için toplam: Parquet'te satır, JSONL'de byte"""
+    if parquet:
+        return pq.ParquetFile(path).metadata.num_rows
+    return os.path.getsize(path)
+
+
+# --- Checkpoint ---
+
+def _load_checkpoint(path: str) -> Optional[Dict]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _save_checkpoint(path: str, state: Dict):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)  # yarım checkpoint kalmasın
+
+
+def run(args) -> Dict:
+    parquet = args.input.endswith(".parquet")
+    checkpoint_path = args.checkpoint or f"{args.out}.checkpoint.json"
+    # Ağırlıklar: config'teki varyant, dosyadan değişiklikler ya da kontrol varyantı
+    config = get_scorer_config()
+    weights = config.control.weights
+    if args.variant:
+        variant = config.variant(args.variant)
+        if variant is None:
+            raise SystemExit(f"Varyant bulunamadı: {args.variant} ({config.path})")
+        weights = variant.weights
+    elif args.weights:
+        with open(args.weights, encoding="utf-8") as f:
+            weights = {**weights, **json.load(f)}
+
+    trend_version = _load_trends(args.trends).version
+    state = {
+        "input": os.path.abspath(args.input), "weights": weights, "scorer_version": ViralScorer.VERSION,
+        "trend_version": trend_version,
+        "now": args.now or datetime.now().replace(microsecond=0).isoformat(),
+        "records": 0, "errors": 0, "input_position": 0, "output_bytes": 0
+    }
+    previous = _load_checkpoint(checkpoint_path) if args.resume else None
+    if previous is not None:
+        if (previous["input"], previous["weights"]) != (state["input"], state["weights"]):
+            raise SystemExit(f"Checkpoint farklı bir girdi/ağırlık ile oluşturulmuş: {checkpoint_path}")
+        if previous.get("trend_version") != trend_version:
+            raise SystemExit(f"Checkpoint farklı bir trend snapshot'ı ile oluşturulmuş: {checkpoint_path}")
+        state = previous
+        print(f"Devam: {state['records']} kayıt atlanıyor", file=sys.stderr)
+
+    chunks = (_read_parquet if parquet else _read_jsonl)(args.input, state["input_position"], args.chunk_size)
+    total = _input_total(args.input, parquet)
+
+    with open(args.out, "ab" if previous else "wb") as out:
+        out.truncate(state["output_bytes"])
+        out.seek(state["output_bytes"])
+        started = last_report = time.perf_counter()
+        done_at_start, start_position = state["records"], state["input_position"]
+        line = state["records"] + 1
+
+        # spawn: ana process'in thread'leri fork ile kopyalanmasın (video_features ile aynı)
+        with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker,
+                                 initargs=(state["weights"], args.variant, state["now"], args.trends,
+                                           trend_version)) as pool:
+            pending = deque()
+            chunks = iter(chunks)
+            exhausted = False
+            while pending or not exhausted:
+                # Sınırlı sayıda parça havada: bellek girdi boyutundan bağımsız
+                while not exhausted and len(pending) < args.workers * 2:
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        exhausted = True
+                        break
+                    items, position = chunk
+                    pending.append((pool.submit(rescore_chunk, items, line), len(items), position))
+                    line += len(items)
+                if not pending:
+                    break
+
+                future, count, position = pending.popleft()
+                text, errors = future.result()
+                out.write(text.encode("utf-8"))
+                out.flush()
+                state.update(records=state["records"] + count, errors=state["errors"] + errors,
+                             input_position=position, output_bytes=out.tell())
+                _save_checkpoint(checkpoint_path, state)
+
+                now = time.perf_counter()
+                if now - last_report >= args.progress_interval or (exhausted and not pending):
+                    last_report = now
+                    _report_progress(state, done_at_start, start_position, now - started, position, total)
+
+    elapsed = time.perf_counter() - started
+    return {"records": state["records"], "errors": state["errors"], "seconds": round(elapsed, 1),
+            "records_per_second": round((state["records"] - done_at_start) / elapsed, 1) if elapsed else None,
+            "out": args.out}
+
+
+def _report_progress(state: Dict, done_at_start: int, start_position: int, elapsed: float,
+                     position: int, total: int):
+    rate = (state["records"] - done_at_start) / elapsed if elapsed else 0.0
+    ratio = position / total if total else 1.0
+    message = f"{state['records']} kayıt ({ratio:.1%}), {rate:.0f}/sn, {state['errors']} hata"
+    if 0 < ratio < 1 and position > start_position:
+        # Kalan süre: bu çalışmada okunan girdi miktarı ve geçen süreden
+        remaining = elapsed * (total - position) / (position - start_position)
+        message += f", kalan ~{remaining:.0f} sn"
+    print(message, file=sys.stderr, flush=True)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Geçmiş kayıtları toplu yeniden skorla")
+    parser.add_argument("input", help="JSONL veya .parquet girdi dosyası")
+    parser.add_argument("--out", required=True, help="JSONL çıktı dosyası")
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Worker'a gönderilen kayıt sayısı")
+    weights = parser.add_mutually_exclusive_group()
+    weights.add_argument("--weights", help="Kontrol ağırlıklarını değiştiren JSON dosyası")
+    weights.add_argument("--variant", help="Scorer config'teki varyantın ağırlıklarıyla skorla")
+    parser.add_argument("--now", help="analyzed_at olmayan kayıtlar için zaman (varsayılan: başlangıç)")
+    parser.add_argument("--trends", default=TREND_SNAPSHOT_PATH, help="Trend snapshot dosyası")
+    parser.add_argument("--checkpoint", help="Checkpoint dosyası (varsayılan: <out>.checkpoint.json)")
+    parser.add_argument("--resume", action="store_true", help="Checkpoint'ten devam et")
+    parser.add_argument("--progress-interval", type=float, default=PROGRESS_INTERVAL)
+    args = parser.parse_args(argv)
+
+    summary = run(args)
+    print(json.dumps(summary, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+# result_cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from shared_state import SharedState, get_shared_state
+
+# Ayarlar (ortam değişkenleri ile değiştirilebilir)
+CACHE_BACKEND = os.getenv("RESULT_CACHE_BACKEND", "memory")  # memory | sqlite | shared | off
+CACHE_TTL_SECONDS = int(os.getenv("RESULT_CACHE_TTL", str(24 * 3600)))
+CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_SIZE", "10000"))
+CACHE_DB_PATH = os.getenv("RESULT_CACHE_PATH", "cache/results.sqlite3")
+SIZE_REFRESH_SECONDS = 30  # SQLite kayıt sayısı (COUNT) en fazla bu aralıkla yeniden sayılır
+PRUNE_EVERY = 100  # SQLite temizliği her N yazmada bir
+
+
+def make_cache_key(content_hash: str, namespace: str, weights: Dict, version: str,
+                   trends: Optional[str] = None) -> str:
+    """
+    İçerik hash'i + skor ağırlıkları + versiyondan cache anahtarı üret
+
+    Ağırlıklar, scorer versiyonu veya trend snapshot'ı değişince eski sonuçlar
+    otomatik geçersiz olur.
+    """
+    config = {"weights": weights, "version": version}
+    if trends is not None:
+        config["trends"] = trends
+    config = json.dumps(config, sort_keys=True)
+    config_hash = hashlib.sha256(config.encode()).hexdigest()[:16]
+    return f"{namespace}:{config_hash}:{content_hash}"
+
+
+class ResultCache:
+    """Sonuç cache'i için temel sınıf (hit/miss sayaçları burada tutulur)"""
+
+    backend = "base"
+
+    def __init__(self, ttl: int = CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Dict]:
+        value = self._get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: Dict, ttl: Optional[int] = None) -> None:
+        """Değeri kaydet (ttl verilmezse cache'in varsayılan süresi)"""
+        self._set(key, value, self.ttl if ttl is None else ttl)
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "entries": self._size()
+        }
+
+    def _get(self, key: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def _set(self, key: str, value: Dict, ttl: int) -> None:
+        raise NotImplementedError
+
+    def _size(self) -> int:
+        raise NotImplementedError
+
+
+class NullCache(ResultCache):
+    """Cache kapalı"""
+
+    backend = "off"
+
+    def _get(self, key: str) -> Optional[Dict]:
+        return None
+
+    def _set(self, key: str, value: Dict, ttl: int) -> None:
+        pass
+
+    def _size(self) -> int:
+        return 0
+
+
+class MemoryCache(ResultCache):
+    """Process içi LRU cache (TTL destekli)"""
+
+    backend = "memory"
+
+    def __init__(self, ttl: int = CACHE_TTL_SECONDS, max_entries: int = CACHE_MAX_ENTRIES):
+        super().__init__(ttl)
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def _set(self, key: str, value: Dict, ttl: int) -> None:
+        with self._lock:
+            self._data[key] = (time.time() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def _size(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCache(ResultCache):
+    """Disk üzerinde SQLite cache (restart sonrası da kalır)"""
+
+    backend = "sqlite"
+
+    def __init__(self, path: str = CACHE_DB_PATH, ttl: int = CACHE_TTL_SECONDS,
+                 max_entries: int = CACHE_MAX_ENTRIES):
+        super().__init__(ttl)
+        self.path = path
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._counted = (0.0, 0)  # (sayım zamanı, kayıt sayısı)
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid = None
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """Process başına bağlantı (preload ile fork edilen worker'lar kendi bağlantısını açar)"""
+        if self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_results_accessed ON results(accessed_at)")
+            self._connection, self._pid = conn, os.getpid()
+        return self._connection
+
+    def _get(self, key: str) -> Optional[Dict]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def _set(self, key: str, value: Dict, ttl: int) -> None:
+        now = time.time()
+        payload = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, payload, now + ttl, now)
+            )
+            self._writes += 1
+            if self._writes % PRUNE_EVERY:
+                return
+            # Süresi dolanları ve limit fazlasını (en eski erişilenler) sil
+            self._conn.execute("DELETE FROM results WHERE expires_at < ?", (now,))
+            self._conn.execute(
+                "DELETE FROM results WHERE key IN ("
+                "SELECT key FROM results ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def _size(self) -> int:
+        # /health her çağrıda tabloyu taramasın: sayım SIZE_REFRESH_SECONDS boyunca yeniden kullanılır
+        now = time.time()
+        if now - self._counted[0] >= SIZE_REFRESH_SECONDS:
+            with self._lock:
+                self._counted = (now, self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0])
+        return self._counted[1]
+
+
+class SharedStateCache(ResultCache):
+    """Paylaşılan durum (ör. Redis) üzerinde cache; birden fazla makine için"""
+
+    def __init__(self, state: SharedState, ttl: int = CACHE_TTL_SECONDS):
+        super().__init__(ttl)
+        self.state = state
+        self.backend = f"shared:{state.backend}"
+
+    def _get(self, key: str) -> Optional[Dict]:
+        return self.state.get(f"result:{key}")
+
+    def _set(self, key: str, value: Dict, ttl: int) -> None:
+        self.state.set(f"result:{key}", value, ttl=ttl)
+
+    def _size(self) -> Optional[int]:
+        # Anahtarlar paylaşılan durumun istatistiğinde; Redis her çağrıda taranmasın
+        return None
+
+
+def create_cache(backend: str = CACHE_BACKEND) -> ResultCache:
+    """Ayara göre cache backend'i oluştur"""
+    if backend == "sqlite":
+        return SQLiteCache()
+    if backend == "shared":
+        return SharedStateCache(get_shared_state())
+    if backend == "off":
+        return NullCache()
+    return MemoryCache()
@@ -0,0 +1,374 @@
+# scorer_config.py
+"""
+Versiyonlu scorer ağırlıkları ve A/B varyantları (SCORER_CONFIG_PATH)
+
+    {
+      "version": "2025-01-10",
+      "salt": "exp-3",
+      "variants": [
+        {"name": "control", "traffic": 0.9,
+         "weights": {"emotion_intensity": 0.30, "engagement_potential": 0.25, "content_quality": 0.20,
+                     "trending_factors": 0.15, "timing_score": 0.10}},
+        {"name": "calibrated", "traffic": 0.1, "weights": {...}, "fitted": {...}}
+      ]
+    }
+
+İlk varyant kontroldür (toplu skor ve varyant seçilmeyen yollar onu kullanır).
+Trafik, analiz anahtarının (içerik hash'i + girdiler) salt ile hash'inden
+deterministik olarak bölünür: aynı video her zaman aynı varyantı alır, cache
+tutarlı kalır. Dosya değişince yeni config ayrı kurulur ve tek referans
+atamasıyla devreye alınır; okuyucular kilit almaz. Dosya yoksa yerleşik
+ağırlıklar kullanılır.
+
+Kalibrasyon (etiketli sonuçlardan ağırlık uydurma):
+
+    python scorer_config.py calibrate outcomes.jsonl --name calibrated --traffic 0.1
+"""
+import argparse
+import asyncio
+import bisect
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from structured_log import get_logger, log_event
+
+logger = get_logger("viralcheck.scorer_config")
+
+# Ayarlar (ortam değişkenleri ile değiştirilebilir)
+SCORER_CONFIG_PATH = os.getenv(
+    "SCORER_CONFIG_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "scorer_variants.json")
+)
+SCORER_CONFIG_REFRESH_SECONDS = float(os.getenv("SCORER_CONFIG_REFRESH_SECONDS", "30"))
+
+# Alt skorlar ve yerleşik ağırlıklar (sıra breakdown sırasıdır)
+DEFAULT_WEIGHTS = {
+    "emotion_intensity": 0.30,  # Duygu yoğunluğu
+    "engagement_potential": 0.25,  # Etkileşim potansiyeli
+    "content_quality": 0.20,  # İçerik kalitesi
+    "trending_factors": 0.15,  # Trend faktörleri
+    "timing_score": 0.10  # Zamanlama skoru
+}
+WEIGHT_NAMES = tuple(DEFAULT_WEIGHTS)
+WEIGHT_SUM_TOLERANCE = 0.01  # Ağırlık toplamı 1'den en fazla bu kadar sapabilir (yuvarlama payı)
+
+
+class ScorerVariant(NamedTuple):
+    """Ağırlık seti; weights paylaşılır, değiştirilmemeli"""
+    name: str
+    weights: Dict[str, float]
+    traffic: float
+
+
+class ScorerConfigSnapshot:
+    """Derlenmiş, değişmez varyant listesi ve trafik eşikleri"""
+
+    __slots__ = ("version", "salt", "variants", "by_name", "thresholds", "source_mtime", "loaded_at")
+
+    def __init__(self, variants: Iterable[Dict], version: str = "builtin", salt: Optional[str] = None,
+                 source_mtime: Optional[float] = None):
+        self.version = str(version)
+        self.salt = salt if salt is not None else self.version
+        self.variants: Tuple[ScorerVariant, ...] = tuple(_variant(entry) for entry in variants)
+        if not self.variants:
+            raise ValueError("En az bir varyant gerekli")
+        self.by_name = {variant.name: variant for variant in self.variants}
+        if len(self.by_name) != len(self.variants):
+            raise ValueError("Varyant isimleri tekrarsız olmalı")
+        total = sum(variant.traffic for variant in self.variants)
+        if total <= 0:
+            raise ValueError("Toplam trafik payı 0'dan büyük olmalı")
+        # Kümülatif paylar (toplam 1'e ölçeklenir); bucket < eşik olan ilk varyant seçilir
+        self.thresholds: List[float] = []
+        cumulative = 0.0
+        for variant in self.variants:
+            cumulative += variant.traffic / total
+            self.thresholds.append(cumulative)
+        self.thresholds[-1] = 1.0
+        self.source_mtime = source_mtime
+        self.loaded_at = time.time()
+
+    @property
+    def control(self) -> ScorerVariant:
+        return self.variants[0]
+
+    def pick(self, key: str) -> ScorerVariant:
+        """Anahtarın varyantı (aynı anahtar ve salt için her zaman aynı)"""
+        if len(self.variants) == 1:
+            return self.variants[0]
+        digest = hashlib.sha256(f"{self.salt}\0{key}".encode()).digest()
+        bucket = int.from_bytes(digest[:8], "big") / 2 ** 64
+        index = bisect.bisect_right(self.thresholds, bucket)
+        return self.variants[min(index, len(self.variants) - 1)]
+
+
+def _variant(entry: Dict) -> ScorerVariant:
+    weights = entry.get("weights") or {}
+    unknown = set(weights) - set(WEIGHT_NAMES)
+    if unknown:
+        raise ValueError(f"{entry.get('name')}: bilinmeyen ağırlıklar: {', '.join(sorted(unknown))}")
+    # Eksik ağırlıklar yerleşik değerle tamamlanır; sıra breakdown sırası
+    merged = {name: float(weights.get(name, DEFAULT_WEIGHTS[name])) for name in WEIGHT_NAMES}
+    if any(value < 0 for value in merged.values()):
+        raise ValueError(f"{entry.get('name')}: ağırlıklar negatif olamaz")
+    # Toplam 1 değilse tüm skorlar orantılı şişer/söner (skor 0-100 aralığından çıkar)
+    total = sum(merged.values())
+    if abs(total - 1.0) > WEIGHT_SUM_TOLERANCE:
+        raise ValueError(f"{entry.get('name')}: ağırlıkların toplamı 1 olmalı (şu an {total:.4f})")
+    traffic = float(entry.get("traffic", 1.0))
+    if traffic < 0:
+        raise ValueError(f"{entry.get('name')}: trafik payı negatif olamaz")
+    return ScorerVariant(str(entry["name"]), merged, traffic)
+
+
+BUILTIN_VARIANTS = [{"name": "default", "weights": DEFAULT_WEIGHTS, "traffic": 1.0}]
+
+
+class ScorerConfig:
+    """
+    Varyant dosyasını izleyen, değişince yeniden yükleyen scorer config'i
+
+    Okuyucular her zaman tamamlanmış bir ScorerConfigSnapshot görür (trend
+    indeksiyle aynı yöntem). Bozuk dosya yüklenmez, eski config ile devam edilir.
+    """
+
+    def __init__(self, path: str = SCORER_CONFIG_PATH,
+                 refresh_seconds: float = SCORER_CONFIG_REFRESH_SECONDS):
+        self.path = path
+        self.refresh_seconds = refresh_seconds
+        self._snapshot = ScorerConfigSnapshot(BUILTIN_VARIANTS)
+        self._task: Optional[asyncio.Task] = None
+        self.reloads = 0
+        try:
+            self.reload_if_changed()
+        except Exception as e:
+            log_event(logger, "scorer_config_failed", logging.WARNING, path=self.path, error=repr(e))
+
+    @property
+    def snapshot(self) -> ScorerConfigSnapshot:
+        return self._snapshot
+
+    @property
+    def control(self) -> ScorerVariant:
+        return self._snapshot.variants[0]
+
+    def pick(self, key: str) -> ScorerVariant:
+        return self._snapshot.pick(key)
+
+    def variant(self, name: str) -> Optional[ScorerVariant]:
+        return self._snapshot.by_name.get(name)
+
+    def reload_if_changed(self) -> bool:
+        """Dosya değiştiyse yeni config kur ve devreye al"""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return False
+        if self._snapshot.source_mtime == mtime:
+            return False
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        snapshot = ScorerConfigSnapshot(data.get("variants", []), data.get("version", mtime),
+                                        data.get("salt"), source_mtime=mtime)
+        self._snapshot = snapshot  # atomik değişim
+        self.reloads += 1
+        log_event(logger, "scorer_config_loaded", version=snapshot.version,
+                  variants=[variant.name for variant in snapshot.variants])
+        return True
+
+    def load(self, variants: Iterable[Dict], version: str = "test", salt: Optional[str] = None):
+        """Dosya yerine doğrudan varyant listesinden yükle (test ve benchmark için)"""
+        self._snapshot = ScorerConfigSnapshot(variants, version, salt)
+        self.reloads += 1
+
+    async def start(self):
+        await self._safe_reload()
+        self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            await self._safe_reload()
+
+    async def _safe_reload(self):
+        try:
+            await run_in_threadpool(self.reload_if_changed)
+        except Exception as e:
+            log_event(logger, "scorer_config_failed", logging.WARNING, path=self.path, error=repr(e))
+
+    def status(self) -> Dict:
+        snapshot = self._snapshot
+        return {
+            "path": self.path,
+            "version": snapshot.version,
+            "variants": {variant.name: round(variant.traffic, 4) for variant in snapshot.variants},
+            "loaded_at": snapshot.loaded_at,
+            "reloads": self.reloads
+        }
+
+
+_config: Optional[ScorerConfig] = None
+
+
+def get_scorer_config() -> ScorerConfig:
+    """Process genelinde tek scorer config'i"""
+    global _config
+    if _config is None:
+        _config = ScorerConfig()
+    return _config
+
+
+# --- Çevrimdışı kalibrasyon (NumPy yalnızca burada yüklenir) ---
+
+def _read_labeled(path: str, target: str):
+    """(N x 5 alt skor matrisi 0-1, sonuç vektörü); breakdown, score_breakdown veya report içinden"""
+    import numpy as np
+
+    rows, outcomes = [], []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            breakdown = (record.get("breakdown") or record.get("score_breakdown")
+                         or (record.get("report") or {}).get("score_breakdown"))
+            if not breakdown or record.get(target) is None:
+                continue
+            rows.append([breakdown[name] / 100.0 for name in WEIGHT_NAMES])
+            outcomes.append(float(record[target]))
+    return np.asarray(rows, dtype=np.float64), np.asarray(outcomes, dtype=np.float64)
+
+
+def fit_least_squares(x, y):
+    """Sonuca en yakın doğrusal birleşim (sabit terimli) -> alt skor katsayıları"""
+    import numpy as np
+
+    design = np.hstack([x, np.ones((len(x), 1))])
+    coef, *_ = np.linalg.lstsq(design, y, rcond=None)
+    return coef[:-1]
+
+
+def fit_logistic(x, y, iterations: int = 2000, learning_rate: float = 0.5, l2: float = 1e-3):
+    """İkili sonuç (viral oldu/olmadı) için lojistik regresyon (gradyan inişi) -> katsayılar"""
+    import numpy as np
+
+    # Ölçek farkları inişi yavaşlatmasın: standartlaştırılmış özelliklerle uydur
+    mean, std = x.mean(axis=0), x.std(axis=0)
+    std[std == 0] = 1.0
+    z = (x - mean) / std
+    coef = np.zeros(x.shape[1])
+    bias = 0.0
+    for _ in range(iterations):
+        p = 1.0 / (1.0 + np.exp(-(z @ coef + bias)))
+        error = p - y
+        coef -= learning_rate * (z.T @ error / len(y) + l2 * coef)
+        bias -= learning_rate * error.mean()
+    return coef / std
+
+
+def to_weights(coef) -> Dict[str, float]:
+    """Katsayıları ağırlığa çevir: negatifler 0, toplam 1 (skor 0-100 aralığında kalır)"""
+    clipped = [max(float(value), 0.0) for value in coef]
+    total = sum(clipped)
+    if total == 0:
+        raise ValueError("Hiçbir alt skor sonuçla pozitif ilişkili değil")
+    return {name: round(value / total, 4) for name, value in zip(WEIGHT_NAMES, clipped)}
+
+
+def _rank_correlation(a, b) -> float:
+    """Spearman sıra korelasyonu (bağlar yaklaşık)"""
+    import numpy as np
+
+    ra = np.argsort(np.argsort(a, kind="stable"), kind="stable").astype(np.float64)
+    rb = np.argsort(np.argsort(b, kind="stable"), kind="stable").astype(np.float64)
+    if ra.std() == 0 or rb.std() == 0:
+        return 0.0
+    return float(np.corrcoef(ra, rb)[0, 1])
+
+
+def calibrate(args) -> Dict:
+    import numpy as np
+
+    x, y = _read_labeled(args.input, args.target)
+    if len(y) < len(WEIGHT_NAMES) + 1:
+        raise SystemExit(f"Kalibrasyon için en az {len(WEIGHT_NAMES) + 1} etiketli kayıt gerekli")
+    if args.method == "logistic" and not np.isin(y, (0.0, 1.0)).all():
+        raise SystemExit("logistic yöntemi için sonuç 0/1 olmalı")
+
+    coef = fit_logistic(x, y) if args.method == "logistic" else fit_least_squares(x, y)
+    weights = to_weights(coef)
+
+    try:
+        with open(args.out, encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        data = {"variants": [dict(entry) for entry in BUILTIN_VARIANTS]}
+    current = ScorerConfigSnapshot(data["variants"], data.get("version", "builtin"), data.get("salt"))
+
+    def fit_quality(w: Dict[str, float]) -> float:
+        return round(_rank_correlation(x @ np.array([w[name] for name in WEIGHT_NAMES]), y), 4)
+
+    entry = {
+        "name": args.name,
+        "traffic": args.traffic,
+        "weights": weights,
+        "fitted": {
+            "method": args.method,
+            "samples": int(len(y)),
+            "rank_correlation": fit_quality(weights),
+            "control_rank_correlation": fit_quality(current.control.weights),
+            "at": datetime.now(timezone.utc).isoformat(timespec="seconds")
+        }
+    }
+    # Varyant yerinde güncellenir: sıra trafik eşiklerini (ve kontrolü) belirler, değişirse atamalar kayar
+    variants = list(data["variants"])
+    names = [variant["name"] for variant in variants]
+    if args.name in names:
+        variants[names.index(args.name)] = entry
+    else:
+        variants.append(entry)
+    version = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+    # Salt açıkça verilmemişse eski sürüme eşittir; yeni sürümle değişirse mevcut
+    # trafik atamaları (çalışan deneyler) karışır, bu yüzden korunur
+    salt = current.salt
+    ScorerConfigSnapshot(variants, version, salt)  # doğrulama
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    tmp_path = f"{args.out}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({**data, "version": version, "salt": salt, "variants": variants}, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, args.out)  # çalışan sunucular yarım dosya görmesin
+    return entry
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Scorer varyantları ve ağırlık kalibrasyonu")
+    sub = parser.add_subparsers(dest="command", required=True)
+    cal = sub.add_parser("calibrate", help="Etiketli sonuçlardan ağırlık uydur ve varyant olarak ekle")
+    cal.add_argument("input", help="JSONL: breakdown (veya report.score_breakdown) + sonuç alanı")
+    cal.add_argument("--target", default="outcome", help="Sonuç alanı (ör. engagement_rate veya 0/1 viral)")
+    cal.add_argument("--method", choices=("lstsq", "logistic"), default="lstsq")
+    cal.add_argument("--name", default="calibrated", help="Eklenecek/güncellenecek varyant adı")
+    cal.add_argument("--traffic", type=float, default=0.0, help="Varyantın trafik payı (0 = yalnızca kayıt)")
+    cal.add_argument("--out", default=SCORER_CONFIG_PATH)
+    args = parser.parse_args(argv)
+
+    entry = calibrate(args)
+    print(json.dumps(entry, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# serve.py
+"""
+Production başlatıcı (çok worker'lı)
+
+Kullanım:
+    python serve.py [--workers N] [--host 0.0.0.0] [--port 8000]
+
+Worker sayısı WEB_CONCURRENCY veya kullanılabilir çekirdek sayısıdır.
+gunicorn varsa uygulama ana process'te bir kez yüklenir (preload), duygu
+modeli ısıtılır, sonra worker'lar fork edilir: model ve modül verileri
+copy-on-write ile paylaşılır. gunicorn yoksa (ör. Windows) uvicorn'un kendi
+çoklu worker modu kullanılır (preload yok).
+
+Birden fazla worker çalışırken process içi cache'ler worker'lar arasında
+tutarsız olur; bu yüzden memory seçili backend'ler paylaşılan SQLite'a
+geçirilir (Redis için RESULT_CACHE_BACKEND=shared, SHARED_STATE_BACKEND=redis).
+"""
+import argparse
+import os
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:  # gunicorn opsiyonel (Windows'ta yok)
+    BaseApplication = None
+
+
+def default_workers() -> int:
+    """WEB_CONCURRENCY veya bu process'e ayrılmış çekirdek sayısı"""
+    if os.getenv("WEB_CONCURRENCY"):
+        return max(1, int(os.environ["WEB_CONCURRENCY"]))
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:  # macOS / Windows
+        return os.cpu_count() or 1
+
+
+def configure_shared_backends(workers: int):
+    """Çok worker'da process içi backend'leri paylaşılanlarla değiştir (app import edilmeden önce)"""
+    if workers <= 1:
+        return
+    if os.getenv("RESULT_CACHE_BACKEND", "memory") == "memory":
+        os.environ["RESULT_CACHE_BACKEND"] = "sqlite"
+    if os.getenv("SHARED_STATE_BACKEND", "memory") == "memory":
+        os.environ["SHARED_STATE_BACKEND"] = "sqlite"
+
+
+if BaseApplication is not None:
+    class PreloadedApplication(BaseApplication):
+        """Ana process'te yüklenmiş app'i uvicorn worker'larıyla çalıştıran gunicorn uygulaması"""
+
+        def __init__(self, app, options):
+            self.application = app
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return self.application
+
+
+def main():
+    # .env'deki ayarlar (WEB_CONCURRENCY, PORT, backend'ler) argüman varsayılanlarından
+    # ve worker'lar başlamadan önce okunsun
+    if os.path.exists(".env"):
+        from dotenv import load_dotenv
+        load_dotenv(".env")
+
+    parser = argparse.ArgumentParser(description="ViralCheck production sunucusu")
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--timeout", type=int, default=int(os.getenv("WORKER_TIMEOUT", "120")))
+    args = parser.parse_args()
+
+    configure_shared_backends(args.workers)
+
+    if BaseApplication is None:
+        import uvicorn
+        uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers)
+        return
+
+    # Preload: app ve duygu modeli fork'tan önce ana process'te yüklenir
+    from main import app
+    from emotion_analyzer import get_model
+    get_model()
+
+    PreloadedApplication(app, {
+        "bind": f"{args.host}:{args.port}",
+        "workers": args.workers,
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": True,
+        "timeout": args.timeout,
+        "graceful_timeout": 30,
+        "keepalive": 5,
+        "accesslog": None,
+    }).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+# shared_state.py
+"""
+Worker'lar arası paylaşılan durum (anahtar-değer, TTL ve atomik sayaç)
+
+Birden fazla uvicorn/gunicorn worker'ı aynı cache'i, rate limit sayaçlarını
+ve iş durumunu görmelidir. Backend'ler:
+
+    memory  Process içi (tek worker / test için Redis yerine geçer)
+    sqlite  Aynı makinedeki tüm worker'lar için tek dosya (WAL)
+    redis   Birden fazla makine için (redis paketi opsiyonel)
+
+SHARED_STATE_BACKEND ile seçilir; serve.py birden fazla worker başlatırken
+memory seçiliyse sqlite'a geçer.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# Ayarlar (ortam değişkenleri ile değiştirilebilir)
+SHARED_STATE_BACKEND = os.getenv("SHARED_STATE_BACKEND", "memory")  # memory | sqlite | redis
+SHARED_STATE_PATH = os.getenv("SHARED_STATE_PATH", "cache/shared_state.sqlite3")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+KEY_PREFIX = os.getenv("SHARED_STATE_PREFIX", "viralcheck:")
+PRUNE_EVERY = 500  # SQLite'ta süresi dolan anahtarlar her N güncellemede bir silinir
+SIZE_REFRESH_SECONDS = 30  # İstatistikteki SQLite anahtar sayısı en fazla bu aralıkla yeniden sayılır
+MEMORY_SWEEP_SECONDS = float(os.getenv("MEMORY_STATE_SWEEP_SECONDS", "60"))  # Bellekte süresi dolanların taranma aralığı
+
+
+def _refill(state: Optional[list], now: float, rate: float, capacity: float, cost: float) -> Tuple[list, float]:
+    """Token bucket adımı: (yeni [token, zaman], bekleme süresi)"""
+    tokens, updated = state if state else (capacity, now)
+    tokens = min(capacity, tokens + (now - updated) * rate)
+    if tokens >= cost:
+        return [tokens - cost, now], 0.0
+    return [tokens, now], (cost - tokens) / rate
+
+
+def _bucket_ttl(rate: float, capacity: float) -> float:
+    # Kova bu sürede tamamen dolar; sonrasında kaydın tutulmasına gerek yok
+    return capacity / rate + 1
+
+
+class SharedState:
+    """Paylaşılan durum arayüzü; değerler JSON'a çevrilebilir olmalı"""
+
+    backend = "base"
+
+    def get(self, key: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def set(self, key: str, value, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def incr(self, key: str, amount: float = 1, ttl: Optional[float] = None) -> float:
+        """Sayacı atomik olarak artır, yeni değeri döndür (TTL ilk artışta başlar)"""
+        raise NotImplementedError
+
+    def take(self, key: str, rate: float, capacity: float, cost: float = 1) -> float:
+        """
+        Token bucket: kovadan cost kadar token almayı dene
+
+        Kova saniyede rate token dolar, en fazla capacity token tutar.
+        Token alındıysa 0, alınamadıysa yeterli token için beklenecek süre (sn).
+        """
+        raise NotImplementedError
+
+    def size(self) -> int:
+        raise NotImplementedError
+
+    def stats(self) -> Dict:
+        return {"backend": self.backend, "keys": self.size()}
+
+
+class MemoryState(SharedState):
+    """Process içi durum (Redis/SQLite yerine geçen sürüm)"""
+
+    backend = "memory"
+
+    def __init__(self, sweep_seconds: float = MEMORY_SWEEP_SECONDS):
+        self._data: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self.sweep_seconds = sweep_seconds
+        self._swept_at = time.time()
+
+    def _sweep(self, now: float):
+        """
+        Süresi dolan tüm anahtarları sil (kilit altında, en fazla sweep_seconds'ta bir)
+
+        Yalnızca erişilen anahtar silinirse bir daha gelmeyen istemcilerin
+        rate limit kovaları bellekte birikir.
+        """
+        if now - self._swept_at < self.sweep_seconds:
+            return
+        self._swept_at = now
+        expired = [key for key, (expires_at, _) in self._data.items()
+                   if expires_at is not None and expires_at < now]
+        for key in expired:
+            del self._data[key]
+
+    def _live(self, key: str, now: float):
+        item = self._data.get(key)
+        if item is not None and item[0] is not None and item[0] < now:
+            del self._data[key]
+            return None
+        return item
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._live(key, time.time())
+        return None if item is None else item[1]
+
+    def set(self, key: str, value, ttl: Optional[float] = None) -> None:
+        now = time.time()
+        with self._lock:
+            self._sweep(now)
+            self._data[key] = (now + ttl if ttl else None, value)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key: str, amount: float = 1, ttl: Optional[float] = None) -> float:
+        now = time.time()
+        with self._lock:
+            self._sweep(now)
+            item = self._live(key, now)
+            if item is None:
+                item = (now + ttl if ttl else None, 0)
+            value = item[1] + amount
+            self._data[key] = (item[0], value)
+        return value
+
+    def take(self, key: str, rate: float, capacity: float, cost: float = 1) -> float:
+        now = time.time()
+        with self._lock:
+            self._sweep(now)
+            item = self._live(key, now)
+            state, wait = _refill(item[1] if item else None, now, rate, capacity, cost)
+            self._data[key] = (now + _bucket_ttl(rate, capacity), state)
+        return wait
+
+    def size(self) -> int:
+        return len(self._data)
+
+
+class SQLiteState(SharedState):
+    """
+    Tek dosyada paylaşılan durum (aynı makinedeki worker'lar için)
+
+    Bağlantı process başına açılır: preload ile fork edilen worker'lar
+    ana process'in bağlantısını paylaşmaz.
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, path: str = SHARED_STATE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._writes = 0
+        self._counted = (0.0, 0)  # (sayım zamanı, anahtar sayısı)
+
+    def _db(self) -> sqlite3.Connection:
+        if self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._db().execute(
+                "SELECT value FROM state WHERE key = ? AND (expires_at IS NULL OR expires_at >= ?)",
+                (key, time.time())
+            ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def set(self, key: str, value, ttl: Optional[float] = None) -> None:
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._db().execute(
+                "INSERT OR REPLACE INTO state (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), expires_at)
+            )
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._db().execute("DELETE FROM state WHERE key = ?", (key,))
+
+    def _update(self, key: str, update):
+        """Anahtarı tek transaction'da oku-değiştir-yaz: update(eski, bitiş, şimdi) -> (yeni, bitiş, sonuç)"""
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            # BEGIN IMMEDIATE: oku-yaz diğer process'lerle yarışmasın
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute("SELECT value, expires_at FROM state WHERE key = ?", (key,)).fetchone()
+                live = row is not None and (row[1] is None or row[1] >= now)
+                value, expires_at, result = update(json.loads(row[0]) if live else None,
+                                                   row[1] if live else None, now)
+                db.execute(
+                    "INSERT OR REPLACE INTO state (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), expires_at)
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            self._writes += 1
+            if self._writes % PRUNE_EVERY == 0:
+                db.execute("DELETE FROM state WHERE expires_at < ?", (now,))
+        return result
+
+    def incr(self, key: str, amount: float = 1, ttl: Optional[float] = None) -> float:
+        def update(old, expires_at, now):
+            if old is None:
+                return amount, (now + ttl if ttl else None), amount
+            return old + amount, expires_at, old + amount
+        return self._update(key, update)
+
+    def take(self, key: str, rate: float, capacity: float, cost: float = 1) -> float:
+        def update(old, _, now):
+            state, wait = _refill(old, now, rate, capacity, cost)
+            return state, now + _bucket_ttl(rate, capacity), wait
+        return self._update(key, update)
+
+    def prune(self) -> int:
+        """Süresi dolan anahtarları sil"""
+        with self._lock:
+            cur = self._db().execute("DELETE FROM state WHERE expires_at < ?", (time.time(),))
+        return cur.rowcount
+
+    def size(self) -> int:
+        with self._lock:
+            return self._db().execute("SELECT COUNT(*) FROM state").fetchone()[0]
+
+    def stats(self) -> Dict:
+        # /health her çağrıda tabloyu taramasın: sayım SIZE_REFRESH_SECONDS boyunca yeniden kullanılır
+        now = time.time()
+        if now - self._counted[0] >= SIZE_REFRESH_SECONDS:
+            self._counted = (now, self.size())
+        return {"backend": self.backend, "keys": self._counted[1]}
+
+
+class RedisState(SharedState):
+    """Redis üzerinde paylaşılan durum (birden fazla makine için)"""
+
+    backend = "redis"
+
+    def __init__(self, url: str = REDIS_URL, prefix: str = KEY_PREFIX):
+        try:
+            import redis  # opsiyonel; yalnızca bu backend seçilince yüklenir
+        except ImportError:
+            raise RuntimeError("SHARED_STATE_BACKEND=redis için 'redis' paketi gerekli")
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+        self._take_script = self._client.register_script(_TAKE_LUA)
+
+    def get(self, key: str):
+        raw = self._client.get(self.prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key: str, value, ttl: Optional[float] = None) -> None:
+        self._client.set(self.prefix + key, json.dumps(value, ensure_ascii=False),
+                         px=int(ttl * 1000) if ttl else None)
+
+    def delete(self, key: str) -> None:
+        self._client.delete(self.prefix + key)
+
+    def incr(self, key: str, amount: float = 1, ttl: Optional[float] = None) -> float:
+        pipe = self._client.pipeline()
+        pipe.incrbyfloat(self.prefix + key, amount)
+        if ttl:
+            # NX: TTL yalnızca ilk artışta başlar
+            pipe.pexpire(self.prefix + key, int(ttl * 1000), nx=True)
+        return float(pipe.execute()[0])
+
+    def take(self, key: str, rate: float, capacity: float, cost: float = 1) -> float:
+        # Oku-değiştir-yaz Redis tarafında tek adımda (Lua)
+        return float(self._take_script(
+            keys=[self.prefix + key],
+            args=[rate, capacity, cost, time.time(), _bucket_ttl(rate, capacity)]
+        ))
+
+    def size(self) -> int:
+        return sum(1 for _ in self._client.scan_iter(match=self.prefix + "*", count=1000))
+
+    def stats(self) -> Dict:
+        # Önek taraması (SCAN) yerine O(1) DBSIZE: veritabanındaki tüm anahtarlar
+        return {"backend": self.backend, "db_keys": self._client.dbsize()}
+
+
+_TAKE_LUA = """
+local rate, capacity, cost, now, ttl = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4]), tonumber(ARGV[5])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= cost then tokens = tokens - cost else wait = (cost - tokens) / rate end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(ttl * 1000))
+return tostring(wait)
+"""
+
+
+_state: Optional[SharedState] = None
+
+
+def create_shared_state(backend: str = SHARED_STATE_BACKEND) -> SharedState:
+    """Ayara göre paylaşılan durum backend'i oluştur"""
+    if backend == "redis":
+        return RedisState()
+    if backend == "sqlite":
+        return SQLiteState()
+    return MemoryState()
+
+
+def get_shared_state() -> SharedState:
+    """Process genelinde tek paylaşılan durum nesnesi"""
+    global _state
+    if _state is None:
+        _state = create_shared_state()
+    return _state
@@ -0,0 +1,255 @@
+# storage_manager.py
+import asyncio
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from structured_log import get_logger, log_event
+from upload_stream import save_upload_stream
+
+logger = get_logger("viralcheck.storage")
+
+# Ayarlar (ortam değişkenleri ile değiştirilebilir)
+STORAGE_DIR = os.getenv("UPLOAD_DIR", "uploads")
+STORAGE_MAX_MB = int(os.getenv("STORAGE_MAX_MB", "2048"))  # Disk bütçesi
+STORAGE_TTL_SECONDS = int(os.getenv("STORAGE_TTL_SECONDS", "3600"))  # Son erişimden sonra silinme
+STORAGE_LEASE_TTL_SECONDS = int(os.getenv("STORAGE_LEASE_TTL_SECONDS", str(24 * 3600)))
+STORAGE_REAP_INTERVAL = float(os.getenv("STORAGE_REAP_INTERVAL", "60"))
+
+_SAFE_NAME = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+class StoredUpload(NamedTuple):
+    """Depoya alınmış yükleme: path, işlem bitene kadar geçerli olan hardlink'tir"""
+    path: Path
+    sha256: str
+    size: int
+    deduplicated: bool
+
+
+class StorageManager:
+    """
+    İçerik adresli yükleme deposu
+
+    Dosyalar objects/<sha[:2]>/<sha><uzantı> altında tek kopya tutulur; aynı
+    içerik tekrar yüklenirse yeni kopya yazılmaz. Her analiz dosyaya
+    leases/ altındaki kendi hardlink'i üzerinden erişir: aynı isimli yüklemeler
+    birbirinin üstüne yazmaz, eviction çalışan bir analizin dosyasını silmez
+    (inode son link gidene kadar yaşar). Toplam boyut bütçeyi aşarsa en uzun
+    süredir kullanılmayan ve lease'i olmayan objeler silinir; arka plan
+    görevi TTL'i dolan objeleri ve sahipsiz dosyaları temizler.
+
+    Birden fazla worker aynı klasörü paylaşabilir: her worker disk kullanımını
+    temizlik turlarında diskten yeniden okur, dedup kontrolü diske de bakar.
+    """
+
+    def __init__(self, root: str = STORAGE_DIR, max_bytes: int = STORAGE_MAX_MB * 1024 * 1024,
+                 ttl: int = STORAGE_TTL_SECONDS, lease_ttl: int = STORAGE_LEASE_TTL_SECONDS,
+                 reap_interval: float = STORAGE_REAP_INTERVAL):
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.leases_dir = self.root / "leases"
+        self.tmp_dir = self.root / "tmp"
+        for directory in (self.objects_dir, self.leases_dir, self.tmp_dir):
+            directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.lease_ttl = lease_ttl
+        self.reap_interval = reap_interval
+        self._lock = threading.Lock()
+        # sha256 -> (path, size); sıra = son erişim (LRU başta)
+        self._objects: "OrderedDict[str, Tuple[Path, int]]" = OrderedDict()
+        self._used_bytes = 0
+        self._counters = {"stored": 0, "dedup_hits": 0, "evicted": 0, "expired": 0, "rejected": 0}
+        self._reaper: Optional[asyncio.Task] = None
+        self._scan()
+
+    # --- Yaşam döngüsü ---
+
+    async def start(self):
+        """Arka plan temizleyicisini başlat"""
+        await run_in_threadpool(self.reap)
+        self._reaper = asyncio.create_task(self._reap_loop())
+
+    async def stop(self):
+        if self._reaper is not None:
+            self._reaper.cancel()
+            await asyncio.gather(self._reaper, return_exceptions=True)
+            self._reaper = None
+
+    async def _reap_loop(self):
+        while True:
+            await asyncio.sleep(self.reap_interval)
+            try:
+                await run_in_threadpool(self.reap)
+            except Exception:
+                logger.exception("storage_reap_failed")
+
+    def _scan(self):
+        """Diskteki objeleri son erişim zamanına göre sıralı yükle"""
+        found = []
+        for path in self.objects_dir.glob("*/*"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            found.append((stat.st_mtime, path.name[:64], path, stat.st_size))
+        with self._lock:
+            self._objects.clear()
+            self._used_bytes = 0
+            for _, sha, path, size in sorted(found):
+                self._objects[sha] = (path, size)
+                self._used_bytes += size
+
+    # --- Depolama ---
+
+    async def store(self, file: UploadFile) -> StoredUpload:
+        """
+        Yüklemeyi akış halinde depoya al ve analiz için bir lease (hardlink) döndür
+
+        İşlem bitince release() çağrılmalı.
+        """
+        name = Path(file.filename or "upload").name
+        tmp_path = self.tmp_dir / f"{uuid.uuid4().hex}{Path(name).suffix.lower()}"
+        saved = await save_upload_stream(file, tmp_path)
+        object_path, deduplicated = await run_in_threadpool(self._commit, saved.path, saved.sha256, saved.size)
+        lease = await run_in_threadpool(self._lease, object_path, name)
+        log_event(logger, "upload_stored", sha256=saved.sha256[:12], size=saved.size,
+                  deduplicated=deduplicated)
+        return StoredUpload(path=lease, sha256=saved.sha256, size=saved.size, deduplicated=deduplicated)
+
+    def _commit(self, tmp_path: Path, sha256: str, size: int) -> Tuple[Path, bool]:
+        """Geçici dosyayı objeye dönüştür; aynı içerik varsa geçici dosyayı sil"""
+        with self._lock:
+            existing = self._objects.get(sha256)
+            if existing is None:
+                # Başka bir worker yazmış olabilir
+                on_disk = self.objects_dir / sha256[:2] / f"{sha256}{tmp_path.suffix}"
+                if on_disk.exists():
+                    self._objects[sha256] = existing = (on_disk, size)
+                    self._used_bytes += size
+            if existing is not None and existing[0].exists():
+                tmp_path.unlink(missing_ok=True)
+                self._touch(sha256)
+                self._counters["dedup_hits"] += 1
+                return existing[0], True
+
+            if not self._make_room(size):
+                tmp_path.unlink(missing_ok=True)
+                self._counters["rejected"] += 1
+                raise HTTPException(status_code=507, detail="Depolama alanı dolu, lütfen daha sonra tekrar deneyin")
+
+            object_path = self.objects_dir / sha256[:2] / f"{sha256}{tmp_path.suffix}"
+            object_path.parent.mkdir(exist_ok=True)
+            os.replace(tmp_path, object_path)
+            self._objects[sha256] = (object_path, size)
+            self._used_bytes += size
+            self._counters["stored"] += 1
+            return object_path, False
+
+    def _lease(self, object_path: Path, name: str) -> Path:
+        """Objeye bu işleme özel hardlink aç (dosya adı korunur, çakışma olmaz)"""
+        lease = self.leases_dir / f"{uuid.uuid4().hex}_{_SAFE_NAME.sub('_', name)}"
+        try:
+            os.link(object_path, lease)
+        except OSError as e:
+            # Hardlink desteklemeyen dosya sistemi: objeyi doğrudan kullan
+            log_event(logger, "storage_link_failed", logging.WARNING, error=repr(e))
+            return object_path
+        return lease
+
+    def release(self, path) -> None:
+        """Lease'i bırak; obje dedup için TTL dolana kadar depoda kalır"""
+        path = Path(path)
+        if path.parent.resolve() == self.leases_dir.resolve():
+            path.unlink(missing_ok=True)
+
+    def _touch(self, sha256: str):
+        self._objects.move_to_end(sha256)
+        try:
+            os.utime(self._objects[sha256][0])
+        except FileNotFoundError:
+            pass
+
+    def _make_room(self, size: int) -> bool:
+        """LRU sırasıyla lease'i olmayan objeleri silerek yer aç (kilit altında çağrılır)"""
+        if size > self.max_bytes:
+            return False
+        for sha in list(self._objects):
+            if self._used_bytes + size <= self.max_bytes:
+                break
+            if self._remove(sha, only_unleased=True):
+                self._counters["evicted"] += 1
+        return self._used_bytes + size <= self.max_bytes
+
+    def _remove(self, sha256: str, only_unleased: bool) -> bool:
+        path, size = self._objects[sha256]
+        try:
+            if only_unleased and path.stat().st_nlink > 1:
+                return False
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        del self._objects[sha256]
+        self._used_bytes -= size
+        return True
+
+    # --- Temizlik ---
+
+    def reap(self) -> Dict:
+        """TTL'i dolan objeleri, eski lease'leri ve yarım kalan geçici dosyaları sil"""
+        # Birden fazla worker aynı klasörü kullanır: dizini yeniden tara
+        self._scan()
+        now = time.time()
+        removed = {"objects": 0, "leases": 0, "tmp": 0}
+
+        with self._lock:
+            for sha, (path, _) in list(self._objects.items()):
+                try:
+                    mtime = path.stat().st_mtime
+                except FileNotFoundError:
+                    mtime = 0
+                if now - mtime < self.ttl:
+                    break  # LRU sırası: kalanlar daha yeni
+                if self._remove(sha, only_unleased=True):
+                    removed["objects"] += 1
+            self._counters["expired"] += removed["objects"]
+
+        # Çöken worker'lardan kalan lease'ler ve .part dosyaları
+        for directory, key, max_age in ((self.leases_dir, "leases", self.lease_ttl),
+                                        (self.tmp_dir, "tmp", self.lease_ttl)):
+            for path in directory.iterdir():
+                try:
+                    if now - path.stat().st_mtime > max_age:
+                        path.unlink()
+                        removed[key] += 1
+                except FileNotFoundError:
+                    continue
+
+        if any(removed.values()):
+            log_event(logger, "storage_reaped", **removed)
+        return removed
+
+    def stats(self) -> Dict:
+        with self._lock:
+            used = self._used_bytes
+            objects = len(self._objects)
+            counters = dict(self._counters)
+        return {
+            "objects": objects,
+            "used_mb": round(used / (1024 * 1024), 2),
+            "budget_mb": round(self.max_bytes / (1024 * 1024), 2),
+            "usage_ratio": round(used / self.max_bytes, 3) if self.max_bytes else 0.0,
+            "active_leases": sum(1 for _ in self.leases_dir.iterdir()),
+            "ttl_seconds": self.ttl,
+            **counters
+        }
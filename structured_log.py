@@ -0,0 +1,54 @@
+# structured_log.py
+import json
+import logging
+import os
+import sys
+
+# Ayarlar (ortam değişkenleri ile değiştirilebilir)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # json | text
+
+
+class JsonFormatter(logging.Formatter):
+    """Her kaydı tek satır JSON olarak yaz"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage()
+        }
+        data.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Geliştirme için okunabilir format: event key=value ..."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = " ".join(f"{key}={value}" for key, value in getattr(record, "fields", {}).items())
+        line = f"{record.levelname:<7} {record.name} {record.getMessage()} {fields}".rstrip()
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+def get_logger(name: str = "viralcheck") -> logging.Logger:
+    """Uygulama logger'ı (ilk çağrıda stderr handler'ı kurulur)"""
+    root = logging.getLogger("viralcheck")
+    if not root.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+        root.addHandler(handler)
+        root.setLevel(LOG_LEVEL)
+        root.propagate = False
+    return logging.getLogger(name)
+
+
+def log_event(logger: logging.Logger, event: str, level: int = logging.INFO, **fields):
+    """Yapılandırılmış log: seviye kapalıysa alan sözlüğü hiç formatlanmaz"""
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={"fields": fields})
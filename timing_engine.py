@@ -0,0 +1,406 @@
+# timing_engine.py
+"""
+Paylaşım zamanlaması motoru (platform ve saat dilimi başına 7x24 etkileşim tablosu)
+
+Tablo dosyası (TIMING_TABLES_PATH) geçmiş etkileşim CSV'lerinden çevrimdışı
+üretilir:
+
+    python timing_engine.py build data/engagement_*.csv --out models/timing_tables.json
+
+    {
+      "generated_at": "2025-01-07T12:00:00Z",
+      "tables": [
+        {"platform": "tiktok", "timezone": "Europe/Istanbul", "samples": 48210,
+         "scores": [[0.5, 0.5, ...24 saat], ...7 gün, Pazartesi ilk]}
+      ]
+    }
+
+timezone "*" olan tablo her kullanıcının kendi yerel saatine uygulanır.
+Tablo yoksa yerleşik varsayılan tablo kullanılır (eski sabit kurallar: en iyi
+saatler 10-12 ve 18-21, hafta içi daha iyi). Her tablo yüklenirken saat başına
+skorlar, pencereler ve her saatten başlayan "en iyi sonraki pencereler"
+listeleri bir kez hesaplanır; istek başına maliyet bir saat dilimi dönüşümü
+ve bir dizi erişimidir.
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+# Ayarlar (ortam değişkenleri ile değiştirilebilir)
+TIMING_TABLES_PATH = os.getenv(
+    "TIMING_TABLES_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "timing_tables.json")
+)
+DEFAULT_PLATFORM = "default"
+ANY_TIMEZONE = "*"
+MAX_WINDOWS = 10  # Her saat için saklanan en iyi pencere sayısı
+
+# Üretilen tablolarda skor aralığı (varsayılan tablonun aralığını kapsar)
+SCORE_MIN = 0.5
+SCORE_MAX = 0.9
+
+DAY_NAMES = ("Pazartesi", "Salı", "Çarşamba", "Perşembe", "Cuma", "Cumartesi", "Pazar")
+
+# Varsayılan tablonun rapor bölümü (eski sabit öneri; tüm raporlar paylaşır, değiştirilmemeli)
+DEFAULT_POSTING_TIME = {
+    "today": "18:00 - 21:00",
+    "tomorrow": "10:00 - 12:00",
+    "best_days": ["Salı", "Çarşamba", "Perşembe"],
+    "avoid": "Pazar gece"
+}
+DEFAULT_POSTING_TIP = "⏰ En iyi paylaşım zamanı: Hafta içi 10-12 veya 18-21 arası"
+
+# (haftadaki başlangıç saati, uzunluk, skor)
+Window = Tuple[int, int, float]
+
+
+def _default_score(day: int, hour: int) -> float:
+    """Eski sabit zamanlama kuralı (varsayılan tablo bununla doldurulur)"""
+    # En iyi saatler: 10-12, 18-21
+    if (10 <= hour <= 12) or (18 <= hour <= 21):
+        time_score = 0.9
+    elif (7 <= hour <= 9) or (12 <= hour <= 18):
+        time_score = 0.7
+    else:
+        time_score = 0.5
+
+    # Hafta içi daha iyi
+    day_score = 0.8 if day < 5 else 0.6
+
+    return (time_score + day_score) / 2
+
+
+def _hour_label(hour: int) -> str:
+    return f"{hour % 24:02d}:00"
+
+
+def _span_label(start: int, length: int) -> str:
+    return f"{_hour_label(start)} - {_hour_label(start + length)}"
+
+
+def _best(windows: Iterable[Window]) -> Optional[Window]:
+    """En yüksek skorlu pencere (eşitlikte en erken başlayan)"""
+    return min(windows, key=lambda w: (-w[2], w[0]), default=None)
+
+
+class TimingTable:
+    """Tek platform/saat dilimi için derlenmiş, değişmez 7x24 tablo"""
+
+    __slots__ = ("platform", "timezone", "samples", "scores", "windows", "upcoming",
+                 "rest_of_day", "day_best", "best_days", "avoid", "static_summary")
+
+    def __init__(self, platform: str, timezone: str, scores: List[List[float]], samples: int = 0,
+                 static_summary: Optional[Dict] = None):
+        if len(scores) != 7 or any(len(day) != 24 for day in scores):
+            raise ValueError(f"{platform}/{timezone}: tablo 7 x 24 olmalı")
+        self.platform = platform
+        self.timezone = timezone
+        self.samples = samples
+        # Haftanın saati (gün * 24 + saat) -> skor
+        self.scores: Tuple[float, ...] = tuple(float(v) for day in scores for v in day)
+        self.static_summary = static_summary
+
+        self.windows = self._runs()
+        # Her saatten itibaren önümüzdeki 7 gün: (başlangıca saat farkı, uzunluk, skor), en iyi önce
+        self.upcoming: Tuple[Tuple[Window, ...], ...] = tuple(
+            tuple(sorted(self._ahead(slot), key=lambda w: (-w[2], w[0]))[:MAX_WINDOWS])
+            for slot in range(168)
+        )
+        # Günün kalanındaki en iyi pencere (saat farkı ile) ve her günün en iyi penceresi
+        self.rest_of_day: Tuple[Window, ...] = tuple(
+            _best((offset, min(length, 24 - slot % 24 - offset), score)
+                  for offset, length, score in self._ahead(slot) if offset < 24 - slot % 24)
+            for slot in range(168)
+        )
+        self.day_best: Tuple[Window, ...] = tuple(_best(self._day_windows(day)) for day in range(7))
+
+        means = [sum(self.scores[day * 24:day * 24 + 24]) / 24 for day in range(7)]
+        top_days = sorted(range(7), key=lambda day: (-means[day], day))[:3]
+        self.best_days = [DAY_NAMES[day] for day in sorted(top_days)]
+        worst = min((w for day in range(7) for w in self._day_windows(day)), key=lambda w: (w[2], -w[1], w[0]))
+        self.avoid = f"{DAY_NAMES[worst[0] // 24]} {_span_label(worst[0] % 24, worst[1])}"
+
+    def _runs(self) -> List[Window]:
+        """Haftayı aynı skorlu ardışık saat bloklarına böl (hafta sonu başa bağlanır)"""
+        scores = self.scores
+        starts = [slot for slot in range(168) if scores[slot] != scores[slot - 1]]
+        if not starts:
+            return [(0, 168, scores[0])]
+        return [(start, (starts[(i + 1) % len(starts)] - start) % 168 or 168, scores[start])
+                for i, start in enumerate(starts)]
+
+    def _ahead(self, slot: int) -> List[Window]:
+        """slot'tan başlayan 168 saatteki pencereler; başlangıç slot'a göre saat farkı"""
+        found = []
+        for start, length, score in self.windows:
+            offset = (start - slot) % 168
+            if offset + length > 168:
+                # slot bu pencerenin içinde: şimdiden başlayan kısım ve haftaya kalan baş kısım
+                found.append((0, offset + length - 168, score))
+                length = 168 - offset
+            found.append((offset, length, score))
+        return found
+
+    def _day_windows(self, day: int) -> List[Window]:
+        """Günün sınırlarına kırpılmış pencereler (haftanın saati ile)"""
+        return [(day * 24 + offset, min(length, 24 - offset), score)
+                for offset, length, score in self._ahead(day * 24) if offset < 24]
+
+    def score(self, day: int, hour: int) -> float:
+        return self.scores[day * 24 + hour]
+
+
+class TimingEngine:
+    """
+    Platform ve saat dilimine göre zamanlama skoru ve paylaşım önerisi
+
+    Tablo seçimi: (platform, saat dilimi) → (platform, *) → (default, saat
+    dilimi) → (default, *). Saat dilimi verilmezse zaman olduğu gibi (sunucu
+    yerel saati) kullanılır.
+    """
+
+    def __init__(self, path: str = TIMING_TABLES_PATH):
+        self.path = path
+        self._tables: Optional[Dict[Tuple[str, str], TimingTable]] = None
+        self.source_mtime: Optional[float] = None
+
+    @property
+    def tables(self) -> Dict[Tuple[str, str], TimingTable]:
+        if self._tables is None:
+            self.reload()
+        return self._tables
+
+    def reload(self):
+        """Tablo dosyasını (varsa) yükle; varsayılan tablo her zaman bulunur"""
+        default = TimingTable(DEFAULT_PLATFORM, ANY_TIMEZONE,
+                              [[_default_score(day, hour) for hour in range(24)] for day in range(7)],
+                              static_summary=DEFAULT_POSTING_TIME)
+        tables = {(DEFAULT_PLATFORM, ANY_TIMEZONE): default}
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if mtime is not None:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            for entry in data.get("tables", []):
+                table = TimingTable(entry["platform"].lower(), entry.get("timezone") or ANY_TIMEZONE,
+                                    entry["scores"], entry.get("samples", 0))
+                if table.timezone != ANY_TIMEZONE:
+                    resolve_timezone(table.timezone)  # bozuk dosya yüklenmeden hata versin
+                tables[(table.platform, table.timezone)] = table
+        self._tables = tables  # atomik değişim
+        self.source_mtime = mtime
+
+    def load(self, entries: Iterable[Dict]):
+        """Dosya yerine doğrudan tablo listesinden yükle (test ve benchmark için)"""
+        self.path = ""
+        self.reload()
+        tables = dict(self._tables)
+        for entry in entries:
+            table = TimingTable(entry["platform"].lower(), entry.get("timezone") or ANY_TIMEZONE,
+                                entry["scores"], entry.get("samples", 0))
+            tables[(table.platform, table.timezone)] = table
+        self._tables = tables
+
+    def table(self, platform: Optional[str] = None, timezone: Optional[str] = None) -> TimingTable:
+        tables = self.tables
+        platform = (platform or DEFAULT_PLATFORM).lower()
+        for key in ((platform, timezone), (platform, ANY_TIMEZONE),
+                    (DEFAULT_PLATFORM, timezone), (DEFAULT_PLATFORM, ANY_TIMEZONE)):
+            table = tables.get(key)
+            if table is not None:
+                return table
+        raise KeyError(DEFAULT_PLATFORM)  # varsayılan tablo her zaman yüklüdür
+
+    def score(self, now: datetime, timezone: Optional[str] = None, platform: Optional[str] = None) -> float:
+        """Zamanlama skoru (0-1): kullanıcının yerel saatindeki gün ve saatin tablo değeri"""
+        local = _localize(now, timezone)
+        return self.table(platform, timezone).scores[local.weekday() * 24 + local.hour]
+
+    def best_windows(self, now: datetime, timezone: Optional[str] = None, platform: Optional[str] = None,
+                     limit: int = 3) -> List[Dict]:
+        """Önümüzdeki 7 gündeki en iyi paylaşım pencereleri (skora göre)"""
+        local = _localize(now, timezone)
+        table = self.table(platform, timezone)
+        hour_start = local.replace(minute=0, second=0, microsecond=0)
+        windows = []
+        for offset, length, score in table.upcoming[local.weekday() * 24 + local.hour][:limit]:
+            start = hour_start + timedelta(hours=offset)
+            windows.append({
+                "start": max(start, local).isoformat(timespec="minutes"),
+                "end": (start + timedelta(hours=length)).isoformat(timespec="minutes"),
+                "day": DAY_NAMES[start.weekday()],
+                "score": round(score, 3)
+            })
+        return windows
+
+    def posting_time(self, now: datetime, timezone: Optional[str] = None, platform: Optional[str] = None,
+                     limit: int = 3) -> Dict:
+        """Rapor için en iyi paylaşım zamanı bölümü"""
+        table = self.table(platform, timezone)
+        if table.static_summary is not None and timezone is None and platform is None:
+            return table.static_summary
+        local = _localize(now, timezone)
+        slot = local.weekday() * 24 + local.hour
+        today = table.rest_of_day[slot]
+        tomorrow = table.day_best[(local.weekday() + 1) % 7]
+        return {
+            "today": _span_label(local.hour + today[0], today[1]),
+            "tomorrow": _span_label(tomorrow[0] % 24, tomorrow[1]),
+            "best_days": table.best_days,
+            "avoid": table.avoid,
+            "platform": table.platform,
+            "timezone": timezone or table.timezone,
+            "next_windows": self.best_windows(now, timezone, platform, limit)
+        }
+
+    def posting_tip(self, now: datetime, timezone: Optional[str] = None, platform: Optional[str] = None) -> str:
+        """Öneri metni: posting_time ile aynı tablo ve pencereler (rapordaki bölümle çelişmez)"""
+        table = self.table(platform, timezone)
+        if table.static_summary is not None and timezone is None and platform is None:
+            return DEFAULT_POSTING_TIP
+        local = _localize(now, timezone)
+        today = table.rest_of_day[local.weekday() * 24 + local.hour]
+        tomorrow = table.day_best[(local.weekday() + 1) % 7]
+        return (f"⏰ En iyi paylaşım zamanı: bugün {_span_label(local.hour + today[0], today[1])}, "
+                f"yarın {_span_label(tomorrow[0] % 24, tomorrow[1])}")
+
+    def status(self) -> Dict:
+        tables = self.tables
+        return {
+            "path": self.path,
+            "tables": len(tables),
+            "platforms": sorted({platform for platform, _ in tables}),
+            "source_mtime": self.source_mtime
+        }
+
+
+def resolve_timezone(name: str) -> ZoneInfo:
+    """IANA saat dilimi (ör. Europe/Istanbul); bilinmiyorsa ValueError"""
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Bilinmeyen saat dilimi: {name}")
+
+
+def _localize(now: datetime, timezone: Optional[str]) -> datetime:
+    """Zamanı kullanıcının saat dilimine çevir (naive zaman sunucu yerel saati sayılır)"""
+    if timezone is None:
+        return now
+    return now.astimezone(resolve_timezone(timezone))
+
+
+_engine: Optional[TimingEngine] = None
+
+
+def get_timing_engine() -> TimingEngine:
+    """Process genelinde tek zamanlama motoru"""
+    global _engine
+    if _engine is None:
+        _engine = TimingEngine()
+    return _engine
+
+
+# --- Çevrimdışı tablo üretimi ---
+
+def _parse_time(value: str) -> datetime:
+    """ISO 8601 veya Unix zamanı; saat dilimi yoksa UTC"""
+    value = value.strip()
+    try:
+        parsed = datetime.fromtimestamp(float(value), dt_timezone.utc)
+    except ValueError:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=dt_timezone.utc)
+
+
+def aggregate(rows: Iterable[Dict], default_timezone: str = "UTC", prior: float = 20.0,
+              step: float = 0.05) -> List[Dict]:
+    """
+    Etkileşim satırlarını (platform, posted_at, engagement, [timezone]) tablolara çevir
+
+    Her satır kitlenin saat diliminde gün/saat hücresine yazılır. Etkileşim
+    log1p ile sıkıştırılır (viral uç değerler tabloyu ezmesin), az örnekli
+    hücreler platform ortalamasına çekilir (prior kadar sanal örnek). Hücre
+    ortalamaları SCORE_MIN-SCORE_MAX aralığına ölçeklenip step'e yuvarlanır:
+    eşit skorlu ardışık saatler tek pencere olur. Platform başına ayrıca tüm
+    saat dilimlerinin yerel saatlerinden "*" tablosu üretilir.
+    """
+    sums: Dict[Tuple[str, str], List[float]] = {}
+    counts: Dict[Tuple[str, str], List[int]] = {}
+    zones: Dict[str, ZoneInfo] = {}
+    for row in rows:
+        platform = (row.get("platform") or DEFAULT_PLATFORM).strip().lower()
+        tz_name = (row.get("timezone") or default_timezone).strip()
+        if tz_name not in zones:
+            zones[tz_name] = resolve_timezone(tz_name)
+        local = _parse_time(row["posted_at"]).astimezone(zones[tz_name])
+        value = math.log1p(max(float(row["engagement"]), 0.0))
+        slot = local.weekday() * 24 + local.hour
+        for key in ((platform, tz_name), (platform, ANY_TIMEZONE)):
+            if key not in sums:
+                sums[key] = [0.0] * 168
+                counts[key] = [0] * 168
+            sums[key][slot] += value
+            counts[key][slot] += 1
+
+    tables = []
+    for (platform, tz_name), cell_sums in sorted(sums.items()):
+        cell_counts = counts[(platform, tz_name)]
+        total = sum(cell_counts)
+        mean = sum(cell_sums) / total
+        smoothed = [(s + prior * mean) / (c + prior) for s, c in zip(cell_sums, cell_counts)]
+        low, high = min(smoothed), max(smoothed)
+        spread = (high - low) or 1.0
+        scores = [
+            round(round((SCORE_MIN + (SCORE_MAX - SCORE_MIN) * (v - low) / spread) / step) * step, 4)
+            for v in smoothed
+        ]
+        tables.append({"platform": platform, "timezone": tz_name, "samples": total,
+                       "scores": [scores[day * 24:day * 24 + 24] for day in range(7)]})
+    return tables
+
+
+def _read_rows(paths: List[str]) -> Iterable[Dict]:
+    for path in paths:
+        with open(path, newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Etkileşim CSV'lerinden zamanlama tabloları üret")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="CSV'leri 7x24 tablolara topla")
+    build.add_argument("csv", nargs="+", help="Sütunlar: platform, posted_at, engagement, [timezone]")
+    build.add_argument("--out", default=TIMING_TABLES_PATH)
+    build.add_argument("--timezone", default="UTC", help="timezone sütunu boşsa kitlenin saat dilimi")
+    build.add_argument("--prior", type=float, default=20.0, help="Az örnekli hücreler için sanal örnek sayısı")
+    build.add_argument("--step", type=float, default=0.05, help="Skor yuvarlama adımı")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    tables = aggregate(_read_rows(args.csv), args.timezone, args.prior, args.step)
+    if not tables:
+        sys.exit("CSV'lerde satır bulunamadı")
+    for entry in tables:
+        TimingTable(entry["platform"], entry["timezone"], entry["scores"])  # doğrulama
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    tmp_path = f"{args.out}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"generated_at": datetime.now(dt_timezone.utc).isoformat(timespec="seconds"),
+                   "tables": tables}, f, ensure_ascii=False)
+    os.replace(tmp_path, args.out)  # çalışan sunucular yarım dosya görmesin
+    print(f"{len(tables)} tablo, {sum(t['samples'] for t in tables if t['timezone'] != ANY_TIMEZONE)} satır "
+          f"→ {args.out} ({time.perf_counter() - started:.1f} sn)")
+
+
+if __name__ == "__main__":
+    main()
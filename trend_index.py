@@ -0,0 +1,290 @@
+# trend_index.py
+"""
+Trend sinyal indeksi (trend konular, hashtag'ler ve ses ID'leri)
+
+Snapshot dosyası dışarıdan periyodik olarak yenilenir (TREND_SNAPSHOT_PATH):
+
+    {
+      "generated_at": "2025-01-07T12:00:00Z",
+      "half_life_hours": 48,
+      "terms": [
+        {"term": "#dance challenge", "kind": "hashtag", "weight": 0.9,
+         "seen_at": "2025-01-07T10:00:00Z", "half_life_hours": 24},
+        {"term": "audio:7281937", "kind": "audio", "weight": 0.7}
+      ]
+    }
+
+Terimler kelime (token) düzeyinde bir Aho-Corasick otomatına derlenir: arama
+süresi metnin uzunluğuyla orantılıdır, terim sayısından bağımsızdır. Ağırlık
+sorgu anında yarı ömre göre azaltılır (exp decay), böylece yeniden derlemeye
+gerek kalmaz. Dosya değişince yeni otomat arka planda kurulur ve tek bir
+referans ataması ile devreye alınır; istekler hiç beklemez.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from structured_log import get_logger, log_event
+
+logger = get_logger("viralcheck.trends")
+
+# Ayarlar (ortam değişkenleri ile değiştirilebilir)
+TREND_SNAPSHOT_PATH = os.getenv(
+    "TREND_SNAPSHOT_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "trend_snapshot.json")
+)
+TREND_REFRESH_SECONDS = float(os.getenv("TREND_REFRESH_SECONDS", "300"))
+DEFAULT_HALF_LIFE_HOURS = 48.0
+
+# Trend skoru: eşleşmelerle TREND_BASE'den TREND_BASE + TREND_SPAN'a kadar. TREND_BASE,
+# scorer'ın metin/indeks yokken kullandığı nötr tahmin; eşleşme yoksa skor üretilmez
+TREND_BASE = 0.6
+TREND_SPAN = 0.35
+
+_TOKEN = re.compile(r"[#@]?\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Küçük harfe çevrilmiş kelimeler (#hashtag ve @kullanıcı korunur)"""
+    return _TOKEN.findall(text.replace("İ", "i").lower())
+
+
+def _timestamp(value) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+
+
+class TrendSnapshot:
+    """Derlenmiş, değişmez trend otomatı"""
+
+    __slots__ = ("vocab", "goto", "fail", "term_at", "output_link", "terms", "source_mtime", "loaded_at",
+                 "version")
+
+    def __init__(self, entries: Iterable[Dict], default_half_life: float = DEFAULT_HALF_LIFE_HOURS,
+                 source_mtime: Optional[float] = None, version: Optional[str] = None):
+        self.vocab: Dict[str, int] = {}
+        self.goto: Dict[Tuple[int, int], int] = {}
+        self.fail: List[int] = [0]
+        self.term_at: List[int] = [-1]  # Durumda biten terim (yoksa -1)
+        self.output_link: List[int] = [0]  # Terim biten en yakın sonek durumu (yoksa 0)
+        # (terim, tür, ağırlık, görülme zamanı, yarı ömür saniye)
+        self.terms: List[Tuple[str, str, float, Optional[float], float]] = []
+        self.source_mtime = source_mtime
+        self.loaded_at = time.time()
+        # Snapshot kimliği (cache anahtarı ve rescore checkpoint'i için)
+        self.version = version or (str(source_mtime) if source_mtime is not None else f"inline:{self.loaded_at}")
+
+        for entry in entries:
+            tokens = tokenize(entry["term"])
+            if not tokens:
+                continue
+            state = 0
+            for token in tokens:
+                token_id = self.vocab.setdefault(token, len(self.vocab))
+                next_state = self.goto.get((state, token_id))
+                if next_state is None:
+                    next_state = len(self.fail)
+                    self.goto[(state, token_id)] = next_state
+                    self.fail.append(0)
+                    self.term_at.append(-1)
+                    self.output_link.append(0)
+                state = next_state
+            half_life = float(entry.get("half_life_hours") or default_half_life) * 3600
+            term = (entry["term"], entry.get("kind", "topic"), float(entry.get("weight", 1.0)),
+                    _timestamp(entry.get("seen_at")), half_life)
+            if self.term_at[state] == -1:
+                self.term_at[state] = len(self.terms)
+                self.terms.append(term)
+            elif term[2] > self.terms[self.term_at[state]][2]:
+                self.terms[self.term_at[state]] = term  # Aynı terim: yüksek ağırlık kalsın
+
+        self._link()
+
+    def _link(self):
+        """Genişlik öncelikli sırayla failure ve output linklerini kur"""
+        children: Dict[int, List[Tuple[int, int]]] = {}
+        for (state, token_id), child in self.goto.items():
+            children.setdefault(state, []).append((token_id, child))
+
+        queue = [child for _, child in children.get(0, [])]
+        for state in queue:  # kuyruk büyüdükçe devam eder
+            for token_id, child in children.get(state, []):
+                fallback = self.fail[state]
+                while fallback and (fallback, token_id) not in self.goto:
+                    fallback = self.fail[fallback]
+                target = self.goto.get((fallback, token_id), 0)
+                self.fail[child] = target if target != child else 0
+                suffix = self.fail[child]
+                self.output_link[child] = suffix if self.term_at[suffix] != -1 else self.output_link[suffix]
+                queue.append(child)
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def match(self, text: str) -> List[int]:
+        """Metinde geçen terimlerin indeksleri (tekrarsız)"""
+        vocab, goto, fail = self.vocab, self.goto, self.fail
+        term_at, output_link = self.term_at, self.output_link
+        found = set()
+        state = 0
+        for token in tokenize(text):
+            token_id = vocab.get(token)
+            if token_id is None:
+                state = 0  # Hiçbir terimde geçmeyen kelime: baştan başla
+                continue
+            while state and (state, token_id) not in goto:
+                state = fail[state]
+            state = goto.get((state, token_id), 0)
+            hit = state if term_at[state] != -1 else output_link[state]
+            while hit:
+                found.add(term_at[hit])
+                hit = output_link[hit]
+        return list(found)
+
+    def weight(self, index: int, now: float) -> float:
+        """Terimin yarı ömre göre azaltılmış ağırlığı"""
+        _, _, weight, seen_at, half_life = self.terms[index]
+        if seen_at is None or now <= seen_at:
+            return weight
+        return weight * 0.5 ** ((now - seen_at) / half_life)
+
+
+class TrendIndex:
+    """
+    Snapshot dosyasını izleyen, otomatı arka planda yenileyen trend indeksi
+
+    Okuyucular her zaman tamamlanmış bir TrendSnapshot görür: yeni snapshot
+    ayrı kurulur ve referans tek atamayla değiştirilir (kilit gerekmez).
+    """
+
+    def __init__(self, path: str = TREND_SNAPSHOT_PATH, refresh_seconds: float = TREND_REFRESH_SECONDS):
+        self.path = path
+        self.refresh_seconds = refresh_seconds
+        self._snapshot: Optional[TrendSnapshot] = None
+        self._task: Optional[asyncio.Task] = None
+        self.reloads = 0
+
+    @property
+    def version(self) -> Optional[str]:
+        """Yüklü snapshot'ın kimliği (yüklü değilse None)"""
+        snapshot = self._snapshot
+        return snapshot.version if snapshot is not None else None
+
+    @property
+    def loaded(self) -> bool:
+        snapshot = self._snapshot
+        return snapshot is not None and len(snapshot) > 0
+
+    def reload_if_changed(self) -> bool:
+        """Dosya değiştiyse yeni snapshot kur ve devreye al (thread pool'da çalışır)"""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return False
+        current = self._snapshot
+        if current is not None and current.source_mtime == mtime:
+            return False
+
+        started = time.perf_counter()
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        version = f"{data['generated_at']}@{mtime}" if data.get("generated_at") else None
+        snapshot = TrendSnapshot(data.get("terms", []), data.get("half_life_hours", DEFAULT_HALF_LIFE_HOURS),
+                                 source_mtime=mtime, version=version)
+        self._snapshot = snapshot  # atomik değişim
+        self.reloads += 1
+        log_event(logger, "trend_snapshot_loaded", terms=len(snapshot),
+                  build_ms=round((time.perf_counter() - started) * 1000, 1))
+        return True
+
+    def load(self, entries: Iterable[Dict], default_half_life: float = DEFAULT_HALF_LIFE_HOURS):
+        """Dosya yerine doğrudan terim listesinden yükle (test ve benchmark için)"""
+        self._snapshot = TrendSnapshot(entries, default_half_life)
+        self.reloads += 1
+
+    async def start(self):
+        await self._safe_reload()
+        self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            await self._safe_reload()
+
+    async def _safe_reload(self):
+        try:
+            await run_in_threadpool(self.reload_if_changed)
+        except Exception as e:
+            # Bozuk snapshot: eskisiyle devam et
+            log_event(logger, "trend_snapshot_failed", logging.WARNING, path=self.path, error=repr(e))
+
+    def matches(self, text: str, now: Optional[float] = None) -> List[Dict]:
+        """Metindeki trend terimleri ve güncel ağırlıkları"""
+        snapshot = self._snapshot
+        if snapshot is None or not text:
+            return []
+        now = now or time.time()
+        return [
+            {"term": snapshot.terms[i][0], "kind": snapshot.terms[i][1],
+             "weight": round(snapshot.weight(i, now), 4)}
+            for i in snapshot.match(text)
+        ]
+
+    def score(self, text: str, now: Optional[float] = None) -> Optional[float]:
+        """
+        Trend skoru (0-1); indeks yüklü değilse veya metinde trend yoksa None
+
+        Eşleşen terimler noisy-OR ile birleştirilir: tek güçlü trend skoru
+        yükseltir, çok sayıda zayıf eşleşme 1'i aşmaz. Eşleşme olmaması skoru
+        düşürmez: scorer nötr tahminini kullanır (açıklama göndermek skoru
+        göndermemekten düşük yapmaz).
+        """
+        snapshot = self._snapshot
+        if snapshot is None or len(snapshot) == 0:
+            return None
+        matched = snapshot.match(text or "")
+        if not matched:
+            return None
+        now = now or time.time()
+        miss = 1.0
+        for i in matched:
+            miss *= 1.0 - min(max(snapshot.weight(i, now), 0.0), 1.0)
+        return TREND_BASE + TREND_SPAN * (1.0 - miss)
+
+    def status(self) -> Dict:
+        snapshot = self._snapshot
+        return {
+            "path": self.path,
+            "terms": len(snapshot) if snapshot else 0,
+            "states": len(snapshot.fail) if snapshot else 0,
+            "loaded_at": snapshot.loaded_at if snapshot else None,
+            "version": snapshot.version if snapshot else None,
+            "reloads": self.reloads
+        }
+
+
+_index: Optional[TrendIndex] = None
+
+
+def get_trend_index() -> TrendIndex:
+    """Process genelinde tek trend indeksi"""
+    global _index
+    if _index is None:
+        _index = TrendIndex()
+    return _index
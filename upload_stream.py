@@ -0,0 +1,189 @@
+# upload_stream.py
+import hashlib
+import os
+import uuid
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from fastapi import HTTPException, Request, UploadFile
+from starlette.concurrency import run_in_threadpool
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ModuleNotFoundError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+# Ayarlar (ortam değişkenleri ile değiştirilebilir)
+CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))  # 1 MB
+MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "500"))
+MAX_UPLOAD_BYTES = MAX_UPLOAD_MB * 1024 * 1024
+# Multipart sınırları ve form alanları için pay: Content-Length bundan büyükse gövde okunmadan 413
+MAX_BODY_BYTES = MAX_UPLOAD_BYTES + 64 * 1024
+
+
+class UploadHead(NamedTuple):
+    """Multipart yüklemenin yalnızca okunan baş kısmı"""
+    filename: str
+    data: bytes
+    approx_size: Optional[int]
+
+
+class SavedUpload(NamedTuple):
+    """Diske yazılmış yüklemenin bilgileri"""
+    path: Path
+    sha256: str
+    size: int
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"Dosya çok büyük. Maksimum boyut: {MAX_UPLOAD_MB} MB"
+    )
+
+
+def _write_chunk(out, digest, chunk: bytes) -> None:
+    """Parçayı hash'e ekle ve dosyaya yaz (thread pool'da çalışır)"""
+    digest.update(chunk)
+    out.write(chunk)
+
+
+async def save_upload_stream(
+    file: UploadFile,
+    destination: Path,
+    max_bytes: int = MAX_UPLOAD_BYTES,
+    chunk_size: int = CHUNK_SIZE,
+) -> SavedUpload:
+    """
+    Yüklenen dosyayı parça parça diske yaz
+
+    Event loop'u bloklamaz: okuma ve yazma thread pool'da yapılır, bellekte
+    en fazla bir parça tutulur. SHA-256 yazma sırasında hesaplanır. Dosya önce
+    aynı klasörde geçici bir isimle yazılır, bitince atomik olarak taşınır.
+
+    Args:
+        file: FastAPI UploadFile
+        destination: Hedef dosya yolu
+        max_bytes: İzin verilen maksimum boyut
+        chunk_size: Okuma parça boyutu
+
+    Returns:
+        SavedUpload (path, sha256, size)
+    """
+    # Boyut biliniyorsa hiç yazmadan reddet (Content-Length sınırı admission'da, gövde okunmadan)
+    if file.size is not None and file.size > max_bytes:
+        raise _too_large()
+
+    destination = Path(destination)
+    tmp_path = destination.with_name(f".{destination.name}.{uuid.uuid4().hex}.part")
+    digest = hashlib.sha256()
+    size = 0
+
+    out = await run_in_threadpool(open, tmp_path, "wb")
+    try:
+        while True:
+            chunk = await file.read(chunk_size)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise _too_large()
+            await run_in_threadpool(_write_chunk, out, digest, chunk)
+        await run_in_threadpool(out.close)
+        await run_in_threadpool(os.replace, tmp_path, destination)
+    except BaseException:
+        out.close()
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    return SavedUpload(path=destination, sha256=digest.hexdigest(), size=size)
+
+
+async def hash_upload(file: UploadFile, chunk_size: int = CHUNK_SIZE, max_bytes: int = MAX_UPLOAD_BYTES) -> str:
+    """
+    Yüklenen dosyanın SHA-256 hash'ini diske yazmadan hesapla
+
+    Okuma bitince dosya başa sarılır, yani ardından save_upload_stream çağrılabilir.
+    max_bytes aşılınca okuma bırakılır (413).
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise _too_large()
+    digest = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            raise _too_large()
+        await run_in_threadpool(digest.update, chunk)
+    await file.seek(0)
+    return digest.hexdigest()
+
+
+async def read_upload_head(request: Request, max_bytes: int, field: str = "file") -> UploadHead:
+    """
+    Multipart istekten dosya alanının yalnızca ilk max_bytes byte'ını oku
+
+    Gövde akış halinde çözümlenir; yeterli veri gelince okuma bırakılır, yani
+    dosyanın geri kalanı ne belleğe ne diske yazılır. Dosya boyutu
+    Content-Length'ten yaklaşık olarak verilir.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=400, detail="multipart/form-data bekleniyor")
+
+    state = {"headers": {}, "header_field": b"", "header_value": b"", "is_target": False,
+             "filename": None, "done": False}
+    head = bytearray()
+
+    def on_header_field(data, start, end):
+        state["header_field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        state["header_value"] += data[start:end]
+
+    def on_header_end():
+        state["headers"][state["header_field"].lower()] = state["header_value"]
+        state["header_field"] = state["header_value"] = b""
+
+    def on_headers_finished():
+        _, disposition = parse_options_header(state["headers"].get(b"content-disposition", b""))
+        name = disposition.get(b"name", b"").decode("utf-8", "replace")
+        if name == field and b"filename" in disposition:
+            state["is_target"] = True
+            state["filename"] = disposition[b"filename"].decode("utf-8", "replace")
+        state["headers"] = {}
+
+    def on_part_data(data, start, end):
+        if state["is_target"] and len(head) < max_bytes:
+            head.extend(data[start:min(end, start + max_bytes - len(head))])
+            if len(head) >= max_bytes:
+                state["done"] = True
+
+    def on_part_end():
+        if state["is_target"]:
+            state["done"] = True
+        state["is_target"] = False
+
+    parser = MultipartParser(params[b"boundary"], {
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+
+    async for chunk in request.stream():
+        parser.write(chunk)
+        if state["done"]:
+            break
+
+    if state["filename"] is None:
+        raise HTTPException(status_code=400, detail=f"'{field}' dosya alanı bulunamadı")
+
+    content_length = request.headers.get("content-length")
+    approx_size = int(content_length) if content_length and content_length.isdigit() else None
+    return UploadHead(filename=state["filename"], data=bytes(head), approx_size=approx_size)
@@ -0,0 +1,217 @@
+# video_features.py
+"""
+Yerel video özellik çıkarıcı (ffmpeg ile kare örnekleme)
+
+Kareler düşük çözünürlükte gri tonlu olarak ffmpeg'den pipe ile tek tek okunur;
+bellekte en fazla iki kare tutulur, video ne kadar uzun olursa olsun bellek sabit
+kalır. Çözümleme ayrı process'lerde (ProcessPoolExecutor) çalışır, API worker'ı
+bloklanmaz. ffmpeg yoksa özellik çıkarımı atlanır.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+from structured_log import get_logger, log_event
+
+logger = get_logger("viralcheck.video_features")
+
+# Ayarlar (ortam değişkenleri ile değiştirilebilir)
+FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
+ENABLED = os.getenv("VIDEO_FEATURES_ENABLED", "1") == "1"
+SAMPLE_FPS = float(os.getenv("VIDEO_FEATURES_FPS", "4"))
+MAX_SECONDS = float(os.getenv("VIDEO_FEATURES_MAX_SECONDS", "600"))  # 0 = tamamı
+PROCESS_WORKERS = int(os.getenv("VIDEO_FEATURES_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+TIMEOUT_SECONDS = float(os.getenv("VIDEO_FEATURES_TIMEOUT", "120"))
+
+FRAME_WIDTH, FRAME_HEIGHT = 64, 36
+FRAME_BYTES = FRAME_WIDTH * FRAME_HEIGHT
+CUT_THRESHOLD = 40.0  # Ardışık kareler arası ortalama fark (0-255) bu değeri aşarsa sahne geçişi
+HOOK_SECONDS = 3.0
+
+_VOLUME_RE = re.compile(r"mean_volume:\s*(-?[\d.]+) dB")
+
+
+def ffmpeg_available() -> bool:
+    return shutil.which(FFMPEG_BIN) is not None
+
+
+def _time_limit_args():
+    return ["-t", str(MAX_SECONDS)] if MAX_SECONDS > 0 else []
+
+
+def _frame_stats(path: str, timeout: float = TIMEOUT_SECONDS) -> Dict:
+    """Kareleri akış halinde oku: parlaklık, hareket, kesme sayısı ve ilk 3 sn"""
+    import numpy as np  # Worker process'lerinde çözümleme için; API açılışında yüklenmez
+
+    cmd = [
+        FFMPEG_BIN, "-nostdin", "-v", "error", *_time_limit_args(), "-i", path, "-an",
+        "-vf", f"fps={SAMPLE_FPS},scale={FRAME_WIDTH}:{FRAME_HEIGHT},format=gray",
+        "-f", "rawvideo", "pipe:1"
+    ]
+    hook_frames = int(HOOK_SECONDS * SAMPLE_FPS)
+    frames = 0
+    brightness_sum = 0.0
+    motion_sum = 0.0
+    cuts = 0
+    hook_motion = 0.0
+    hook_cuts = 0
+    hook_brightness = []
+    previous = None
+
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    # Dıştaki wait_for yalnızca sonucu beklemeyi bırakır; takılan ffmpeg havuz
+    # process'ini tutmasın diye süre dolunca burada öldürülür
+    timed_out = threading.Event()
+
+    def kill():
+        timed_out.set()
+        process.kill()
+
+    watchdog = threading.Timer(timeout, kill)
+    watchdog.daemon = True
+    watchdog.start()
+    try:
+        while True:
+            raw = process.stdout.read(FRAME_BYTES)
+            if len(raw) < FRAME_BYTES:
+                break
+            frame = np.frombuffer(raw, dtype=np.uint8).astype(np.int16)
+            brightness = float(frame.mean())
+            brightness_sum += brightness
+            if frames < hook_frames:
+                hook_brightness.append(brightness)
+
+            if previous is not None:
+                diff = float(np.abs(frame - previous).mean())
+                motion_sum += diff
+                is_cut = diff > CUT_THRESHOLD
+                cuts += is_cut
+                if frames < hook_frames:
+                    hook_motion += diff
+                    hook_cuts += is_cut
+            previous = frame
+            frames += 1
+    finally:
+        watchdog.cancel()
+        process.stdout.close()
+        process.wait()
+    if timed_out.is_set():
+        raise subprocess.TimeoutExpired(cmd, timeout)
+
+    if frames == 0:
+        return {"frames_sampled": 0}
+
+    duration = frames / SAMPLE_FPS
+    hook_pairs = max(min(frames, hook_frames) - 1, 1)
+    # Hook: ilk 3 sn'deki hareket + sahne geçişi + parlaklık değişimi (0-1)
+    hook_motion_score = min(hook_motion / hook_pairs / 20.0, 1.0)
+    hook_cut_score = min(hook_cuts / 2.0, 1.0)
+    hook_contrast = (max(hook_brightness) - min(hook_brightness)) / 255.0 if hook_brightness else 0.0
+    hook_strength = 0.5 * hook_motion_score + 0.3 * hook_cut_score + 0.2 * min(hook_contrast * 4, 1.0)
+
+    return {
+        "frames_sampled": frames,
+        "sampled_duration_seconds": round(duration, 2),
+        "brightness": round(brightness_sum / frames / 255.0, 4),
+        "motion_energy": round(motion_sum / max(frames - 1, 1) / 255.0, 4),
+        "cut_rate_per_min": round(cuts / duration * 60.0, 2),
+        "hook_strength": round(hook_strength, 4)
+    }
+
+
+def _audio_loudness(path: str, timeout: float = TIMEOUT_SECONDS) -> Optional[float]:
+    """Ortalama ses seviyesi (dBFS); ses yoksa veya süre yetmezse None"""
+    if timeout <= 0:
+        return None
+    cmd = [
+        FFMPEG_BIN, "-nostdin", "-hide_banner", "-nostats", *_time_limit_args(), "-i", path,
+        "-vn", "-af", "volumedetect", "-f", "null", "-"
+    ]
+    try:
+        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return None
+    match = _VOLUME_RE.search(result.stderr.decode("utf-8", "replace"))
+    return float(match.group(1)) if match else None
+
+
+def extract_features(path: str) -> Dict:
+    """Tek video için özellikler (worker process'te çalışır)"""
+    # İki aşama tek süreyi paylaşır: worker, API'nin beklediği TIMEOUT_SECONDS'tan uzun meşgul kalmaz
+    deadline = time.monotonic() + TIMEOUT_SECONDS
+    features = {"source": "local_frames", **_frame_stats(path, TIMEOUT_SECONDS)}
+    features["loudness_db"] = _audio_loudness(path, deadline - time.monotonic())
+    return features
+
+
+def _warm_worker() -> int:
+    """Worker'da çözümleme kütüphanelerini yükle"""
+    import numpy  # noqa: F401
+    return os.getpid()
+
+
+class VideoFeatureExtractor:
+    """Özellik çıkarımını process havuzunda çalıştırır (havuz ilk kullanımda açılır)"""
+
+    def __init__(self, workers: int = PROCESS_WORKERS):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # warm_up thread'de, extract event loop'ta çağrılır: havuz iki kez açılmasın
+        self._pool_lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return ENABLED and ffmpeg_available()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._executor is None:
+                # spawn: uvicorn'un thread'leri fork ile kopyalanmasın
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    async def extract(self, path: str) -> Optional[Dict]:
+        """Özellikleri çıkar; ffmpeg yoksa veya hata olursa None"""
+        if not self.available:
+            return None
+        loop = asyncio.get_running_loop()
+        try:
+            return await asyncio.wait_for(
+                loop.run_in_executor(self._pool(), extract_features, str(path)),
+                timeout=TIMEOUT_SECONDS
+            )
+        except Exception as e:
+            log_event(logger, "video_features_failed", logging.WARNING, path=str(path), error=repr(e))
+            return None
+
+    def warm_up(self) -> int:
+        """Havuz process'lerini önceden başlat (ilk video spawn beklemesin); hazır worker sayısı"""
+        if not self.available:
+            return 0
+        pool = self._pool()
+        return len({future.result() for future in [pool.submit(_warm_worker) for _ in range(self.workers)]})
+
+    def shutdown(self):
+        with self._pool_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def status(self) -> Dict:
+        return {
+            "enabled": ENABLED,
+            "ffmpeg": ffmpeg_available(),
+            "workers": self.workers,
+            "pool_started": self._executor is not None
+        }
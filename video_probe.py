@@ -0,0 +1,231 @@
+# video_probe.py
+"""Video dosyasının ilk KB'larından container metadata'sı çıkarır (decode yok)"""
+import struct
+from typing import Dict, Iterator, Optional, Tuple
+
+# Okunacak maksimum başlık boyutu
+HEADER_PROBE_BYTES = 64 * 1024
+
+
+def probe_header(data: bytes, total_size: Optional[int] = None) -> Dict:
+    """
+    Container başlığını çözümle
+
+    Args:
+        data: Dosyanın ilk byte'ları
+        total_size: Dosyanın toplam boyutu (biliniyorsa bitrate için)
+
+    Returns:
+        container, duration_seconds, width, height, video_codec, audio_codec,
+        bitrate_kbps alanları (bulunamayanlar yok). Bozuk/kesik başlıkta
+        o ana kadar okunanlar döner, hata fırlatılmaz.
+    """
+    if len(data) >= 12 and data[4:8] in (b"ftyp", b"moov", b"mdat", b"free", b"wide"):
+        meta, probe = {"container": "mp4"}, _probe_iso_bmff
+    elif data[:4] == b"\x1a\x45\xdf\xa3":
+        meta, probe = {"container": "matroska"}, _probe_matroska
+    elif data[:4] == b"RIFF" and data[8:12] == b"AVI ":
+        meta, probe = {"container": "avi"}, _probe_avi
+    else:
+        meta, probe = {"container": "unknown"}, None
+    if probe is not None:
+        try:
+            probe(data, meta)
+        except (struct.error, ValueError, IndexError):
+            meta["truncated"] = True  # Kesik veya bozuk başlık: kısmi metadata
+
+    if total_size:
+        meta["size_bytes"] = total_size
+        if meta.get("duration_seconds"):
+            meta["bitrate_kbps"] = int(total_size * 8 / meta["duration_seconds"] / 1000)
+    return meta
+
+
+# --- MP4 / MOV (ISO BMFF) ---
+
+_ISO_CONTAINERS = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+
+
+def _iter_boxes(data: bytes, start: int, end: int) -> Iterator[Tuple[bytes, int, int]]:
+    """(tip, içerik başı, içerik sonu) üret; yarım kalan kutuda durur"""
+    pos = start
+    while pos + 8 <= end:
+        size, kind = struct.unpack(">I4s", data[pos:pos + 8])
+        header = 8
+        if size == 1:
+            if pos + 16 > end:
+                return
+            size = struct.unpack(">Q", data[pos + 8:pos + 16])[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            return
+        yield kind, pos + header, min(pos + size, end)
+        pos += size
+
+
+def _probe_iso_bmff(data: bytes, meta: Dict) -> Dict:
+    tracks = []
+
+    def walk(start: int, end: int, track: Optional[Dict]):
+        for kind, body, body_end in _iter_boxes(data, start, end):
+            if kind == b"ftyp":
+                brand = data[body:body + 4]
+                meta["container"] = "mov" if brand == b"qt  " else "mp4"
+                meta["brand"] = brand.decode("latin-1").strip()
+            elif kind == b"mvhd" and body_end > body and body_end - body >= (32 if data[body] == 1 else 20):
+                # v1: 64 bit zamanlar, süre body+24..32; v0: body+16..20
+                version = data[body]
+                if version == 1:
+                    timescale, duration = struct.unpack(">IQ", data[body + 20:body + 32])
+                else:
+                    timescale, duration = struct.unpack(">II", data[body + 12:body + 20])
+                if timescale:
+                    meta["duration_seconds"] = round(duration / timescale, 3)
+            elif kind == b"trak":
+                new_track = {}
+                tracks.append(new_track)
+                walk(body, body_end, new_track)
+            elif (kind == b"tkhd" and track is not None and body_end > body
+                  and body_end - body >= (96 if data[body] == 1 else 84)):
+                offset = body + (92 if data[body] == 1 else 80) - 4
+                width, height = struct.unpack(">II", data[offset:offset + 8])
+                track["width"], track["height"] = width >> 16, height >> 16
+            elif kind == b"hdlr" and track is not None and body_end - body >= 12:
+                track["handler"] = data[body + 8:body + 12]
+            elif kind == b"stsd" and track is not None and body_end - body >= 16:
+                track["codec"] = data[body + 12:body + 16].decode("latin-1").strip()
+            elif kind in _ISO_CONTAINERS:
+                walk(body, body_end, track)
+
+    walk(0, len(data), None)
+    if "duration_seconds" not in meta:
+        # moov atomu dosya sonunda (faststart değil)
+        meta["moov_in_header"] = False
+
+    for track in tracks:
+        if track.get("handler") == b"vide":
+            if track.get("width"):
+                meta["width"], meta["height"] = track["width"], track["height"]
+            if track.get("codec"):
+                meta["video_codec"] = track["codec"]
+        elif track.get("handler") == b"soun" and track.get("codec"):
+            meta["audio_codec"] = track["codec"]
+    return meta
+
+
+# --- Matroska / WebM (EBML) ---
+
+_EBML_DOCTYPE = 0x4282
+_MKV_SEGMENT = 0x18538067
+_MKV_INFO = 0x1549A966
+_MKV_TIMECODE_SCALE = 0x2AD7B1
+_MKV_DURATION = 0x4489
+_MKV_TRACKS = 0x1654AE6B
+_MKV_TRACK_ENTRY = 0xAE
+_MKV_TRACK_TYPE = 0x83
+_MKV_CODEC_ID = 0x86
+_MKV_VIDEO = 0xE0
+_MKV_PIXEL_WIDTH = 0xB0
+_MKV_PIXEL_HEIGHT = 0xBA
+_MKV_MASTERS = {_MKV_SEGMENT, _MKV_INFO, _MKV_TRACKS, _MKV_TRACK_ENTRY, _MKV_VIDEO}
+_MKV_CLUSTER = 0x1F43B675
+
+
+def _read_vint(data: bytes, pos: int, keep_marker: bool) -> Tuple[Optional[int], int]:
+    """EBML değişken uzunluklu tamsayı; (değer, yeni konum)"""
+    if pos >= len(data):
+        return None, pos
+    first = data[pos]
+    length = 1
+    while length <= 8 and not first & (0x80 >> (length - 1)):
+        length += 1
+    if length > 8 or pos + length > len(data):
+        return None, pos
+    value = first if keep_marker else first & (0xFF >> length)
+    for byte in data[pos + 1:pos + length]:
+        value = (value << 8) | byte
+    if not keep_marker and value == (1 << (7 * length)) - 1:
+        value = -1  # bilinmeyen boyut
+    return value, pos + length
+
+
+def _iter_ebml(data: bytes, start: int, end: int) -> Iterator[Tuple[int, int, int]]:
+    pos = start
+    while pos < end:
+        element_id, pos_after_id = _read_vint(data, pos, keep_marker=True)
+        size, body = _read_vint(data, pos_after_id, keep_marker=False)
+        if element_id is None or size is None:
+            return
+        body_end = end if size < 0 else min(body + size, end)
+        yield element_id, body, body_end
+        if size < 0 or body + size > end:
+            # Boyutu bilinmeyen veya yarım kalan eleman; içine inilebilir ama sonrası yok
+            return
+        pos = body + size
+
+
+def _probe_matroska(data: bytes, meta: Dict) -> Dict:
+    info = {"timecode_scale": 1_000_000}
+    tracks = []
+
+    def walk(start: int, end: int, track: Optional[Dict]):
+        for element_id, body, body_end in _iter_ebml(data, start, end):
+            raw = data[body:body_end]
+            if element_id == 0x1A45DFA3:
+                walk(body, body_end, None)
+            elif element_id == _EBML_DOCTYPE:
+                meta["container"] = "webm" if raw == b"webm" else "matroska"
+            elif element_id == _MKV_CLUSTER:
+                return
+            elif element_id == _MKV_TIMECODE_SCALE:
+                info["timecode_scale"] = int.from_bytes(raw, "big")
+            elif element_id == _MKV_DURATION and len(raw) in (4, 8):
+                info["duration"] = struct.unpack(">f" if len(raw) == 4 else ">d", raw)[0]
+            elif element_id == _MKV_TRACK_ENTRY:
+                new_track = {}
+                tracks.append(new_track)
+                walk(body, body_end, new_track)
+            elif track is not None and element_id == _MKV_TRACK_TYPE:
+                track["type"] = int.from_bytes(raw, "big")
+            elif track is not None and element_id == _MKV_CODEC_ID:
+                track["codec"] = raw.decode("latin-1").rstrip("\x00")
+            elif track is not None and element_id == _MKV_PIXEL_WIDTH:
+                track["width"] = int.from_bytes(raw, "big")
+            elif track is not None and element_id == _MKV_PIXEL_HEIGHT:
+                track["height"] = int.from_bytes(raw, "big")
+            elif element_id in _MKV_MASTERS:
+                walk(body, body_end, track)
+
+    walk(0, len(data), None)
+    if "duration" in info:
+        meta["duration_seconds"] = round(info["duration"] * info["timecode_scale"] / 1e9, 3)
+    for track in tracks:
+        if track.get("type") == 1:
+            if track.get("width"):
+                meta["width"], meta["height"] = track["width"], track.get("height")
+            if track.get("codec"):
+                meta["video_codec"] = track["codec"]
+        elif track.get("type") == 2 and track.get("codec"):
+            meta["audio_codec"] = track["codec"]
+    return meta
+
+
+# --- AVI (RIFF) ---
+
+def _probe_avi(data: bytes, meta: Dict) -> Dict:
+    index = data.find(b"avih", 12)
+    if index < 0 or index + 8 + 40 > len(data):
+        return meta
+    body = index + 8
+    usec_per_frame, _, _, _, total_frames = struct.unpack("<5I", data[body:body + 20])
+    width, height = struct.unpack("<II", data[body + 32:body + 40])
+    if usec_per_frame and total_frames:
+        meta["duration_seconds"] = round(usec_per_frame * total_frames / 1e6, 3)
+    if width:
+        meta["width"], meta["height"] = width, height
+    strf = data.find(b"vids", index)
+    if strf >= 0 and strf + 8 <= len(data):
+        meta["video_codec"] = data[strf + 4:strf + 8].decode("latin-1").strip()
+    return meta
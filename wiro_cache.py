@@ -0,0 +1,194 @@
+# wiro_cache.py
+"""
+Wiro video analizi için kalıcı cache ve istek birleştirme (singleflight)
+
+Aynı video + prompt için:
+
+1. Cache'te sonuç varsa Wiro'ya gidilmez (varsayılan: SQLite, restart
+   sonrası ve aynı makinedeki worker'lar arasında ortak).
+2. Aynı anda gelen istekler tek Wiro çağrısını paylaşır; ilk isteği açan
+   istemci bağlantıyı kesse bile çağrı diğerleri için tamamlanır.
+3. Başarısız sonuçlar (hata sözlüğü) kısa süreyle cache'lenir (negative
+   cache): sorunlu URL yoğun trafikte Wiro'ya tekrar tekrar gitmez. Geçici
+   hatalar (zaman aşımı, ağ, 429/5xx, bozuk yanıt) çok daha kısa tutulur:
+   kısa bir kesinti URL'yi tüm negatif TTL boyunca kilitlemez.
+
+Anahtar normalize edilmiş URL (fragment atılır) veya verilirse içerik
+hash'i ile prompt'tan üretilir. Wiro client'ı ilk çağrıda yüklenir
+(wiro_client import edilmeden önce bu modül açılışı yavaşlatmaz).
+"""
+import asyncio
+import hashlib
+import json
+import os
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import urldefrag
+
+from starlette.concurrency import run_in_threadpool
+
+from metrics import WIRO_CACHE
+from result_cache import MemoryCache, NullCache, ResultCache, SharedStateCache, SQLiteCache
+from shared_state import get_shared_state
+
+# Ayarlar (ortam değişkenleri ile değiştirilebilir)
+WIRO_CACHE_BACKEND = os.getenv("WIRO_CACHE_BACKEND", "sqlite")  # sqlite | shared | memory | off
+WIRO_CACHE_PATH = os.getenv("WIRO_CACHE_PATH", "cache/wiro.sqlite3")
+WIRO_CACHE_TTL = int(os.getenv("WIRO_CACHE_TTL", str(7 * 24 * 3600)))
+WIRO_CACHE_NEGATIVE_TTL = int(os.getenv("WIRO_CACHE_NEGATIVE_TTL", "300"))  # 0 = hatalar cache'lenmez
+WIRO_CACHE_TRANSIENT_TTL = int(os.getenv("WIRO_CACHE_TRANSIENT_TTL", "10"))  # Geçici hatalar; 0 = cache'lenmez
+WIRO_CACHE_SIZE = int(os.getenv("WIRO_CACHE_SIZE", "50000"))
+
+
+def wiro_cache_key(video_url: str, prompt: str, content_hash: Optional[str] = None) -> str:
+    """
+    Video (içerik hash'i, yoksa URL) + prompt'tan cache anahtarı
+
+    content_hash yalnızca URL'nin içeriği biliniyorsa verilmeli (ör. imzalı
+    URL'ler her seferinde değişir ama video aynıdır).
+    """
+    video = f"sha256:{content_hash}" if content_hash else f"url:{urldefrag(video_url.strip())[0]}"
+    digest = hashlib.sha256(json.dumps([video, prompt]).encode()).hexdigest()
+    return f"wiro:{digest}"
+
+
+def is_transient_error(result: Dict) -> bool:
+    """Hata geçici mi (zaman aşımı, ağ hatası, 429/5xx, bozuk yanıt); kesin hatalar (4xx, görev hatası) değil"""
+    error = str(result.get("error", ""))
+    if error == "Task timeout" or error.startswith("Invalid response"):
+        return True
+    if error.startswith("Request failed: "):
+        reason = error[len("Request failed: "):]
+        # Sayı değilse httpx taşıma hatası adı (ConnectError, ReadTimeout, ...)
+        return not reason.isdigit() or int(reason) == 429 or int(reason) >= 500
+    return False
+
+
+class SingleFlight:
+    """
+    Aynı anahtar için eşzamanlı çağrıları tek çağrıda birleştir
+
+    Çağrı ayrı bir task olarak çalışır ve bekleyenler shield ile bekler:
+    bekleyenlerden biri iptal edilse de çağrı diğerleri için sürer.
+    Process içi çalışır; worker'lar arası tekrarları cache yakalar.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Dict]]) -> Tuple[Dict, bool]:
+        """(sonuç, devam eden çağrıya katıldı mı)"""
+        task = self._calls.get(key)
+        if task is not None and task.get_loop() is asyncio.get_running_loop():
+            self.coalesced += 1
+            return await asyncio.shield(task), True
+
+        task = asyncio.ensure_future(func())
+        self._calls[key] = task
+        self.calls += 1
+        task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task), False
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # Bekleyen kalmadıysa "never retrieved" uyarısı olmasın
+
+
+class WiroCache:
+    """AsyncWiroClient.analyze_video önünde cache + singleflight"""
+
+    def __init__(self, store: Optional[ResultCache] = None, ttl: int = WIRO_CACHE_TTL,
+                 negative_ttl: int = WIRO_CACHE_NEGATIVE_TTL, transient_ttl: int = WIRO_CACHE_TRANSIENT_TTL,
+                 client_factory: Optional[Callable] = None):
+        self.store = store if store is not None else create_store()
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.transient_ttl = min(transient_ttl, negative_ttl)
+        self._client_factory = client_factory
+        self.flight = SingleFlight()
+        self.negative_hits = 0
+        self.upstream_errors = 0
+
+    def client(self):
+        if self._client_factory is None:
+            from wiro_client import get_async_client  # İlk Wiro isteğinde yüklenir
+            self._client_factory = get_async_client
+        return self._client_factory()
+
+    async def _store_call(self, method, *args):
+        """Bellek dışı backend'ler (SQLite/Redis) event loop'u bloklamasın"""
+        if self.store.backend in ("memory", "off"):
+            return method(*args)
+        return await run_in_threadpool(method, *args)
+
+    async def analyze_video(self, video_url: str, prompt: Optional[str] = None,
+                            content_hash: Optional[str] = None) -> Dict:
+        """Wiro analizi (cache'ten, devam eden ortak çağrıdan ya da yeni çağrıyla)"""
+        if prompt is None:
+            from wiro_client import DEFAULT_PROMPT
+            prompt = DEFAULT_PROMPT
+        key = wiro_cache_key(video_url, prompt, content_hash)
+
+        cached = await self._store_call(self.store.get, key)
+        if cached is not None:
+            negative = "error" in cached
+            if negative:
+                self.negative_hits += 1
+            WIRO_CACHE.inc(result="negative_hit" if negative else "hit")
+            return cached
+
+        result, coalesced = await self.flight.do(key, lambda: self._fetch(key, video_url, prompt))
+        WIRO_CACHE.inc(result="coalesced" if coalesced else "miss")
+        return result
+
+    async def _fetch(self, key: str, video_url: str, prompt: str) -> Dict:
+        result = await self.client().analyze_video(video_url, prompt)
+        if "error" not in result:
+            ttl = self.ttl
+        else:
+            self.upstream_errors += 1
+            ttl = self.transient_ttl if is_transient_error(result) else self.negative_ttl
+        if ttl > 0:
+            await self._store_call(self.store.set, key, result, ttl)
+        return result
+
+    def stats(self) -> Dict:
+        return {
+            **self.store.stats(),
+            "negative_hits": self.negative_hits,
+            "upstream_calls": self.flight.calls,
+            "upstream_errors": self.upstream_errors,
+            "coalesced": self.flight.coalesced,
+            "in_flight": len(self.flight),
+            "ttl": self.ttl,
+            "negative_ttl": self.negative_ttl,
+            "transient_ttl": self.transient_ttl
+        }
+
+
+def create_store(backend: str = WIRO_CACHE_BACKEND) -> ResultCache:
+    """Ayara göre Wiro sonuç deposu"""
+    if backend == "shared":
+        return SharedStateCache(get_shared_state(), WIRO_CACHE_TTL)
+    if backend == "memory":
+        return MemoryCache(WIRO_CACHE_TTL, WIRO_CACHE_SIZE)
+    if backend == "off":
+        return NullCache()
+    return SQLiteCache(WIRO_CACHE_PATH, WIRO_CACHE_TTL, WIRO_CACHE_SIZE)
+
+
+_cache: Optional[WiroCache] = None
+
+
+def get_wiro_cache() -> WiroCache:
+    """Process genelinde tek Wiro cache'i"""
+    global _cache
+    if _cache is None:
+        _cache = WiroCache()
+    return _cache
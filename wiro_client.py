@@ -1,40 +1,74 @@
 # wiro_client.py
-import requests
+import httpx
+import asyncio
+import random
 import time
 import hashlib
 import hmac
 import json
-from dotenv import load_dotenv
+from typing import Dict, Optional
 import os
 
-# .env dosyasını yükle
-load_dotenv()
-
+# .env dosyası uygulama girişinde (main.py / serve.py) yüklenir
 API_KEY = os.getenv("WIRO_API_KEY")
 API_SECRET = os.getenv("WIRO_API_SECRET")
 API_URL = "https://api.wiro.ai/v1/Run/wiro/ask-video"
 
+# Async client ayarları
+BASE_URL = os.getenv("WIRO_BASE_URL", "https://api.wiro.ai/v1")
+TIMEOUT_SECONDS = float(os.getenv("WIRO_TIMEOUT", "30"))
+CONNECT_TIMEOUT_SECONDS = float(os.getenv("WIRO_CONNECT_TIMEOUT", "5"))
+MAX_RETRIES = int(os.getenv("WIRO_MAX_RETRIES", "3"))
+BACKOFF_BASE_SECONDS = float(os.getenv("WIRO_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX_SECONDS = float(os.getenv("WIRO_BACKOFF_MAX", "8"))
+MAX_CONCURRENCY = int(os.getenv("WIRO_MAX_CONCURRENCY", "10"))
+POLL_INTERVAL_SECONDS = float(os.getenv("WIRO_POLL_INTERVAL", "2"))
+POLL_TIMEOUT_SECONDS = float(os.getenv("WIRO_POLL_TIMEOUT", "120"))
+
+DEFAULT_PROMPT = "Describe this video in detail."
+TASK_DONE_STATUSES = {"task_postprocess_end"}
+TASK_FAILED_STATUSES = {"task_cancel"}
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# İdempotent olmayan (ücretli görev başlatan) istekler: yalnızca sunucuya ulaşmadığı kesin hatalar
+NON_IDEMPOTENT_RETRY_STATUS_CODES = {429}
+NON_IDEMPOTENT_RETRY_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout)
 
-def _generate_headers():
+
+def _generate_headers(api_key: str = None, api_secret: str = None):
+    api_key = api_key or API_KEY
+    api_secret = api_secret or API_SECRET
     nonce = str(int(time.time()))
     signature = hmac.new(
-        API_KEY.encode(),
-        f"{API_SECRET}{nonce}".encode(),
+        api_key.encode(),
+        f"{api_secret}{nonce}".encode(),
         hashlib.sha256
     ).hexdigest()
     return {
-        "x-api-key": API_KEY,
+        "x-api-key": api_key,
         "x-nonce": nonce,
         "x-signature": signature,
         "Content-Type": "application/json",
     }
 
 
+def _json_result(response) -> Dict:
+    """200 yanıtın gövdesi; JSON nesnesi değilse (ör. proxy hata sayfası) hata sözlüğü"""
+    try:
+        result = response.json()
+    except ValueError:
+        return {"error": "Invalid response: not JSON", "details": response.text[:500]}
+    if not isinstance(result, dict):
+        return {"error": "Invalid response: not a JSON object", "details": response.text[:500]}
+    return result
+
+
 def analyze_video(video_url: str):
     """Wiro Ask-Video API üzerinden video analizi"""
+    import requests  # Yalnızca bu senkron yol kullanır; açılışta yüklenmesin
+
     payload = {
         "input-video-url": video_url,
-        "prompt": "Describe this video in detail."
+        "prompt": DEFAULT_PROMPT
     }
 
     headers = _generate_headers()
@@ -43,4 +77,154 @@ def analyze_video(video_url: str):
     if response.status_code != 200:
         return {"error": f"Request failed: {response.status_code}", "details": response.text}
 
-    return response.json()
+    return _json_result(response)
+
+
+class AsyncWiroClient:
+    """
+    Event loop'u bloklamayan Wiro client'ı
+
+    Tek bir paylaşılan bağlantı havuzu kullanır. Geçici hatalarda (bağlantı
+    hatası, timeout, 429/5xx) exponential backoff ile tekrar dener, eşzamanlı
+    istek sayısını semaphore ile sınırlar. Görev başlatan istek idempotent
+    değildir (her çağrı ücretli yeni görev açar): yalnızca bağlantı
+    kurulamadıysa veya 429 döndüyse tekrar denenir.
+    """
+
+    def __init__(
+        self,
+        base_url: str = BASE_URL,
+        api_key: str = None,
+        api_secret: str = None,
+        timeout: float = TIMEOUT_SECONDS,
+        connect_timeout: float = CONNECT_TIMEOUT_SECONDS,
+        max_retries: int = MAX_RETRIES,
+        max_concurrency: int = MAX_CONCURRENCY,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.api_key = api_key or API_KEY
+        self.api_secret = api_secret or API_SECRET
+        self.max_retries = max_retries
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client = httpx.AsyncClient(
+            base_url=base_url.rstrip("/"),
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency
+            ),
+            transport=transport,
+        )
+
+    async def close(self):
+        await self._client.aclose()
+
+    def _backoff(self, attempt: int) -> float:
+        """Exponential backoff + jitter"""
+        delay = min(BACKOFF_BASE_SECONDS * (2 ** attempt), BACKOFF_MAX_SECONDS)
+        return delay * (0.5 + random.random() / 2)
+
+    async def _post(self, path: str, payload: Dict, idempotent: bool = True) -> Dict:
+        """İmzalı POST isteği (tekrar denemeli; idempotent değilse yalnızca gönderilmediği kesin hatalarda)"""
+        retry_errors = httpx.TransportError if idempotent else NON_IDEMPOTENT_RETRY_ERRORS
+        retry_statuses = RETRY_STATUS_CODES if idempotent else NON_IDEMPOTENT_RETRY_STATUS_CODES
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                await asyncio.sleep(self._backoff(attempt - 1))
+            # Her denemede yeni nonce ile imzala
+            headers = _generate_headers(self.api_key, self.api_secret)
+            try:
+                async with self._semaphore:
+                    response = await self._client.post(path, headers=headers, json=payload)
+            except httpx.TransportError as e:
+                last_error = {"error": f"Request failed: {type(e).__name__}", "details": str(e)}
+                if isinstance(e, retry_errors):
+                    continue
+                return last_error
+
+            if response.status_code in retry_statuses:
+                last_error = {"error": f"Request failed: {response.status_code}", "details": response.text}
+                continue
+            if response.status_code != 200:
+                return {"error": f"Request failed: {response.status_code}", "details": response.text}
+            return _json_result(response)
+
+        return last_error
+
+    async def run(self, video_url: str, prompt: str = DEFAULT_PROMPT) -> Dict:
+        """Ask-Video görevini başlat (taskid döner)"""
+        payload = {
+            "input-video-url": video_url,
+            "prompt": prompt
+        }
+        return await self._post("/Run/wiro/ask-video", payload, idempotent=False)
+
+    async def task_detail(self, task_id: str) -> Dict:
+        """Görev durumunu getir"""
+        return await self._post("/Task/Detail", {"taskid": task_id})
+
+    async def wait_for_task(
+        self,
+        task_id: str,
+        interval: float = POLL_INTERVAL_SECONDS,
+        timeout: float = POLL_TIMEOUT_SECONDS,
+    ) -> Dict:
+        """Görev bitene kadar durumu sorgula"""
+        deadline = time.monotonic() + timeout
+        while True:
+            detail = await self.task_detail(task_id)
+            if "error" in detail:
+                return detail
+
+            tasks = detail.get("tasklist") or []
+            status = tasks[0].get("status") if tasks else None
+            if status in TASK_DONE_STATUSES:
+                return tasks[0]
+            if status in TASK_FAILED_STATUSES:
+                return {"error": f"Task failed: {status}", "details": tasks[0]}
+
+            if time.monotonic() + interval > deadline:
+                return {"error": "Task timeout", "details": {"taskid": task_id, "status": status}}
+            await asyncio.sleep(interval)
+
+    async def analyze_video(self, video_url: str, prompt: str = DEFAULT_PROMPT) -> Dict:
+        """Görevi başlat ve sonucu bekle"""
+        started = await self.run(video_url, prompt)
+        if "error" in started:
+            return started
+
+        task_id = started.get("taskid")
+        if not task_id:
+            return {"error": "Task id missing", "details": started}
+        return await self.wait_for_task(task_id)
+
+
+def result_text(result: Dict) -> str:
+    """Tamamlanmış görevden modelin metin çıktısı (video açıklaması)"""
+    if not result or "error" in result:
+        return ""
+    text = result.get("debugoutput") or ""
+    outputs = result.get("outputs") or []
+    # Bazı modeller metni çıktı listesinde döndürür
+    extra = [item.get("content") for item in outputs if isinstance(item, dict) and isinstance(item.get("content"), str)]
+    return "\n".join([text, *extra]).strip()
+
+
+_async_client: Optional[AsyncWiroClient] = None
+
+
+def get_async_client() -> AsyncWiroClient:
+    """Paylaşılan async client (ilk kullanımda oluşturulur)"""
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncWiroClient()
+    return _async_client
+
+
+async def close_async_client():
+    """Uygulama kapanırken bağlantı havuzunu kapat"""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None